@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Build benchmark suite
+Generates a synthetic course (N decks x M slides with ---- breaks, code
+blocks, tables and images) in a temporary theme and times each stage of the
+pipeline separately:
+  process_slide_breaks, add_data_attributes, md_to_marp (files),
+  markdown (MD -> HTML), pdf_layout (WeasyPrint), marp_render (Marp CLI)
+Results are written as JSON so runs can be compared across versions
+(--compare). Marp and WeasyPrint can be replaced by stubs (--stub-marp,
+--stub-pdf) so the suite runs without Node or the WeasyPrint system libraries
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from convert_md_to_marp import add_data_attributes, convert_md_to_marp, process_slide_breaks
+from convert_md_to_pdf_docs import load_docs_css, remove_slide_breaks
+from convert_marp_to_pdf import generate_pdfs_from_marp
+from markdown_converter import convert_markdown
+from pdf_renderer import build_html_document, get_renderer
+
+RESULTS_VERSION = 1
+
+WORDS = (
+    "model training data fine tuning token prompt completion dataset epoch loss "
+    "validation learning rate batch gradient evaluation inference latency cost "
+    "embedding context window example response assistant system user"
+).split()
+
+CODE_SAMPLE = '''```python
+import json
+
+def load_examples(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+examples = load_examples("train.jsonl")
+print(f"{len(examples)} examples")
+```'''
+
+# Minimal valid PDF written by the stubs
+STUB_PDF = (b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+            b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\n"
+            b"trailer<</Root 1 0 R>>\n%%EOF\n")
+
+STUB_MARP = r'''#!/usr/bin/env python3
+# Stub Marp CLI for benchmarks: writes placeholder PDFs without Node/Chromium
+import sys, time
+from pathlib import Path
+args = sys.argv[1:]
+output = Path(args[args.index("--output") + 1])
+delay = float("{delay}")
+if args[0] == "--input-dir":
+    for md in sorted(Path(args[1]).rglob("*.md")):
+        time.sleep(delay)
+        target = output / (md.stem + ".pdf")
+        target.write_bytes({pdf!r})
+        print(f"[  INFO ] {{md}} => {{target}}", file=sys.stderr)
+else:
+    time.sleep(delay)
+    output.write_bytes({pdf!r})
+'''
+
+class StubRenderer:
+    """Stand-in for PdfRenderer that skips WeasyPrint layout"""
+
+    def warm(self, css_text=None):
+        pass
+
+    def write_pdf(self, html_document, output_path, css_text=None, base_url=None):
+        Path(output_path).write_bytes(STUB_PDF)
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def synthetic_slide(rng: random.Random, deck: int, slide: int, images: int) -> str:
+    """One slide of synthetic content mixing the constructs the pipeline handles"""
+    parts = [f"{'##' if slide % 3 == 0 else '###'} Topic {deck}.{slide}: {_words(rng, 3)}", ""]
+    parts.append(_words(rng, 40))
+    parts.append("")
+    parts.extend(f"- {_words(rng, 8)}" for _ in range(4))
+    parts.append("")
+
+    kind = slide % 4
+    if kind == 1:
+        parts.append(CODE_SAMPLE)
+    elif kind == 2:
+        parts.append("| Metric | Train | Validation |")
+        parts.append("|--------|-------|------------|")
+        parts.extend(f"| {rng.choice(WORDS)} | {rng.random():.3f} | {rng.random():.3f} |" for _ in range(5))
+    elif kind == 3 and images:
+        parts.append(f"![Figure {deck}.{slide}](images/figure_{rng.randrange(images)}.png)")
+    parts.append("")
+    return "\n".join(parts)
+
+def synthetic_deck(rng: random.Random, deck: int, slides: int, images: int) -> str:
+    """A source deck with `----` breaks between slides"""
+    body = [f"# Module {deck}: {_words(rng, 4)}", ""]
+    for slide in range(slides):
+        if slide:
+            body.extend(["----", ""])
+        body.append(synthetic_slide(rng, deck, slide, images))
+    return "\n".join(body)
+
+def _placeholder_png() -> bytes:
+    """A valid 1x1 white PNG, built without Pillow"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff")) + chunk(b"IEND", b""))
+
+def write_image(path: Path, rng: random.Random) -> None:
+    """Write a 1280x720 noisy PNG (a 1x1 placeholder without Pillow)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        path.write_bytes(_placeholder_png())
+        return
+    image = Image.effect_noise((1280, 720), rng.randrange(20, 80)).convert("RGB")
+    image.save(path, format="PNG")
+
+def generate_course(theme_dir: Path, decks: int, slides: int, images: int, seed: int = 0) -> List[Path]:
+    """Create a synthetic theme (md_src, img_src, style.css, program.md)"""
+    rng = random.Random(seed)
+    presentation = theme_dir / "presentation"
+    md_src = presentation / "md_src"
+    img_src = presentation / "img_src"
+    md_src.mkdir(parents=True, exist_ok=True)
+    img_src.mkdir(parents=True, exist_ok=True)
+
+    for index in range(images):
+        write_image(img_src / f"figure_{index}.png", rng)
+    shutil.copytree(img_src, presentation / "marp_slides" / "images", dirs_exist_ok=True)
+
+    (presentation / "style.css").write_text("/* @theme benchmark */\n@import 'default';\n", encoding='utf-8')
+    (theme_dir / "program.md").write_text(
+        "# Course Program\n\n" + "\n".join(f"- Module {d}: {_words(rng, 6)}" for d in range(decks)) + "\n",
+        encoding='utf-8'
+    )
+
+    sources = []
+    for deck in range(decks):
+        source = md_src / f"{deck:02d}_module.md"
+        source.write_text(synthetic_deck(rng, deck, slides, images), encoding='utf-8')
+        sources.append(source)
+    return sources
+
+def time_stage(func: Callable[[], object], repeat: int) -> Dict[str, object]:
+    """Run func repeat times, returning wall-clock seconds per run and summary stats"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        runs.append(time.perf_counter() - start)
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+    }
+
+def install_stub_marp(bin_dir: Path, delay: float) -> None:
+    """Put a stub `marp` executable first on PATH"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    marp = bin_dir / "marp"
+    marp.write_text(STUB_MARP.format(delay=delay, pdf=STUB_PDF), encoding='utf-8')
+    marp.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+def git_revision() -> Optional[str]:
+    """Current commit of the scripts, if they are in a git checkout"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def run_benchmark(args, work_dir: Path) -> dict:
+    """Generate the synthetic course and time every stage"""
+    theme_dir = work_dir / "benchmark-theme"
+    sources = generate_course(theme_dir, args.decks, args.slides, args.images, args.seed)
+    contents = [source.read_text(encoding='utf-8') for source in sources]
+    presentation = theme_dir / "presentation"
+    marp_dir = presentation / "marp_slides"
+    scripts_dir = Path(__file__).parent
+
+    header = ("Benchmark Course", "Confidential", "images/figure_0.png", None)
+    stages: Dict[str, dict] = {}
+    skipped: Dict[str, str] = {}
+
+    def selected(name: str) -> bool:
+        return not args.stages or name in args.stages
+
+    if selected("process_slide_breaks"):
+        stages["process_slide_breaks"] = time_stage(
+            lambda: [process_slide_breaks(content) for content in contents], args.repeat)
+
+    if selected("add_data_attributes"):
+        stages["add_data_attributes"] = time_stage(
+            lambda: [add_data_attributes(content, *header) for content in contents], args.repeat)
+
+    # Always generate the Marp files: marp_render needs them
+    md_to_marp = time_stage(lambda: convert_md_to_marp(
+        str(presentation / "md_src"), str(marp_dir), None, None, None,
+        header[2], None, None, header[0], header[1]), args.repeat)
+    if selected("md_to_marp"):
+        stages["md_to_marp"] = md_to_marp
+
+    doc_sources = [remove_slide_breaks(content) for content in contents]
+    html_bodies = []
+    if selected("markdown") or selected("pdf_layout"):
+        def convert_all():
+            html_bodies[:] = [convert_markdown(text) for text in doc_sources]
+        timing = time_stage(convert_all, args.repeat)
+        if selected("markdown"):
+            stages["markdown"] = timing
+
+    if selected("pdf_layout"):
+        renderer = StubRenderer() if args.stub_pdf else get_renderer()
+        css_text = load_docs_css(scripts_dir)
+        pdf_dir = work_dir / "pdf_docs"
+        pdf_dir.mkdir(exist_ok=True)
+        documents = [build_html_document(body, source.stem, "es") for body, source in zip(html_bodies, sources)]
+
+        def layout_all():
+            for document, source in zip(documents, sources):
+                renderer.write_pdf(document, pdf_dir / f"{source.stem}.pdf", css_text)
+        try:
+            renderer.warm(css_text)
+        except (ImportError, OSError) as e:
+            # OSError: weasyprint is installed but its system libraries (pango) are not
+            skipped["pdf_layout"] = f"weasyprint is not usable: {e} (use --stub-pdf)"
+        else:
+            stages["pdf_layout"] = time_stage(layout_all, args.repeat)
+
+    if selected("marp_render"):
+        if args.stub_marp:
+            install_stub_marp(work_dir / "bin", args.stub_marp_delay)
+        if shutil.which("marp"):
+            stages["marp_render"] = time_stage(lambda: generate_pdfs_from_marp(
+                str(marp_dir), str(presentation / "pdf_slides"), None, str(theme_dir),
+                args.jobs, None, args.batch), args.repeat)
+        else:
+            skipped["marp_render"] = "marp is not on PATH (use --stub-marp)"
+
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            "decks": args.decks, "slides": args.slides, "images": args.images, "seed": args.seed,
+            "repeat": args.repeat, "jobs": args.jobs, "batch": args.batch,
+            "stub_marp": args.stub_marp, "stub_pdf": args.stub_pdf,
+        },
+        "source_bytes": sum(len(content.encode('utf-8')) for content in contents),
+        "stages": stages,
+        "skipped": skipped,
+    }
+
+def print_report(results: dict, baseline: Optional[dict] = None) -> None:
+    """Print median time per stage, with the change against a baseline run"""
+    params = results["params"]
+    print(f"📊 {params['decks']} decks x {params['slides']} slides, {params['images']} images, "
+          f"median of {params['repeat']} runs (revision {results['revision'] or 'unknown'})")
+
+    base_stages = baseline.get("stages", {}) if baseline else {}
+    for name, timing in results["stages"].items():
+        line = f"  {name:<22} {timing['median'] * 1000:10.1f} ms (min {timing['min'] * 1000:.1f} ms)"
+        if name in base_stages:
+            before = base_stages[name]["median"]
+            change = (timing["median"] - before) / before * 100 if before else 0.0
+            marker = "⚠️ " if change > 10 else ""
+            line += f"  {marker}{change:+.1f}% vs baseline"
+        print(line)
+
+    for name, reason in results["skipped"].items():
+        print(f"  {name:<22} skipped: {reason}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the MD -> Marp -> PDF pipeline on a synthetic course")
+    parser.add_argument("--decks", type=int, default=10, help="Number of decks (default: 10)")
+    parser.add_argument("--slides", type=int, default=40, help="Slides per deck (default: 40)")
+    parser.add_argument("--images", type=int, default=5, help="Number of images (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the content generator (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (default: 3)")
+    parser.add_argument("--stages", nargs="+", help="Only run these stages")
+    parser.add_argument("-j", "--jobs", type=int, help="Decks rendered in parallel by marp_render")
+    parser.add_argument("--batch", action="store_true", help="Render decks with a single Marp process")
+    parser.add_argument("--stub-marp", action="store_true", help="Replace Marp CLI with a stub (no Node needed)")
+    parser.add_argument("--stub-marp-delay", type=float, default=0.0, help="Seconds the stub spends per deck")
+    parser.add_argument("--stub-pdf", action="store_true", help="Replace WeasyPrint layout with a stub")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON results file (default: benchmark_results.json)")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated theme (path is printed)")
+
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="marp-benchmark-"))
+    try:
+        results = run_benchmark(args, work_dir)
+    finally:
+        if args.keep:
+            print(f"📁 Synthetic theme kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print_report(results, baseline)
+    print(f"\n💾 Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
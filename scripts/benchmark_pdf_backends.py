@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark the HTML -> PDF backends on a course
+Converts the md_src documents of a theme (or a synthetic course, see
+benchmark_build.py) to HTML once, then renders the whole corpus with every
+installed backend (pdf_backends.py) and reports the median time per run
+and per document. The first document of each backend is rendered once
+before timing, so imports, font caches and started processes are not
+counted; run it on each deployment to pick the fastest engine installed
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from benchmark_build import generate_course, git_revision, time_stage
+from convert_md_to_pdf_docs import load_docs_css, remove_slide_breaks
+from image_assets import doc_images_base
+from markdown_converter import convert_markdown
+from pdf_backends import BACKENDS, get_backend
+from pdf_renderer import build_html_document
+
+RESULTS_VERSION = 1
+
+def load_corpus(theme_dir: Path) -> List[tuple]:
+    """(name, HTML document) of every md_src document of a theme"""
+    corpus = []
+    for md_file in sorted((theme_dir / "presentation" / "md_src").glob("*.md")):
+        body = convert_markdown(remove_slide_breaks(md_file.read_text(encoding='utf-8')))
+        corpus.append((md_file.stem, build_html_document(body, md_file.stem, "es")))
+    return corpus
+
+def run_benchmark(args, work_dir: Path) -> dict:
+    """Render the corpus with every selected backend"""
+    if args.theme:
+        theme_dir = Path(args.theme)
+    else:
+        theme_dir = work_dir / "benchmark-theme"
+        generate_course(theme_dir, args.decks, args.slides, args.images, args.seed)
+
+    corpus = load_corpus(theme_dir)
+    if not corpus:
+        raise FileNotFoundError(f"No md_src documents found in {theme_dir}")
+
+    css_text = load_docs_css(Path(__file__).parent)
+    images_base = doc_images_base(theme_dir / "presentation")
+    base_url = str(images_base) + "/" if images_base else None
+    output_dir = work_dir / "pdf"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    backends: Dict[str, dict] = {}
+    skipped: Dict[str, str] = {}
+
+    for name in args.backends or list(BACKENDS):
+        if not BACKENDS[name].available():
+            skipped[name] = "not installed"
+            continue
+        backend = get_backend(name)
+
+        def render_all():
+            for stem, document in corpus:
+                backend.render(document, css_text, output_dir / f"{stem}.{name}.pdf", base_url)
+
+        try:
+            backend.warm(css_text)
+            stem, document = corpus[0]
+            backend.render(document, css_text, output_dir / f"{stem}.{name}.pdf", base_url)
+            timing = time_stage(render_all, args.repeat)
+        except Exception as e:
+            skipped[name] = str(e)
+            continue
+        finally:
+            backend.close()
+
+        timing["per_document"] = timing["median"] / len(corpus)
+        timing["output_bytes"] = sum(f.stat().st_size for f in output_dir.glob(f"*.{name}.pdf"))
+        backends[name] = timing
+
+    return {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "cpu_count": os.cpu_count(),
+        "corpus": str(theme_dir) if args.theme else "synthetic",
+        "documents": len(corpus),
+        "html_bytes": sum(len(document.encode('utf-8')) for _, document in corpus),
+        "repeat": args.repeat,
+        "backends": backends,
+        "skipped": skipped,
+    }
+
+def print_report(results: dict) -> None:
+    """Print the backends from fastest to slowest"""
+    print(f"📊 {results['documents']} documents ({results['corpus']}), median of {results['repeat']} runs")
+    ranking = sorted(results["backends"].items(), key=lambda item: item[1]["median"])
+    fastest = ranking[0][1]["median"] if ranking else 0
+    for name, timing in ranking:
+        relative = timing["median"] / fastest if fastest else 1.0
+        print(f"  {name:<12} {timing['median']:8.2f} s  {timing['per_document'] * 1000:8.1f} ms/doc  "
+              f"{timing['output_bytes'] / 1024:8.0f} KB  x{relative:.2f}")
+    for name, reason in results["skipped"].items():
+        print(f"  {name:<12} skipped: {reason}")
+    if ranking:
+        print(f"\n🏁 Fastest: {ranking[0][0]} (use --pdf-backend {ranking[0][0]} or PDF_BACKEND={ranking[0][0]})")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare the HTML -> PDF backends on a course")
+    parser.add_argument("theme", nargs="?", help="Theme whose md_src documents are the corpus (default: synthetic course)")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), help="Only these backends (default: all installed)")
+    parser.add_argument("--decks", type=int, default=10, help="Synthetic course: number of decks (default: 10)")
+    parser.add_argument("--slides", type=int, default=40, help="Synthetic course: slides per deck (default: 40)")
+    parser.add_argument("--images", type=int, default=5, help="Synthetic course: number of images (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic course: seed of the content generator (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend (default: 3)")
+    parser.add_argument("-o", "--output", help="Also write the results as JSON")
+
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="pdf-backends-"))
+    try:
+        results = run_benchmark(args, work_dir)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    print_report(results)
+    return 0 if results["backends"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Single-process build of a theme (what `make all` runs)
+Runs the conversion functions as a task graph in one Python process
+instead of chaining shell scripts and interpreters:
+  images -> marp -> slides    (img_src variants, Marp files, slide PDFs/HTML/PPTX)
+  images -> docs              (A4 documents use the A4 image variants)
+  program                     (independent)
+  images -> book              (optional combined course book, see doc_book.py)
+Independent branches run concurrently in a thread pool; slides spend their
+time in Marp/Chromium subprocesses and the documents in WeasyPrint, so they
+overlap well. A failed task skips the tasks that depend on it
+"""
+
+import sys
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+from build_cache import open_cache
+from convert_md_to_marp import convert_md_to_marp
+from convert_marp_to_pdf import export_marp_decks, parse_formats
+from convert_md_to_pdf_docs import convert_all_md_files
+from convert_program_to_pdf import convert_program_to_pdf
+from doc_book import convert_book
+from image_assets import sync_theme_images
+from marp_daemon import default_socket_path
+from pdf_backends import backend_names, theme_backend
+from profiling import add_profile_arguments, profile_session
+from theme_config import load_theme_config
+
+# Task states
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+class Task:
+    """A named unit of work; func returns False (or raises) on failure"""
+
+    def __init__(self, name: str, func: Callable[[], object], deps: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.status: Optional[str] = None
+        self.seconds = 0.0
+        self.error: Optional[str] = None
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        try:
+            result = self.func()
+            self.status = FAILED if result is False else OK
+        except Exception as e:
+            self.status = FAILED
+            self.error = str(e)
+        self.seconds = time.perf_counter() - start
+
+def run_tasks(tasks: List[Task], max_workers: int = 4) -> List[Task]:
+    """Run tasks as soon as their dependencies succeeded, in a thread pool
+
+    Dependencies must name tasks of the list; tasks whose dependencies
+    failed or were skipped are marked skipped and never run
+    """
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        unknown = [dep for dep in task.deps if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Task {task.name} depends on unknown task(s): {', '.join(unknown)}")
+
+    waiting = list(tasks)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while waiting or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for task in list(waiting):
+                    states = [by_name[dep].status for dep in task.deps]
+                    if any(state in (FAILED, SKIPPED) for state in states):
+                        task.status = SKIPPED
+                    elif all(state == OK for state in states):
+                        running[executor.submit(task.run)] = task
+                    else:
+                        continue
+                    waiting.remove(task)
+                    progressed = True
+
+            if not running:
+                # Only reachable with a dependency cycle
+                for task in waiting:
+                    task.status = SKIPPED
+                    task.error = "dependency cycle"
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+
+    return tasks
+
+def theme_tasks(theme_dir, options: argparse.Namespace, prefix: str = "",
+                deck_executor: Optional[Executor] = None, doc_executor: Optional[Executor] = None) -> List[Task]:
+    """Build tasks of one theme; prefix namespaces the task names (e.g. 'example:')
+
+    deck_executor and doc_executor are shared pools (see build_all_themes.py)
+    that deck and document renders are submitted to instead of per-call pools
+    """
+    theme_dir = Path(theme_dir)
+    presentation = theme_dir / "presentation"
+    md_src = presentation / "md_src"
+    marp_slides = presentation / "marp_slides"
+    config = load_theme_config(theme_dir)
+
+    def setting(value, key):
+        """Command-line value, else the theme's marp.config.sh default"""
+        if value is not None:
+            return value
+        default = config.get(key)
+        if default and key in ("DEFAULT_LOGO_LEFT", "DEFAULT_LOGO_RIGHT", "DEFAULT_BACKGROUND"):
+            return str(theme_dir / default)
+        return default or None
+
+    # One cache object for the Marp branch, saved after each of its stages;
+    # docs and program open their own (saves are merged under a lock)
+    marp_cache = open_cache(theme_dir, not options.no_cache)
+    socket_path = str(default_socket_path(theme_dir)) if options.use_daemon else None
+    slide_outputs = {fmt: str(presentation / f"{fmt}_slides") for fmt in parse_formats(options.formats)}
+    pdf_backend = theme_backend(theme_dir, options.pdf_backend)
+
+    def images():
+        stats = sync_theme_images(theme_dir, verbose=options.verbose)
+        print(f"✓ Images synced: {stats['updated']} updated, {stats['unchanged']} unchanged, {stats['removed']} removed")
+
+    def marp():
+        style_css = presentation / "style.css"
+        programa = theme_dir / (config.get("DEFAULT_PROGRAMA") or "programa.md")
+        try:
+            converted = convert_md_to_marp(
+                str(md_src),
+                str(marp_slides),
+                options.theme,
+                str(style_css) if style_css.exists() else None,
+                str(programa) if programa.exists() else None,
+                setting(options.logo_left, "DEFAULT_LOGO_LEFT"),
+                setting(options.logo_right, "DEFAULT_LOGO_RIGHT"),
+                setting(options.background, "DEFAULT_BACKGROUND"),
+                setting(options.header, "DEFAULT_HEADER_TEXT"),
+                setting(options.footer, "DEFAULT_FOOTER_TEXT"),
+                marp_cache
+            )
+        finally:
+            if marp_cache:
+                marp_cache.save()
+        return bool(converted)
+
+    def slides():
+        try:
+            exported = export_marp_decks(
+                str(marp_slides), slide_outputs, options.theme, str(theme_dir),
+                options.jobs, marp_cache, options.batch, socket_path,
+                options.slide_cache, options.dedup_images, deck_executor,
+                options.timeout, options.verbose
+            )
+        finally:
+            if marp_cache:
+                marp_cache.save()
+        return all(exported.values())
+
+    def docs():
+        return convert_all_md_files(theme_dir, options.verbose, not options.no_cache, options.doc_jobs, doc_executor,
+                                    options.chunked_docs, pdf_backend)
+
+    def program():
+        return convert_program_to_pdf(theme_dir, verbose=options.verbose, use_cache=not options.no_cache,
+                                      backend=pdf_backend)
+
+    def book():
+        return convert_book(theme_dir, per_chapter=options.book_per_chapter, verbose=options.verbose,
+                            use_cache=not options.no_cache)
+
+    tasks = []
+    image_deps = []
+    if (presentation / "img_src").is_dir():
+        tasks.append(Task(prefix + "images", images))
+        image_deps = [prefix + "images"]
+
+    if md_src.is_dir():
+        slide_deps = list(image_deps)
+        if not options.skip_marp:
+            tasks.append(Task(prefix + "marp", marp))
+            slide_deps.append(prefix + "marp")
+        tasks.append(Task(prefix + "slides", slides, slide_deps))
+        tasks.append(Task(prefix + "docs", docs, image_deps))
+    elif any(marp_slides.glob("*.md")):
+        tasks.append(Task(prefix + "slides", slides, image_deps))
+
+    if (theme_dir / "program.md").exists():
+        tasks.append(Task(prefix + "program", program))
+
+    if options.book or options.book_per_chapter:
+        tasks.append(Task(prefix + "book", book, image_deps))
+
+    return tasks
+
+def print_summary(tasks: List[Task], title: str = "📋 Build summary:", prefix: str = "") -> None:
+    """One line per task with its state and duration (prefix is stripped from names)"""
+    icons = {OK: "✓", FAILED: "✗", SKIPPED: "⏭️ "}
+    print(f"\n{title}")
+    for task in tasks:
+        name = task.name[len(prefix):] if task.name.startswith(prefix) else task.name
+        line = f"  {icons[task.status]} {name:<12} {task.status:<8}"
+        if task.status != SKIPPED:
+            line += f" {task.seconds:7.2f}s"
+        if task.error:
+            line += f"  {task.error}"
+        print(line)
+
+def add_build_arguments(parser) -> None:
+    """Options shared by the single-theme and all-themes builds"""
+    parser.add_argument("-t", "--theme", help="CSS theme to use")
+    parser.add_argument("--logo-left", help="Path to left logo (default: DEFAULT_LOGO_LEFT of marp.config.sh)")
+    parser.add_argument("--logo-right", help="Path to right logo (default: DEFAULT_LOGO_RIGHT of marp.config.sh)")
+    parser.add_argument("--background", help="Path to background image (default: DEFAULT_BACKGROUND of marp.config.sh)")
+    parser.add_argument("--header", help="Header text (default: DEFAULT_HEADER_TEXT of marp.config.sh)")
+    parser.add_argument("--footer", help="Footer text (default: DEFAULT_FOOTER_TEXT of marp.config.sh)")
+    parser.add_argument("--skip-marp", action="store_true", help="Keep the existing marp_slides (no MD -> Marp step)")
+    parser.add_argument("--formats", default="pdf", help="Comma-separated slide formats: pdf, html, pptx (default: pdf)")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of decks rendered in parallel (default: CPU count)")
+    parser.add_argument("--doc-jobs", type=int, default=1, help="Worker processes rendering documents (0 = CPU count, default: 1)")
+    parser.add_argument("--workers", type=int, default=4, help="Build tasks run at once (default: 4)")
+    parser.add_argument("--batch", action="store_true", help="Render all decks with a single Marp CLI process")
+    parser.add_argument("--use-daemon", action="store_true", help="Render through a running Marp daemon when available")
+    parser.add_argument("--timeout", type=float, help="Seconds after which a deck render is killed")
+    parser.add_argument("--slide-cache", action="store_true", help="Render only changed slides and splice decks from cached pages")
+    parser.add_argument("--dedup-images", action="store_true", help="Merge identical images in the generated slide PDFs (needs pikepdf)")
+    parser.add_argument("--pdf-backend", choices=backend_names(),
+                        help="HTML -> PDF engine for documents and program (default: DEFAULT_PDF_BACKEND of marp.config.sh, $PDF_BACKEND or auto)")
+    parser.add_argument("--chunked-docs", action="store_true",
+                        help="Render long documents in chunks split at top-level headings (bounded memory)")
+    parser.add_argument("--book", action="store_true", help="Also build the combined course book (program.md + all md_src files)")
+    parser.add_argument("--book-per-chapter", action="store_true",
+                        help="Build the course book one chapter at a time (bounded memory, implies --book)")
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild every output, ignoring the build cache")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    add_profile_arguments(parser)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Build a theme (images, Marp files, slide PDFs, documents and program) in one process")
+    parser.add_argument("theme_path", help="Path to theme directory")
+    add_build_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+        parse_formats(args.formats)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    theme_path = Path(args.theme_path)
+    if not (theme_path / "presentation").is_dir() and not (theme_path / "program.md").exists():
+        print(f"Error: {theme_path} has no presentation/ directory or program.md")
+        return 1
+
+    with profile_session(args):
+        start = time.perf_counter()
+        tasks = run_tasks(theme_tasks(theme_path, args), args.workers)
+        print_summary(tasks)
+        print(f"⏱️  Total: {time.perf_counter() - start:.2f}s")
+
+    if all(task.status == OK for task in tasks):
+        print("\n🎉 Build completed!")
+        return 0
+    print("\n❌ Build finished with errors")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Build every theme under themes/ in one process (nightly catalogue rebuilds)
+Themes are discovered like `make list-themes` (directories with a
+presentation/ folder). The build tasks of all themes (see build.py) run in
+one task graph, and every deck and document render is submitted to two
+global pools shared by all themes: a thread pool driving Marp processes and
+a process pool of warmed-up WeasyPrint workers. The machine stays busy
+across theme boundaries instead of building the themes one after another
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+from build import OK, add_build_arguments, print_summary, run_tasks, theme_tasks
+from convert_marp_to_pdf import parse_formats
+from convert_md_to_pdf_docs import doc_worker_pool
+from pdf_backends import theme_backend
+from profiling import profile_session
+
+def discover_themes(themes_dir) -> List[Path]:
+    """Theme directories (those with a presentation/ folder), sorted by name"""
+    themes_dir = Path(themes_dir)
+    if not themes_dir.is_dir():
+        return []
+    return sorted(d for d in themes_dir.iterdir() if (d / "presentation").is_dir())
+
+def has_marp_files(theme_dir: Path) -> bool:
+    return any((theme_dir / "presentation" / "marp_slides").glob("*.md"))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Build all themes with shared worker pools")
+    parser.add_argument("themes_dir", nargs="?", default="themes", help="Directory containing the themes (default: themes)")
+    parser.add_argument("--only", nargs="+", metavar="THEME", help="Build only these themes")
+    parser.add_argument("--exclude", nargs="+", metavar="THEME", default=[], help="Themes to leave out")
+    parser.add_argument("--preserve-marp", action="store_true",
+                        help="Keep the existing marp_slides of themes that have them (manual adjustments)")
+    add_build_arguments(parser)
+    # Most task threads only wait on the shared render pools
+    cpus = os.cpu_count() or 1
+    parser.set_defaults(doc_jobs=cpus, workers=max(4, 2 * cpus))
+
+    args = parser.parse_args()
+
+    try:
+        parse_formats(args.formats)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    themes = discover_themes(args.themes_dir)
+    if args.only:
+        themes = [t for t in themes if t.name in args.only]
+    themes = [t for t in themes if t.name not in args.exclude]
+    if not themes:
+        print(f"❌ No themes found in {args.themes_dir}")
+        return 1
+
+    print(f"🏗️  Building {len(themes)} themes: {', '.join(t.name for t in themes)}")
+
+    with profile_session(args):
+        start = time.perf_counter()
+        deck_jobs = max(1, args.jobs or cpus)
+        doc_jobs = max(1, args.doc_jobs or cpus)
+
+        # Themes may default to different engines (DEFAULT_PDF_BACKEND): warm each one
+        backends = {theme_backend(theme_dir, args.pdf_backend) for theme_dir in themes}
+        with ThreadPoolExecutor(max_workers=deck_jobs) as deck_pool, doc_worker_pool(doc_jobs, backends=backends) as doc_pool:
+            per_theme = {}
+            for theme_dir in themes:
+                options = argparse.Namespace(**vars(args))
+                if args.preserve_marp and has_marp_files(theme_dir):
+                    options.skip_marp = True
+                per_theme[theme_dir.name] = theme_tasks(theme_dir, options, f"{theme_dir.name}:", deck_pool, doc_pool)
+
+            run_tasks([task for tasks in per_theme.values() for task in tasks], args.workers)
+
+        failed = []
+        for name, tasks in per_theme.items():
+            ok = sum(task.status == OK for task in tasks)
+            print_summary(tasks, f"🎨 {name}: {ok}/{len(tasks)} tasks ok", f"{name}:")
+            if ok != len(tasks):
+                failed.append(name)
+
+        print(f"\n⏱️  Total: {time.perf_counter() - start:.2f}s")
+
+    if failed:
+        print(f"❌ {len(themes) - len(failed)}/{len(themes)} themes built, errors in: {', '.join(failed)}")
+        return 1
+    print(f"🎉 All {len(themes)} themes built")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
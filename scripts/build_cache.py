@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Persistent content-hash build cache for the MD -> Marp -> PDF pipeline
+Stores a .build-cache.json manifest per theme mapping each generated output
+to the fingerprint of the inputs it was built from
+Outputs whose inputs are unchanged can be skipped on the next build
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+CACHE_FILENAME = ".build-cache.json"
+CACHE_VERSION = 1
+
+# Chunk size used when hashing files (large images, long decks)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Serializes load-merge-write in save() when several caches of one process
+# (e.g. concurrent build branches) write the same manifest
+_save_lock = threading.Lock()
+
+def hash_file(path) -> str:
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildCache:
+    """Manifest of output fingerprints stored as JSON in a theme directory"""
+
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.base_dir = self.cache_file.parent
+        self._updated: Dict[str, str] = {}
+        # (path, mtime_ns, size) -> digest, so shared inputs are hashed once
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        self.entries: Dict[str, str] = self._load()
+
+    @classmethod
+    def for_theme(cls, theme_dir) -> "BuildCache":
+        """Open (or create) the build cache of a theme directory"""
+        return cls(Path(theme_dir) / CACHE_FILENAME)
+
+    def _load(self) -> Dict[str, str]:
+        """Read the manifest, ignoring missing, corrupt or outdated files"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+
+        entries = data.get("outputs", {})
+        return entries if isinstance(entries, dict) else {}
+
+    def _key(self, output) -> str:
+        """Manifest key for an output path (relative to the theme when possible)"""
+        output = Path(output).resolve()
+        try:
+            return str(output.relative_to(self.base_dir.resolve()))
+        except ValueError:
+            return str(output)
+
+    def _hash_path(self, path: Path) -> str:
+        """Hash a file, or every file below a directory, memoized by mtime/size"""
+        if path.is_dir():
+            digest = hashlib.sha256()
+            for child in sorted(p for p in path.rglob("*") if p.is_file()):
+                digest.update(str(child.relative_to(path)).encode('utf-8'))
+                digest.update(self._hash_path(child).encode('ascii'))
+            return digest.hexdigest()
+
+        if not path.exists():
+            return "missing"
+
+        stat = path.stat()
+        memo_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._file_hashes:
+            self._file_hashes[memo_key] = hash_file(path)
+        return self._file_hashes[memo_key]
+
+    def fingerprint(self, *inputs) -> str:
+        """Combine input files, directories and option values into one digest
+
+        Path objects are hashed by content; any other value (option strings,
+        inline CSS, None) is hashed by its repr
+        """
+        digest = hashlib.sha256()
+        for item in inputs:
+            if isinstance(item, Path):
+                digest.update(b"path:" + self._hash_path(item).encode('ascii'))
+            else:
+                digest.update(b"value:" + repr(item).encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def is_fresh(self, output, fingerprint: str) -> bool:
+        """True if output exists and was built from inputs with this fingerprint"""
+        if not Path(output).exists():
+            return False
+        return self.entries.get(self._key(output)) == fingerprint
+
+    def record(self, output, fingerprint: str) -> None:
+        """Remember the fingerprint an output was successfully built from"""
+        key = self._key(output)
+        self.entries[key] = fingerprint
+        self._updated[key] = fingerprint
+
+    def save(self) -> None:
+        """Write the manifest, merging entries other scripts saved meanwhile"""
+        if not self._updated:
+            return
+
+        with _save_lock:
+            entries = self._load()
+            entries.update(self._updated)
+
+            data = {"version": CACHE_VERSION, "outputs": entries}
+            tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.cache_file)
+
+        self.entries = entries
+        self._updated = {}
+
+def open_cache(theme_dir, enabled: bool = True) -> Optional[BuildCache]:
+    """Return the theme's build cache, or None when caching is disabled"""
+    if not enabled:
+        return None
+    return BuildCache.for_theme(theme_dir)
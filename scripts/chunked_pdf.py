@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Render one logical document as several independently laid-out HTML chunks
+Only one chunk is laid out at a time, so peak memory follows the largest
+chunk instead of the whole document. A first pass lays every chunk out to
+count its pages (and find the page of each anchor); the second pass renders
+each chunk to its own PDF with the page counter starting at its offset and
+counter(pages) replaced by the page total of the whole document, so the
+"Página X de Y" footers run through the stitched PDF
+Long documents are split into chunks at their top-level headings; the
+chunks of one document can also be laid out in parallel worker processes
+Stitching needs pikepdf or pypdf (see slide_cache.py)
+"""
+
+import re
+import tempfile
+from pathlib import Path
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+from pdf_renderer import PdfRenderer, get_renderer
+from profiling import active, span
+from slide_cache import _pdf_library, concatenate_pdfs
+
+PAGES_COUNTER_RE = re.compile(r'counter\(\s*pages\s*(?:,[^)]*)?\)')
+# Headings starting a line of converted Markdown, and the block elements
+# they may be nested in (a chunk never starts inside one)
+HEADING_RE = re.compile(r'^<h([1-6])[\s>]', re.M)
+CONTAINER_TAG_RE = re.compile(r'<(/?)(?:div|blockquote|section|article|aside|details|figure|table|ul|ol|dl)[\s>]', re.I)
+# Sections are grouped into chunks of at least this many characters of HTML
+CHUNK_CHARS = 200_000
+
+def available() -> bool:
+    """Whether chunked PDFs can be stitched (pikepdf or pypdf is installed)"""
+    return _pdf_library() is not None
+
+def total_pages_css(css_text: str, total_pages: int) -> str:
+    """Document stylesheet with counter(pages) replaced by the page total of the whole document
+
+    WeasyPrint drops overrides of the pages counter, so the total is written
+    as a literal; the result is the same for every chunk (parsed once)
+    """
+    return PAGES_COUNTER_RE.sub(f'"{total_pages}"', css_text)
+
+def first_page_css(first_page: int) -> str:
+    """Start the page counter of a chunk at first_page (replaces the implicit increment of its first page)"""
+    return f"@page :first {{ counter-set: page {first_page}; }}"
+
+def split_sections(body_html: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """Split converted Markdown at its top-level headings into chunks of about chunk_chars
+
+    Headings nested in block elements (md_in_html divs, lists...) are not
+    split points; every chunk after the first starts on a new page
+    """
+    depth = 0
+    position = 0
+    headings = []
+    for match in HEADING_RE.finditer(body_html):
+        for tag in CONTAINER_TAG_RE.finditer(body_html, position, match.start()):
+            depth += -1 if tag.group(1) else 1
+        position = match.start()
+        if depth <= 0 and match.start() > 0:
+            headings.append((match.start(), int(match.group(1))))
+
+    top_level = min((level for _, level in headings), default=None)
+    cuts = [start for start, level in headings if level == top_level]
+
+    chunks = []
+    chunk_start = 0
+    for cut in cuts:
+        if cut - chunk_start >= chunk_chars:
+            chunks.append(body_html[chunk_start:cut])
+            chunk_start = cut
+    chunks.append(body_html[chunk_start:])
+    return chunks
+
+def layout_chunk(html_document: str, css_text: Optional[str] = None, base_url: Optional[str] = None,
+                 renderer: Optional[PdfRenderer] = None) -> Tuple[int, Dict[str, int]]:
+    """Lay out a chunk, returning its page count and the page index of each anchor"""
+    renderer = renderer or get_renderer()
+    document = renderer.render(html_document, css_text, base_url)
+    anchors = {}
+    for index, page in enumerate(document.pages):
+        for name in page.anchors:
+            anchors.setdefault(name, index)
+    return len(document.pages), anchors
+
+def _count_in_worker(html_document: str, css_text: str, base_url: Optional[str]):
+    """Page count of a chunk laid out in a worker process, with its profile spans"""
+    pages = layout_chunk(html_document, css_text, base_url)[0]
+    profiler = active()
+    return pages, profiler.drain() if profiler else []
+
+def _write_in_worker(html_document: str, chunk_file: Path, css_text: str, base_url: Optional[str], extra_css: str):
+    """Render a chunk to its PDF in a worker process, returning its profile spans"""
+    get_renderer().write_pdf(html_document, chunk_file, css_text, base_url, extra_css)
+    profiler = active()
+    return profiler.drain() if profiler else []
+
+def write_chunks(chunks: List[str], output_path, css_text: str, base_url: Optional[str] = None,
+                 page_counts: Optional[List[int]] = None, renderer: Optional[PdfRenderer] = None,
+                 executor: Optional[Executor] = None) -> int:
+    """Render HTML documents as consecutive page ranges of one PDF, returning its page count
+
+    page_counts (from layout_chunk) skips the counting pass; with executor
+    (a doc_worker_pool) the chunks are laid out in its worker processes
+    """
+    renderer = renderer or get_renderer()
+    output_path = Path(output_path)
+    profiler = active()
+
+    if page_counts is None:
+        if executor is None:
+            page_counts = [layout_chunk(chunk, css_text, base_url, renderer)[0] for chunk in chunks]
+        else:
+            page_counts = []
+            for pages, spans in executor.map(_count_in_worker, chunks, [css_text] * len(chunks),
+                                             [base_url] * len(chunks)):
+                page_counts.append(pages)
+                if profiler:
+                    profiler.merge(spans)
+
+    total_pages = sum(page_counts)
+    chunk_css = total_pages_css(css_text, total_pages)
+    first_pages = [1 + sum(page_counts[:index]) for index in range(len(chunks))]
+
+    with tempfile.TemporaryDirectory(prefix=".chunks-", dir=output_path.parent) as tmp:
+        chunk_files = [Path(tmp) / f"{index:04d}.pdf" for index in range(len(chunks))]
+        if executor is None:
+            for chunk, chunk_file, first_page in zip(chunks, chunk_files, first_pages):
+                renderer.write_pdf(chunk, chunk_file, chunk_css, base_url, first_page_css(first_page))
+        else:
+            for spans in executor.map(_write_in_worker, chunks, chunk_files, [chunk_css] * len(chunks),
+                                      [base_url] * len(chunks), [first_page_css(page) for page in first_pages]):
+                if profiler:
+                    profiler.merge(spans)
+        with span("stitch"):
+            concatenate_pdfs(chunk_files, output_path)
+
+    return total_pages
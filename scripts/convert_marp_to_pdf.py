@@ -1,28 +1,245 @@
 #!/usr/bin/env python3
 """
-Script to convert Marp files to PDF
-Converts .md files from marp_slides/ to PDFs in pdf_slides/
+Script to convert Marp files to PDF (and HTML/PPTX)
+Converts .md files from marp_slides/ to PDFs in pdf_slides/; with
+--formats the same run also exports HTML and PPTX to their own directories
 Reusable for different projects/themes
 """
 
 import os
+import re
+import shutil
+import tempfile
 import subprocess
 import argparse
 from pathlib import Path
-from typing import List
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Set, Tuple
 
-def generate_pdfs_from_marp(marp_dir: str, pdf_dir: str = None, theme: str = None, project_dir: str = None) -> List[str]:
-    """Generate PDF files from Marp files"""
+from build_cache import BuildCache, open_cache
+from pdf_dedup import dedup_pdf_files
+from image_assets import format_size
+from marp_runner import MARP_FORMATS, marp_command, render_marp_jobs
+from marp_daemon import DEFAULT_SOCKET_NAME, default_socket_path, request_ping, request_render, serve
+from slide_cache import SlideCache, standalone_slides
+from profiling import add_profile_arguments, profile_session, span
+
+# Marp CLI reports each converted file as "[  INFO ] <input> => <output>"
+MARP_CONVERTED_RE = re.compile(r'^\[\s*INFO\s*\]\s+(.+?\.md)\s+=>\s+(.+?)\s*$', re.MULTILINE)
+
+# Outcome of a deck skipped by the build cache
+UP_TO_DATE = object()
+
+def resolve_marp_theme(theme: str = None, project_dir: str = None) -> Optional[Path]:
+    """Resolve the CSS theme file passed to Marp for every deck"""
+    css_file = None
+    
+    if theme:
+        # Look for CSS file in script directory (legacy behavior)
+        script_dir = Path(__file__).parent
+        css_file = script_dir / f"{theme}.css"
+        if not css_file.exists():
+            print(f"⚠️  Theme file {css_file} not found, trying presentation/style.css")
+            css_file = None
+    
+    # If no theme specified or theme not found, try presentation/style.css
+    if not css_file and project_dir:
+        proj_dir = Path(project_dir)
+        style_css = proj_dir / "presentation/style.css"
+        if style_css.exists():
+            css_file = style_css
+            print(f"📄 Using theme: {css_file}")
+    
+    if css_file and css_file.exists():
+        return css_file
+    
+    print("⚠️  No theme file found, using Marp default theme")
+    return None
+
+def deck_fingerprint(cache: BuildCache, marp_file: Path, css_file: Optional[Path] = None) -> str:
+    """Fingerprint of the inputs a deck PDF is built from (Marp source, theme CSS, images)"""
+    return cache.fingerprint(Path(__file__), marp_file, css_file, marp_file.parent / "images")
+
+def parse_formats(text: str) -> List[str]:
+    """Formats of a comma-separated list such as "pdf,html" (raises ValueError)"""
+    formats = [fmt.strip().lower() for fmt in text.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in MARP_FORMATS]
+    if not formats or unknown:
+        raise ValueError(f"Unsupported format(s) {', '.join(unknown) or repr(text)}; use {', '.join(MARP_FORMATS)}")
+    return formats
+
+def output_file_for(output_dir: Path, marp_file: Path, fmt: str = "pdf") -> Path:
+    """Path of a deck's export in one format"""
+    return Path(output_dir) / f"{marp_file.stem}{MARP_FORMATS[fmt][1]}"
+
+def render_marp_deck(marp_file: Path, output_file: Path, css_file: Optional[Path] = None,
+                     timeout: Optional[float] = None, fmt: str = "pdf") -> Optional[str]:
+    """Render a single Marp deck (to PDF by default), returning an error message on failure"""
+    # Render using Marp CLI (argument vector, no shell)
+    cmd = marp_command(marp_file, output_file, fmt, css_file)
+    
+    try:
+        with span("subprocess", marp_file):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return f"Timed out after {timeout:g}s"
+    except OSError as e:
+        return f"Could not start marp: {e}"
+    
+    if result.returncode != 0:
+        return result.stderr
+    return None
+
+def render_marp_batch(marp_dir: Path, marp_files: List[Path], pdf_dir: Path,
+                      css_file: Optional[Path] = None, fmt: str = "pdf") -> Tuple[Set[Path], str]:
+    """Render several decks with a single Marp CLI invocation (one Node + Chromium)
+    
+    Returns the decks Marp reported as converted (and whose output file
+    exists) and the Marp output, so the caller can fall back to per-deck rendering
+    """
+    all_decks = sorted(f.name for f in marp_dir.glob("*.md"))
+    staging_dir = None
+    
+    if sorted(f.name for f in marp_files) == all_decks:
+        input_dir = marp_dir
+    else:
+        # Stage the selected decks next to marp_slides (same depth, so ../ paths
+        # still resolve) and link everything else (images/) alongside them
+        staging_dir = Path(tempfile.mkdtemp(prefix=".marp-batch-", dir=marp_dir.parent))
+        for entry in marp_dir.iterdir():
+            if entry.suffix != ".md" or entry in marp_files:
+                (staging_dir / entry.name).symlink_to(entry.resolve())
+        input_dir = staging_dir
+    
+    cmd = ["marp", "--input-dir", str(input_dir), MARP_FORMATS[fmt][0], "--output", str(pdf_dir), "--allow-local-files"]
+    if css_file:
+        cmd.extend(["--theme", str(css_file)])
+    
+    try:
+        with span("subprocess", "(batch)"):
+            result = subprocess.run(cmd, capture_output=True, text=True)
+    finally:
+        if staging_dir:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    output = result.stdout + result.stderr
+    reported = {Path(match.group(1)).name for match in MARP_CONVERTED_RE.finditer(output)}
+    
+    converted = {
+        marp_file for marp_file in marp_files
+        if marp_file.name in reported and output_file_for(pdf_dir, marp_file, fmt).exists()
+    }
+    return converted, output
+
+def render_marp_slides(marp_dir: Path, decks: Dict[Path, Path],
+                       css_file: Optional[Path] = None) -> Dict[Path, Optional[str]]:
+    """Render decks slide by slide through the per-slide cache (see slide_cache.py)
+    
+    decks maps each Marp file to its PDF. Slides missing from the cache are
+    rendered together by one Marp CLI invocation and every deck is assembled
+    from cached pages. Returns the outcome of the decks handled here; decks
+    that cannot be split or whose slides failed are left to the caller
+    """
+    slide_cache = SlideCache.for_slides_dir(marp_dir, css_file)
+    if not slide_cache.available():
+        print("⚠️  The slide cache needs pikepdf or pypdf, rendering whole decks")
+        return {}
+    
+    plans = {}
+    missing = {}
+    
+    for marp_file in decks:
+        with span("slides", marp_file):
+            slides = standalone_slides(marp_file.read_text(encoding='utf-8'))
+            keys = [slide_cache.slide_key(slide) for slide in slides] if slides is not None else None
+        if slides is None:
+            print(f"↩️  {marp_file.name} uses pagination or headingDivider, rendering the whole deck")
+            continue
+        plans[marp_file] = keys
+        for key, slide in zip(keys, slides):
+            if not slide_cache.has(key):
+                missing[key] = slide
+    
+    if missing:
+        total = sum(len(keys) for keys in plans.values())
+        print(f"🧩 Rendering {len(missing)} of {total} slides (the rest come from the slide cache)")
+        
+        # Stage single-slide decks next to marp_slides so relative paths resolve
+        staging_dir = Path(tempfile.mkdtemp(prefix=".marp-slides-", dir=marp_dir.parent))
+        try:
+            for entry in marp_dir.iterdir():
+                if entry.suffix != ".md":
+                    (staging_dir / entry.name).symlink_to(entry.resolve())
+            slide_files = []
+            for key, slide in missing.items():
+                slide_file = staging_dir / f"{key}.md"
+                slide_file.write_text(slide, encoding='utf-8')
+                slide_files.append(slide_file)
+            
+            pages_dir = staging_dir / ".pages"
+            pages_dir.mkdir()
+            converted, output = render_marp_batch(staging_dir, slide_files, pages_dir, css_file)
+            
+            for slide_file in converted:
+                if not slide_cache.store(slide_file.stem, pages_dir / f"{slide_file.stem}.pdf"):
+                    print(f"⚠️  Slide {slide_file.stem[:12]} did not render to a single page")
+            if len(converted) < len(slide_files):
+                print(f"⚠️  Marp failed on {len(slide_files) - len(converted)} slides:\n{output.strip()}")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    outcomes = {}
+    for marp_file, keys in plans.items():
+        if all(slide_cache.has(key) for key in keys):
+            try:
+                with span("write", marp_file):
+                    slide_cache.assemble(keys, decks[marp_file])
+                outcomes[marp_file] = None
+            except Exception as e:
+                print(f"⚠️  Could not assemble {marp_file.name} from cached slides: {e}")
+    
+    slide_cache.prune()
+    return outcomes
+
+def export_marp_decks(marp_dir: str, outputs: Dict[str, str], theme: str = None, project_dir: str = None,
+                      jobs: int = None, cache: Optional[BuildCache] = None,
+                      batch: bool = False, socket_path: str = None,
+                      slide_cache: bool = False, dedup_images: bool = False,
+                      executor: Optional[Executor] = None,
+                      timeout: Optional[float] = None, verbose: bool = False) -> Dict[str, List[str]]:
+    """Export Marp files to every format of outputs (format -> output directory)
+
+    Each deck is read and fingerprinted once for all formats, and the
+    renders of every format share the same pool of Marp processes
+    When a build cache is given, outputs whose Marp source, theme CSS and
+    images are unchanged since the last build are not rendered again
+    With batch=True the decks of each format are rendered by a single Marp
+    CLI invocation; decks it fails to convert fall back to per-deck rendering
+    With socket_path, decks are rendered by a running Marp daemon (see
+    marp_daemon.py) instead of starting Marp for each of them
+    With slide_cache=True, PDFs are assembled from cached single-slide PDFs
+    and only changed slides are rendered (see slide_cache.py)
+    With dedup_images=True, identical images (backgrounds, logos) in newly
+    generated PDFs are merged into shared XObjects (see pdf_dedup.py)
+    Remaining decks are rendered by up to jobs concurrent Marp processes
+    driven from an asyncio loop (see marp_runner.py), each killed after
+    timeout seconds; verbose streams their output. With executor, per-deck
+    renders are submitted to that (shared) thread pool instead
+    Returns the output files (generated or up to date) per format
+    """
+    
+    unknown = sorted(set(outputs) - set(MARP_FORMATS))
+    if unknown:
+        raise ValueError(f"Unsupported format(s): {', '.join(unknown)}")
     
     marp_path = Path(marp_dir)
     if not marp_path.exists():
         raise FileNotFoundError(f"Directory {marp_dir} does not exist")
     
-    if not pdf_dir:
-        pdf_dir = Path.cwd() / "presentation/pdf_slides"
-    
-    pdf_path = Path(pdf_dir)
-    pdf_path.mkdir(exist_ok=True)
+    output_paths = {fmt: Path(output_dir) for fmt, output_dir in outputs.items()}
+    for output_path in output_paths.values():
+        output_path.mkdir(parents=True, exist_ok=True)
     
     # Find all Marp files (.md files in marp_slides)
     # Exclude program.md as it's converted separately to theme root directory
@@ -30,66 +247,168 @@ def generate_pdfs_from_marp(marp_dir: str, pdf_dir: str = None, theme: str = Non
     
     if not marp_files:
         print(f"No .md files found in {marp_dir}")
-        return []
+        return {fmt: [] for fmt in outputs}
     
-    print(f"Found {len(marp_files)} Marp files to convert to PDF")
+    print(f"Found {len(marp_files)} Marp files to convert to {', '.join(fmt.upper() for fmt in outputs)}")
     
-    generated_pdfs = []
+    # Determine CSS theme to use (shared by all decks)
+    css_file = resolve_marp_theme(theme, project_dir)
+    
+    # Outcome per (deck, format): UP_TO_DATE, None (generated) or an error message
+    outcomes = {}
+    pending = {}
     
     for marp_file in marp_files:
-        try:
-            # Create PDF file name
-            pdf_file = pdf_path / f"{marp_file.stem}.pdf"
-            
-            # Generate PDF using Marp CLI
-            cmd_parts = ["marp", str(marp_file), "--pdf", "--output", str(pdf_file), "--allow-local-files"]
-            
-            # Determine CSS theme to use
-            css_file = None
-            
-            if theme:
-                # Look for CSS file in script directory (legacy behavior)
-                script_dir = Path(__file__).parent
-                css_file = script_dir / f"{theme}.css"
-                if not css_file.exists():
-                    print(f"⚠️  Theme file {css_file} not found, trying presentation/style.css")
-                    css_file = None
-            
-            # If no theme specified or theme not found, try presentation/style.css
-            if not css_file and project_dir:
-                proj_dir = Path(project_dir)
-                style_css = proj_dir / "presentation/style.css"
-                if style_css.exists():
-                    css_file = style_css
-                    print(f"📄 Using theme: {css_file}")
-            
-            # Add theme to command if found
-            if css_file and css_file.exists():
-                cmd_parts.extend(["--theme", str(css_file)])
+        fingerprint = None
+        if cache:
+            with span("cache", marp_file):
+                fingerprint = deck_fingerprint(cache, marp_file, css_file)
+        
+        for fmt, output_path in output_paths.items():
+            output_file = output_file_for(output_path, marp_file, fmt)
+            if cache and cache.is_fresh(output_file, fingerprint):
+                outcomes[(marp_file, fmt)] = UP_TO_DATE
             else:
-                print("⚠️  No theme file found, using Marp default theme")
+                pending[(marp_file, fmt)] = (output_file, fingerprint)
+    
+    pending_pdfs = {marp_file: pending[(marp_file, fmt)][0] for marp_file, fmt in pending if fmt == "pdf"}
+    if slide_cache and pending_pdfs:
+        sliced = render_marp_slides(marp_path, pending_pdfs, css_file)
+        outcomes.update(((marp_file, "pdf"), outcome) for marp_file, outcome in sliced.items())
+    
+    # None: start a local Marp process per deck
+    render_deck = None
+    if socket_path and pending:
+        if request_ping(socket_path):
+            print(f"🔌 Rendering through Marp daemon at {socket_path}")
+            batch = False
             
-            cmd = " ".join(cmd_parts)
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            def render_deck(marp_file, output_file, css_file, fmt):
+                with span("subprocess", marp_file):
+                    error = request_render(socket_path, marp_file.resolve(), output_file.resolve(), fmt)
+                if error is None:
+                    return None
+                # e.g. a daemon serving another marp_slides directory
+                print(f"⚠️  Marp daemon could not render {marp_file.name} ({error.strip()}), starting Marp for it")
+                return render_marp_deck(marp_file, output_file, css_file, timeout, fmt)
+        else:
+            print(f"⚠️  No Marp daemon answering on {socket_path}, starting Marp per deck")
+    
+    batched = False
+    if batch:
+        for fmt, output_path in output_paths.items():
+            unrendered = [marp_file for marp_file, job_fmt in pending
+                          if job_fmt == fmt and (marp_file, fmt) not in outcomes]
+            if len(unrendered) < 2:
+                continue
+            batched = True
+            print(f"📦 Rendering {len(unrendered)} decks to {fmt.upper()} with a single Marp process")
+            try:
+                converted, _ = render_marp_batch(marp_path, unrendered, output_path, css_file, fmt)
+                for marp_file in converted:
+                    outcomes[(marp_file, fmt)] = None
+            except Exception as e:
+                print(f"⚠️  Batch rendering failed: {e}")
+    
+    remaining = [job for job in pending if job not in outcomes]
+    
+    if remaining:
+        if batched:
+            print(f"↩️  Falling back to per-deck rendering for {len(remaining)} outputs")
+        
+        # Each job drives one Marp CLI process (Node + headless Chromium),
+        # so jobs bounds the number of browsers alive at once
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(remaining)))
+        
+        if render_deck is None and executor is None:
+            results = render_marp_jobs([(marp_file, pending[(marp_file, fmt)][0], fmt) for marp_file, fmt in remaining],
+                                       css_file, jobs, timeout, verbose)
+            for job in remaining:
+                outcomes[job] = results[pending[job][0]]
+        else:
+            if render_deck is None:
+                def render_deck(marp_file, output_file, css_file, fmt):
+                    return render_marp_deck(marp_file, output_file, css_file, timeout, fmt)
             
-            if result.returncode == 0:
-                generated_pdfs.append(str(pdf_file))
-                print(f"✓ PDF generated: {marp_file.name} -> {pdf_file.name}")
-            else:
-                print(f"✗ Error generating PDF for {marp_file.name}: {result.stderr}")
+            pool = ThreadPoolExecutor(max_workers=jobs) if executor is None else nullcontext(executor)
+            with pool as render_executor:
+                futures = {
+                    (marp_file, fmt): render_executor.submit(render_deck, marp_file, pending[(marp_file, fmt)][0],
+                                                             css_file, fmt)
+                    for marp_file, fmt in remaining
+                }
                 
-        except Exception as e:
-            print(f"✗ Error generating PDF for {marp_file.name}: {e}")
+                for job, future in futures.items():
+                    try:
+                        outcomes[job] = future.result()
+                    except Exception as e:
+                        outcomes[job] = str(e)
+    
+    generated = {fmt: [] for fmt in outputs}
+    rendered_pdfs = []
+    
+    # Report in deck order so the output stays stable across runs
+    for marp_file in marp_files:
+        for fmt, output_path in output_paths.items():
+            output_file = output_file_for(output_path, marp_file, fmt)
+            outcome = outcomes[(marp_file, fmt)]
+            
+            if outcome is UP_TO_DATE:
+                generated[fmt].append(str(output_file))
+                print(f"⏭️  Up to date: {marp_file.name} -> {output_file.name}")
+            elif outcome is None:
+                if cache:
+                    cache.record(output_file, pending[(marp_file, fmt)][1])
+                generated[fmt].append(str(output_file))
+                if fmt == "pdf":
+                    rendered_pdfs.append(output_file)
+                print(f"✓ {fmt.upper()} generated: {marp_file.name} -> {output_file.name}")
+            else:
+                print(f"✗ Error generating {fmt.upper()} for {marp_file.name}: {outcome}")
+    
+    if dedup_images and rendered_pdfs:
+        with span("write", "(dedup)"):
+            totals = dedup_pdf_files(rendered_pdfs)
+        if totals:
+            saved = totals["bytes_before"] - totals["bytes_after"]
+            print(f"🗜️  Merged {totals['merged']} duplicate images in {totals['files']} PDFs, saved {format_size(saved)}")
     
-    return generated_pdfs
+    return generated
+
+def generate_pdfs_from_marp(marp_dir: str, pdf_dir: str = None, theme: str = None, project_dir: str = None,
+                            jobs: int = None, cache: Optional[BuildCache] = None,
+                            batch: bool = False, socket_path: str = None,
+                            slide_cache: bool = False, dedup_images: bool = False,
+                            executor: Optional[Executor] = None,
+                            timeout: Optional[float] = None, verbose: bool = False) -> List[str]:
+    """Generate PDF files from Marp files (see export_marp_decks for the options)"""
+    if not pdf_dir:
+        pdf_dir = Path.cwd() / "presentation/pdf_slides"
+    
+    return export_marp_decks(marp_dir, {"pdf": pdf_dir}, theme, project_dir, jobs, cache, batch, socket_path,
+                             slide_cache, dedup_images, executor, timeout, verbose)["pdf"]
 
 def main():
     """Main function of the script"""
-    parser = argparse.ArgumentParser(description="Convert Marp files to PDF")
+    parser = argparse.ArgumentParser(description="Convert Marp files to PDF (and HTML/PPTX)")
     parser.add_argument("input", nargs="?", default="presentation/marp_slides", help="Directory with Marp files (default: presentation/marp_slides)")
     parser.add_argument("-o", "--output", help="Output directory for PDFs (default: presentation/pdf_slides)")
+    parser.add_argument("--formats", default="pdf", help="Comma-separated formats to export: pdf, html, pptx (default: pdf)")
+    parser.add_argument("--html-output", default="presentation/html_slides", help="Output directory for HTML (default: presentation/html_slides)")
+    parser.add_argument("--pptx-output", default="presentation/pptx_slides", help="Output directory for PPTX (default: presentation/pptx_slides)")
     parser.add_argument("-t", "--theme", help="CSS theme to use (.css file in script directory)")
     parser.add_argument("--project-dir", help="Project directory (default: script parent directory)")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of decks rendered in parallel (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Render every deck, ignoring the build cache")
+    parser.add_argument("--batch", action="store_true", help="Render all decks with a single Marp CLI process (per-deck fallback)")
+    parser.add_argument("--daemon", action="store_true", help="Run a persistent Marp render daemon for the input directory")
+    parser.add_argument("--use-daemon", action="store_true", help="Render through a running Marp daemon when available")
+    parser.add_argument("--slide-cache", action="store_true", help="Render only changed slides and splice decks from cached pages")
+    parser.add_argument("--dedup-images", action="store_true", help="Merge identical images (backgrounds, logos) in the generated PDFs (needs pikepdf)")
+    parser.add_argument("--timeout", type=float, help="Seconds after which a deck render is killed (per-deck rendering)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Stream Marp's output for every deck")
+    parser.add_argument("--socket", help=f"Daemon socket path (default: <project-dir>/{DEFAULT_SOCKET_NAME})")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
@@ -101,11 +420,20 @@ def main():
         script_dir = Path(__file__).parent
         project_dir = script_dir.parent
     
+    def resolve(path):
+        """Paths are relative to the project directory (or its presentation/ folder)"""
+        if path.startswith("presentation/"):
+            return project_dir / path
+        return project_dir / "presentation" / path
+    
+    try:
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    
     # Resolve paths relative to project directory
-    if args.input.startswith("presentation/"):
-        input_path = project_dir / args.input
-    else:
-        input_path = project_dir / "presentation" / args.input
+    input_path = resolve(args.input)
     
     if not input_path.exists():
         print(f"Error: {input_path} does not exist")
@@ -116,36 +444,53 @@ def main():
         print(f"Error: {input_path} is not a directory")
         return 1
     
-    # Resolve output directory
-    if args.output:
-        if args.output.startswith("presentation/"):
-            output_path = project_dir / args.output
-        else:
-            output_path = project_dir / "presentation" / args.output
-    else:
-        output_path = project_dir / "presentation/pdf_slides"
+    # Resolve output directories
+    output_path = resolve(args.output) if args.output else project_dir / "presentation/pdf_slides"
+    output_paths = {"pdf": output_path, "html": resolve(args.html_output), "pptx": resolve(args.pptx_output)}
     
-    try:
-        # Convert Marp files to PDF
-        pdf_files = generate_pdfs_from_marp(str(input_path), str(output_path), args.theme, str(project_dir))
-        
-        if pdf_files:
+    socket_path = Path(args.socket) if args.socket else default_socket_path(project_dir)
+    
+    if args.daemon:
+        try:
+            serve(socket_path, input_path, resolve_marp_theme(args.theme, str(project_dir)))
+            return 0
+        except Exception as e:
+            print(f"Error: {e}")
+            return 1
+    
+    cache = open_cache(project_dir, not args.no_cache)
+    
+    with profile_session(args):
+        try:
+            # Convert Marp files to every requested format
+            exported = export_marp_decks(str(input_path), {fmt: str(output_paths[fmt]) for fmt in formats},
+                                         args.theme, str(project_dir), args.jobs, cache, args.batch,
+                                         str(socket_path) if args.use_daemon else None,
+                                         args.slide_cache, args.dedup_images,
+                                         timeout=args.timeout, verbose=args.verbose)
+            
+            if cache:
+                cache.save()
+            
+            missing = [fmt.upper() for fmt, files in exported.items() if not files]
+            if missing:
+                print(f"❌ Could not generate {', '.join(missing)} files")
+                return 1
+            
             print(f"\n🎉 Conversion completed!")
-            print(f"Generated PDFs: {len(pdf_files)}")
-            print(f"PDF directory: {Path(pdf_files[0]).parent}")
-        else:
-            print("❌ Could not generate PDFs")
+            for fmt, files in exported.items():
+                print(f"Generated {fmt.upper()}s: {len(files)}")
+                print(f"{fmt.upper()} directory: {Path(files[0]).parent}")
+            
+            print("\n📝 To use the presentations:")
+            print(f"1. Open the generated files in {', '.join(str(output_paths[fmt]) + '/' for fmt in formats)}")
+            print(f"2. Or use Marp directly: marp {input_path}/file.md --watch")
+            
+            return 0
+            
+        except Exception as e:
+            print(f"Error: {e}")
             return 1
-        
-        print("\n📝 To use the presentations:")
-        print(f"1. Open PDF files in {output_path}/")
-        print(f"2. Or use Marp directly: marp {input_path}/file.md --watch")
-        
-        return 0
-        
-    except Exception as e:
-        print(f"Error: {e}")
-        return 1
 
 if __name__ == "__main__":
     exit(main())
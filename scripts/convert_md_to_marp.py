@@ -8,54 +8,120 @@ Reusable for different projects/themes
 import os
 import argparse
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 
-def process_slide_breaks(content: str) -> str:
-    """Process slide break markers (----) and copy the last section title to new slides"""
-    import re
+import md_lines
+from build_cache import BuildCache, open_cache
+from md_lines import HEADING, RULE, SLIDE_BREAK, LineClassifier, markers
+from profiling import add_profile_arguments, profile_session, span
+
+# Characters read from a source file per block
+SOURCE_BLOCK_CHARS = 1 << 20
+
+def iter_source_blocks(f, size: int = SOURCE_BLOCK_CHARS) -> Iterator[str]:
+    """Yield an open text file in blocks of about size characters, each ending at a line end"""
+    rest = ''
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        chunk = rest + chunk
+        cut = chunk.rfind('\n') + 1
+        if cut:
+            yield chunk[:cut]
+        rest = chunk[cut:]
+    
+    if rest:
+        yield rest
+
+def build_slide_elements(header_text: str = None, footer_text: str = None, 
+                         logo_left: str = None, logo_right: str = None) -> str:
+    """Build the HTML elements (logos, header, footer) injected after each slide's first heading"""
+    elements = []
+    
+    # Add separate logos (not part of header)
+    if logo_left:
+        elements.append('<div class="logo-left"></div>')
+    
+    if logo_right:
+        elements.append('<div class="logo-right"></div>')
+    
+    # Add header at the very top
+    if header_text:
+        elements.append(f'<div class="header-text">{header_text}</div>')
     
-    lines = content.split('\n')
-    processed_lines = []
+    # Add footer at the very bottom
+    if footer_text:
+        elements.append(f'<div class="footer-text">{footer_text}</div>')
+    
+    return ''.join(elements)
+
+def transform_slide_blocks(blocks: Iterable[str], elements: str = '', 
+                           slide_breaks: bool = True) -> Iterator[str]:
+    """Transform Markdown text into Marp slide text in a single streaming pass
+    
+    blocks are consecutive pieces of the source, each ending at a line end
+    (a whole text is one block). Only the structural lines found by
+    md_lines.markers are looked at; the text between them is copied as is
+    - Slide break markers (----) become standard Marp separators (---) and the
+      last # or ## title is copied to the new slide (if slide_breaks is True)
+    - elements (logos, header, footer HTML) are inserted after the first
+      heading of every slide
+    Headings and breaks inside fenced code blocks are left alone
+    """
     last_main_title = None  # Keep track of the last # or ## title
+    slide_has_elements = False
     
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        
-        # Check if this is a heading line (only consider # and ##)
-        if line.strip().startswith('#'):
-            heading_level = len(line) - len(line.lstrip('#'))
-            heading_text = line.strip()
-            
-            # Only track # (level 1) and ## (level 2) headings
-            if heading_level <= 2:
-                last_main_title = heading_text
+    # The generated header comes first, so a leading --- of the source is a
+    # slide separator, not a front matter
+    classifier = LineClassifier(front_matter=False)
+    
+    for block in blocks:
+        position = 0
+        for start, end, kind, heading_level in markers(block, classifier=classifier):
+            if kind == HEADING:
+                # Only track # (level 1) and ## (level 2) headings
+                if heading_level <= 2:
+                    last_main_title = block[start:end].strip()
+                
+                # Add HTML elements after the first heading of the slide
+                if elements and not slide_has_elements:
+                    yield block[position:end]
+                    yield '\n' + elements
+                    position = end
+                    slide_has_elements = True
             
-            processed_lines.append(line)
-        
-        # Check if this is a slide break marker (----)
-        elif line.strip() == '----':
-            # Replace ---- with --- (standard Marp slide separator)
-            processed_lines.append('---')
-            processed_lines.append('')
+            # Check if this is a slide break marker (----)
+            elif slide_breaks and kind == SLIDE_BREAK:
+                # Replace ---- with --- (standard Marp slide separator)
+                yield block[position:start]
+                yield '---\n'
+                position = end
+                slide_has_elements = False
+                
+                # Copy only the last main title (# or ##) to the new slide
+                if last_main_title:
+                    yield '\n' + last_main_title
+                    if elements:
+                        yield '\n' + elements
+                        slide_has_elements = True
+                    yield '\n'
             
-            # Copy only the last main title (# or ##) to the new slide
-            if last_main_title:
-                processed_lines.append(last_main_title)
-                processed_lines.append('')
+            # Any other rule (or an unprocessed ----) is a Marp separator and starts a new slide
+            elif kind in (RULE, SLIDE_BREAK):
+                slide_has_elements = False
         
-        else:
-            processed_lines.append(line)
-        
-        i += 1
-    
-    return '\n'.join(processed_lines)
+        yield block[position:]
 
-def add_marp_header(content: str, theme: str = None, logo_left: str = None, 
-                   logo_right: str = None, background: str = None, 
-                   header_text: str = None, footer_text: str = None,
-                   marp_slides_dir: str = None) -> str:
-    """Add Marp header to Markdown content"""
+def process_slide_breaks(content: str) -> str:
+    """Process slide break markers (----) and copy the last section title to new slides"""
+    return ''.join(transform_slide_blocks([content]))
+
+def build_marp_header(theme: str = None, logo_left: str = None, 
+                      logo_right: str = None, background: str = None, 
+                      header_text: str = None, footer_text: str = None,
+                      marp_slides_dir: str = None) -> str:
+    """Build the Marp front matter (theme, logo, background, header and footer styles)"""
     marp_header = "---\nmarp: true\n"
     
     if theme:
@@ -147,67 +213,44 @@ def add_marp_header(content: str, theme: str = None, logo_left: str = None,
     
     marp_header += "---\n\n"
     
-    # First, process slide breaks (---- markers)
-    processed_content = process_slide_breaks(content)
-    
-    # Then, process content to add HTML elements for logos, headers, and footers
-    if logo_left or logo_right or header_text or footer_text:
-        processed_content = add_data_attributes(processed_content, header_text, footer_text, logo_left, logo_right)
+    return marp_header
+
+def add_marp_header(content: str, theme: str = None, logo_left: str = None, 
+                   logo_right: str = None, background: str = None, 
+                   header_text: str = None, footer_text: str = None,
+                   marp_slides_dir: str = None) -> str:
+    """Add Marp header to Markdown content"""
+    marp_header = build_marp_header(theme, logo_left, logo_right, background, header_text, footer_text, marp_slides_dir)
+    elements = build_slide_elements(header_text, footer_text, logo_left, logo_right)
     
-    return marp_header + processed_content
+    return marp_header + ''.join(transform_slide_blocks([content], elements))
 
 def add_data_attributes(content: str, header_text: str = None, footer_text: str = None, logo_left: str = None, logo_right: str = None) -> str:
     """Add HTML elements for logos, headers, and footers to slide content"""
-    import re
+    elements = build_slide_elements(header_text, footer_text, logo_left, logo_right)
     
-    # Split content by slide separators (---)
-    slides = content.split('\n---\n')
-    processed_slides = []
-    
-    for i, slide in enumerate(slides):
-        if not slide.strip():
-            processed_slides.append(slide)
-            continue
-            
-        # Add HTML elements at the beginning of each slide
-        lines = slide.split('\n')
-        
-        # Find the first heading and add elements after it
-        for j, line in enumerate(lines):
-            if line.strip().startswith('#'):
-                # Add HTML elements after the heading
-                elements = []
-                
-                # Add separate logos (not part of header)
-                if logo_left:
-                    elements.append('<div class="logo-left"></div>')
-                
-                if logo_right:
-                    elements.append('<div class="logo-right"></div>')
-                
-                # Add header at the very top
-                if header_text:
-                    elements.append(f'<div class="header-text">{header_text}</div>')
-                
-                # Add footer at the very bottom
-                if footer_text:
-                    elements.append(f'<div class="footer-text">{footer_text}</div>')
-                
-                if elements:
-                    # Insert elements after the heading
-                    lines.insert(j + 1, ''.join(elements))
-                break
-        
-        processed_slides.append('\n'.join(lines))
-    
-    return '\n---\n'.join(processed_slides)
+    return ''.join(transform_slide_blocks([content], elements, slide_breaks=False))
+
+def write_marp_file(source_file, marp_file, marp_header: str, elements: str = '') -> None:
+    """Stream a Markdown file into a Marp file block by block"""
+    with open(source_file, 'r', encoding='utf-8') as src, open(marp_file, 'w', encoding='utf-8') as dst:
+        dst.write(marp_header)
+        dst.writelines(transform_slide_blocks(iter_source_blocks(src), elements))
+
+def marp_fingerprint(cache: BuildCache, source_file, header_options) -> str:
+    """Fingerprint of the inputs a Marp file is built from (source + header options)"""
+    return cache.fingerprint(Path(__file__), Path(md_lines.__file__), Path(source_file), *header_options)
 
 def convert_md_to_marp(md_src_dir: str, marp_slides_dir: str, theme: str = None, 
                       style_css: str = None, programa_file: str = None, 
                       logo_left: str = None, logo_right: str = None, 
                       background: str = None, header_text: str = None, 
-                      footer_text: str = None) -> List[str]:
-    """Convert Markdown files to Marp format"""
+                      footer_text: str = None, cache: Optional[BuildCache] = None) -> List[str]:
+    """Convert Markdown files to Marp format
+
+    When a build cache is given, files whose source and header options are
+    unchanged since the last build are not rewritten
+    """
     
     md_src_path = Path(md_src_dir)
     if not md_src_path.exists():
@@ -227,19 +270,31 @@ def convert_md_to_marp(md_src_dir: str, marp_slides_dir: str, theme: str = None,
     
     converted_files = []
     
+    # Options that end up in every generated header
+    header_options = (theme, logo_left, logo_right, background, header_text, footer_text, str(marp_slides_path))
+    
+    # The header and slide elements are the same for every file
+    marp_header = build_marp_header(theme, logo_left, logo_right, background, header_text, footer_text, str(marp_slides_path))
+    elements = build_slide_elements(header_text, footer_text, logo_left, logo_right)
+    
     for md_file in md_files:
         try:
-            # Read file content
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            marp_file = marp_slides_path / md_file.name
             
-            # Add Marp header
-            marp_content = add_marp_header(content, theme, logo_left, logo_right, background, header_text, footer_text, str(marp_slides_path))
+            if cache:
+                with span("cache", md_file):
+                    fingerprint = marp_fingerprint(cache, md_file, header_options)
+                if cache.is_fresh(marp_file, fingerprint):
+                    converted_files.append(str(marp_file))
+                    print(f"⏭️  Up to date: {md_file.name}")
+                    continue
             
-            # Create Marp file
-            marp_file = marp_slides_path / md_file.name
-            with open(marp_file, 'w', encoding='utf-8') as f:
-                f.write(marp_content)
+            # Create Marp file (header + transformed slides, streamed)
+            with span("slides", md_file):
+                write_marp_file(md_file, marp_file, marp_header, elements)
+            
+            if cache:
+                cache.record(marp_file, fingerprint)
             
             converted_files.append(str(marp_file))
             print(f"✓ Converted: {md_file.name} -> {marp_file.name}")
@@ -252,14 +307,21 @@ def convert_md_to_marp(md_src_dir: str, marp_slides_dir: str, theme: str = None,
         programa_path = Path(programa_file)
         if programa_path.exists():
             try:
-                with open(programa_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                programa_marp = marp_slides_path / programa_path.name
                 
-                marp_content = add_marp_header(content, theme, logo_left, logo_right, background, header_text, footer_text, str(marp_slides_path))
+                if cache:
+                    with span("cache", programa_path):
+                        fingerprint = marp_fingerprint(cache, programa_path, header_options)
+                    if cache.is_fresh(programa_marp, fingerprint):
+                        converted_files.append(str(programa_marp))
+                        print(f"⏭️  Up to date: {programa_path.name}")
+                        return converted_files
                 
-                programa_marp = marp_slides_path / programa_path.name
-                with open(programa_marp, 'w', encoding='utf-8') as f:
-                    f.write(marp_content)
+                with span("slides", programa_path):
+                    write_marp_file(programa_path, programa_marp, marp_header, elements)
+                
+                if cache:
+                    cache.record(programa_marp, fingerprint)
                 
                 converted_files.append(str(programa_marp))
                 print(f"✓ Converted program: {programa_path.name} -> {programa_marp.name}")
@@ -285,6 +347,8 @@ def main():
     parser.add_argument("--header", help="Header text (appears at the top)")
     parser.add_argument("--footer", help="Footer text (appears at the bottom)")
     parser.add_argument("--project-dir", help="Project directory (default: script parent directory)")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate every file, ignoring the build cache")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
@@ -326,39 +390,46 @@ def main():
         if not Path(style_css).exists():
             style_css = None
     
-    try:
-        # Convert Markdown files to Marp
-        marp_files = convert_md_to_marp(
-            str(md_src_path), 
-            str(marp_slides_path), 
-            args.theme,
-            style_css,
-            programa_file,
-            args.logo_left,
-            args.logo_right,
-            args.background,
-            args.header,
-            args.footer
-        )
-        
-        if marp_files:
-            print(f"\n🎉 Conversion completed!")
-            print(f"Generated Marp files: {len(marp_files)}")
-            print(f"Marp directory: {Path(marp_files[0]).parent}")
-        else:
-            print("❌ Could not generate Marp files")
+    cache = open_cache(project_dir, not args.no_cache)
+    
+    with profile_session(args):
+        try:
+            # Convert Markdown files to Marp
+            marp_files = convert_md_to_marp(
+                str(md_src_path), 
+                str(marp_slides_path), 
+                args.theme,
+                style_css,
+                programa_file,
+                args.logo_left,
+                args.logo_right,
+                args.background,
+                args.header,
+                args.footer,
+                cache
+            )
+            
+            if cache:
+                cache.save()
+            
+            if marp_files:
+                print(f"\n🎉 Conversion completed!")
+                print(f"Generated Marp files: {len(marp_files)}")
+                print(f"Marp directory: {Path(marp_files[0]).parent}")
+            else:
+                print("❌ Could not generate Marp files")
+                return 1
+            
+            print("\n📝 Next steps:")
+            print("1. Review files in marp_slides/")
+            print("2. Run: ./scripts/marp_tools.sh convert")
+            print("3. Or use: ./scripts/marp_tools.sh watch")
+            
+            return 0
+            
+        except Exception as e:
+            print(f"Error: {e}")
             return 1
-        
-        print("\n📝 Next steps:")
-        print("1. Review files in marp_slides/")
-        print("2. Run: ./scripts/marp_tools.sh convert")
-        print("3. Or use: ./scripts/marp_tools.sh watch")
-        
-        return 0
-        
-    except Exception as e:
-        print(f"Error: {e}")
-        return 1
 
 if __name__ == "__main__":
     exit(main())
@@ -4,15 +4,36 @@ Script to convert markdown source files to PDF documents (A4 format)
 Processes files from md_src/ and generates pdf_docs/
 Ignores slide breaks (----) and creates continuous documents
 Uses a4-docs-theme.css for styling
+Long documents can be rendered in chunks split at their top-level headings
+(--chunked) to bound WeasyPrint's memory use, see chunked_pdf.py
 """
 
 import os
 import sys
 import argparse
-import markdown
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 import re
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
+
+import chunked_pdf
+import md_lines
+import slide_ast
+from build_cache import open_cache
+from image_assets import doc_images_base
+from markdown_converter import get_markdown
+from md_lines import FRONT_MATTER, RULE, SLIDE_BREAK, remove_lines
+from pdf_backends import backend_chain, backend_names, get_backend, preferred_backend, render_pdf, theme_backend
+from pdf_renderer import build_html_document
+from profiling import active, add_profile_arguments, enable, file_scope, profile_session, span
+from slide_ast import SlideAstCache
+from convert_program_to_pdf import convert_program_to_pdf
+
+# Source lines dropped from the A4 documents (see md_lines.py)
+DOC_REMOVED_LINES = (SLIDE_BREAK, RULE, FRONT_MATTER)
 
 def find_docs_css(scripts_dir):
     """Find a4-docs-theme.css file in scripts directory"""
@@ -112,25 +133,51 @@ hr { display: none; }
 """
 
 def remove_slide_breaks(content):
-    """Remove slide break markers (----) from markdown content"""
-    # Remove horizontal rules that are slide breaks
-    # This removes lines that contain only dashes and optional whitespace
-    lines = content.split('\n')
-    filtered_lines = []
-    
-    for line in lines:
-        # Check if line is only dashes and whitespace (slide break)
-        stripped = line.strip()
-        if stripped and all(c == '-' for c in stripped) and len(stripped) >= 3:
-            # This is a slide break, skip it
-            continue
-        else:
-            filtered_lines.append(line)
+    """Remove slide break markers (----), other dash rules and the front matter from markdown content
+
+    Dash lines inside fenced code blocks are kept
+    """
+    return remove_lines(content, DOC_REMOVED_LINES)
+
+def load_docs_css(scripts_dir):
+    """Return the document CSS text (a4-docs-theme.css or the default styling)"""
+    docs_css_path = find_docs_css(Path(scripts_dir))
+    
+    if docs_css_path:
+        with open(docs_css_path, 'r', encoding='utf-8') as f:
+            return f.read()
     
-    return '\n'.join(filtered_lines)
+    return get_default_docs_css()
+
+def doc_fingerprint(cache, md_file_path, scripts_dir, chunked=False, backend=None):
+    """Fingerprint of the inputs a document PDF is built from (source, CSS, A4 images, chunking, backend)
 
-def convert_md_to_pdf_doc(md_file_path, output_dir, scripts_dir, verbose=False):
-    """Convert a single MD file to PDF document format"""
+    The backend part is the engine the document is rendered with when
+    nothing fails, so installing a preferred backend renders it again
+    """
+    images_base = doc_images_base(Path(md_file_path).parent.parent)
+    return cache.fingerprint(Path(__file__), Path(md_lines.__file__), Path(slide_ast.__file__), Path(md_file_path),
+                             find_docs_css(Path(scripts_dir)),
+                             images_base / "images" if images_base else None,
+                             chunked and chunked_pdf.CHUNK_CHARS, preferred_backend(backend))
+
+def convert_md_to_pdf_doc(md_file_path, output_dir, scripts_dir, verbose=False, cache=None, renderer=None,
+                          chunked=False, chunk_executor=None, backend=None, ast_cache=None):
+    """Convert a single MD file to PDF document format
+
+    When a build cache is given, the PDF is left untouched if the source file
+    and the document CSS are unchanged since the last build; a PDF rendered
+    by a fallback backend is not recorded, so it is rendered again
+    Documents are rendered by the PDF backend named by backend (see
+    pdf_backends.py); WeasyPrint uses the shared PdfRenderer (the
+    process-wide one unless renderer is given)
+    With chunked=True a long document is laid out in chunks split at its
+    top-level headings and stitched, in the worker processes of
+    chunk_executor when given (WeasyPrint only)
+    The HTML body is kept in ast_cache (see slide_ast.py; by default the
+    presentation's .slide-ast/ when a build cache is given), so an unchanged
+    source is not parsed and converted again
+    """
     
     md_file_path = Path(md_file_path)
     output_dir = Path(output_dir)
@@ -146,129 +193,156 @@ def convert_md_to_pdf_doc(md_file_path, output_dir, scripts_dir, verbose=False):
     output_filename = md_file_path.stem + ".pdf"
     output_path = output_dir / output_filename
     
+    fingerprint = None
+    if cache:
+        with span("cache", md_file_path):
+            fingerprint = doc_fingerprint(cache, md_file_path, scripts_dir, chunked, backend)
+        if cache.is_fresh(output_path, fingerprint):
+            if verbose:
+                print(f"⏭️  Up to date: {output_path}")
+            return True
+    
     if verbose:
         print(f"Converting {md_file_path} to {output_path}")
     
+    if ast_cache is None:
+        ast_cache = SlideAstCache.for_presentation(md_file_path.parent.parent, cache is not None)
+    
+    used_backend = _render_md_doc(md_file_path, output_path, scripts_dir, verbose, renderer, chunked,
+                                  chunk_executor, backend, ast_cache)
+    if used_backend and cache and used_backend == preferred_backend(backend):
+        cache.record(output_path, fingerprint)
+    return used_backend is not None
+
+def _render_md_doc(md_file_path, output_path, scripts_dir, verbose=False, renderer=None, chunked=False,
+                   chunk_executor=None, backend=None, ast_cache=None) -> Optional[str]:
+    """Render a MD file to output_path, returning the backend that rendered it (None on failure)"""
+    docs_css_path = find_docs_css(scripts_dir)
+    
     # Read markdown content
-    with open(md_file_path, 'r', encoding='utf-8') as f:
-        markdown_content = f.read()
+    with span("read", md_file_path):
+        with open(md_file_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
     
-    # Remove slide breaks
-    markdown_content = remove_slide_breaks(markdown_content)
+    # Convert markdown without slide breaks to HTML (shared converter, reset
+    # between documents; cached by content, parsed into slides on a miss)
+    with span("markdown", md_file_path):
+        html_content, _ = ast_cache.doc_html(markdown_content)
     
     if verbose:
         print("  ✓ Slide breaks removed")
     
-    # Convert markdown to HTML
-    md = markdown.Markdown(extensions=[
-        'extra',           # Tables, footnotes, etc.
-        'codehilite',      # Syntax highlighting
-        'toc',             # Table of contents
-        'attr_list',       # Attribute lists
-        'def_list',        # Definition lists
-        'abbr',            # Abbreviations
-        'footnotes',       # Footnotes
-        'md_in_html'       # Markdown inside HTML
-    ])
-    
-    html_content = md.convert(markdown_content)
-    
-    # Find and load CSS
-    docs_css_path = find_docs_css(scripts_dir)
-    
+    # Load CSS
     if docs_css_path and verbose:
         print(f"  ✓ Using CSS from: {docs_css_path}")
     elif verbose:
         print("  ✓ Using default CSS styling")
     
-    if docs_css_path:
-        with open(docs_css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-    else:
-        css_content = get_default_docs_css()
-    
-    # Create complete HTML document
-    html_document = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{md_file_path.stem}</title>
-    <style>
-        {css_content}
-    </style>
-</head>
-<body>
-    {html_content}
-</body>
-</html>"""
-    
-    # Convert HTML to PDF using weasyprint
+    with span("css", md_file_path):
+        css_content = load_docs_css(scripts_dir)
+    
+    # Create complete HTML document (the stylesheet is parsed once by the renderer)
+    html_document = build_html_document(html_content, md_file_path.stem, "es")
+    
+    # Chunks are laid out by WeasyPrint (page counts, @page counters)
+    sections = [html_content]
+    if chunked and chunked_pdf.available() and backend_chain(backend)[:1] == ["weasyprint"]:
+        sections = chunked_pdf.split_sections(html_content)
+    
+    # Convert HTML to PDF (through the selected backend, weasyprint by default)
     try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
-        
-        font_config = FontConfiguration()
-        
-        # Create HTML object
-        html_obj = HTML(string=html_document)
-        
-        # Generate PDF
-        html_obj.write_pdf(
-            str(output_path),
-            font_config=font_config,
-            optimize_images=True
-        )
+        # images/... resolve to the A4-sized variants built by image_assets.py
+        images_base = doc_images_base(md_file_path.parent.parent)
+        base_url = str(images_base) + "/" if images_base else None
+        with file_scope(md_file_path):
+            if len(sections) > 1:
+                chunked_pdf.write_chunks(
+                    [build_html_document(section, md_file_path.stem, "es") for section in sections],
+                    output_path, css_content, base_url, renderer=renderer, executor=chunk_executor
+                )
+                used_backend = "weasyprint"
+                if verbose:
+                    print(f"  ✓ Rendered in {len(sections)} chunks")
+            else:
+                used_backend = render_pdf(html_document, output_path, css_content, base_url, backend, renderer)
         
         if verbose:
-            print(f"  ✓ PDF generated successfully: {output_path}")
+            print(f"  ✓ PDF generated successfully with {used_backend}: {output_path}")
         
-        return True
-        
-    except ImportError:
-        print("Error: weasyprint is not installed.")
-        print("Please install it with: pip install weasyprint")
-        print("Alternative: pip install pdfkit (requires wkhtmltopdf)")
-        return False
+        return used_backend
         
     except Exception as e:
-        print(f"Error generating PDF with weasyprint: {e}")
-        
-        # Fallback to pdfkit if weasyprint fails
+        print(f"Error generating PDF: {e}")
+        return None
+
+def _init_worker(scripts_dir, profile=False, backends=(None,)):
+    """Warm the per-process Markdown converter and PDF backends (fonts, parsed CSS, process) once"""
+    if profile:
+        enable()
+    get_markdown()
+    warmed = set()
+    for backend in backends:
         try:
-            import pdfkit
-            
-            options = {
-                'page-size': 'A4',
-                'margin-top': '2.5cm',
-                'margin-right': '2.5cm',
-                'margin-bottom': '2.5cm',
-                'margin-left': '2.5cm',
-                'encoding': "UTF-8",
-                'no-outline': None,
-                'enable-local-file-access': None
-            }
-            
-            pdfkit.from_string(html_document, str(output_path), options=options)
-            
-            if verbose:
-                print(f"  ✓ PDF generated successfully using pdfkit: {output_path}")
-            
-            return True
-            
-        except ImportError:
-            print("Error: Neither weasyprint nor pdfkit is available.")
-            print("Please install one of them:")
-            print("  pip install weasyprint")
-            print("  pip install pdfkit (requires wkhtmltopdf)")
-            return False
-            
-        except Exception as e2:
-            print(f"Error with pdfkit fallback: {e2}")
-            return False
+            for name in backend_chain(backend)[:1]:
+                if name not in warmed:
+                    warmed.add(name)
+                    get_backend(name).warm(load_docs_css(scripts_dir))
+        except Exception:
+            # Reported per file by convert_md_to_pdf_doc
+            pass
+
+def doc_worker_pool(jobs, scripts_dir=None, backends=(None,)) -> ProcessPoolExecutor:
+    """Process pool whose workers have the converter and PDF backends warmed up
+
+    backends are the --pdf-backend values the pool renders with (e.g. one
+    per theme); the engine each of them renders with is warmed
+    Spans recorded in the workers are returned with each result when
+    profiling is enabled in the parent at creation time. Workers are started
+    from a fork server where available: the pool launches them on its first
+    submit, often from a build thread, and a fork then could inherit an
+    import or renderer lock held by another thread
+    """
+    scripts_dir = scripts_dir or Path(__file__).parent
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+    else:
+        mp_context = None
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=_init_worker,
+                               initargs=(scripts_dir, active() is not None, tuple(backends)))
+
+def _convert_in_worker(md_file, pdf_docs_dir, scripts_dir, verbose, chunked=False, backend=None,
+                       ast_cache_dir=None):
+    """Convert one file in a worker process, returning (backend used or None, error message, profile spans)
 
-def convert_all_md_files(theme_path, verbose=False):
-    """Convert all MD files from md_src to pdf_docs"""
+    The parent process checked the build cache and records the result
+    """
+    output_path = Path(pdf_docs_dir) / f"{Path(md_file).stem}.pdf"
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if verbose:
+            print(f"Converting {md_file} to {output_path}")
+        result = _render_md_doc(Path(md_file), output_path, Path(scripts_dir), verbose, chunked=chunked,
+                                backend=backend, ast_cache=SlideAstCache(ast_cache_dir)), None
+    except Exception as e:
+        result = None, str(e)
+    
+    profiler = active()
+    return result + (profiler.drain() if profiler else [],)
+
+def convert_all_md_files(theme_path, verbose=False, use_cache=True, jobs=1, executor: Executor = None,
+                         chunked=False, backend=None):
+    """Convert all MD files from md_src to pdf_docs
+
+    With jobs > 1 the files are rendered in a pool of worker processes;
+    results are reported in file order so the summary is deterministic
+    With executor (a doc_worker_pool shared by several themes) the files
+    are rendered there instead of in a pool owned by this call
+    With chunked=True long files are rendered in chunks (see
+    convert_md_to_pdf_doc); the chunks of a file are spread over the
+    worker processes when files are converted one at a time
+    backend names the PDF backend (see pdf_backends.py; default: the theme's
+    DEFAULT_PDF_BACKEND, else $PDF_BACKEND or auto)
+    """
     
     theme_path = Path(theme_path)
     md_src_dir = theme_path / "presentation" / "md_src"
@@ -296,18 +370,86 @@ def convert_all_md_files(theme_path, verbose=False):
     success_count = 0
     total_files = len(md_files)
     
-    for md_file in md_files:
-        try:
-            success = convert_md_to_pdf_doc(
-                md_file, 
-                pdf_docs_dir, 
-                scripts_dir, 
-                verbose
-            )
-            if success:
-                success_count += 1
-        except Exception as e:
-            print(f"Error converting {md_file.name}: {e}")
+    cache = open_cache(theme_path, use_cache)
+    ast_cache = SlideAstCache.for_presentation(theme_path / "presentation", cache is not None)
+    backend = theme_backend(theme_path, backend)
+    preferred = preferred_backend(backend)
+    
+    # A single file still spreads its chunks over the requested workers
+    chunk_jobs = jobs or os.cpu_count() or 1
+    jobs = max(1, min(chunk_jobs, total_files))
+    
+    if jobs == 1 and executor is None:
+        if chunked and chunk_jobs > 1:
+            chunk_pool = doc_worker_pool(chunk_jobs, scripts_dir, [backend])
+        else:
+            chunk_pool = nullcontext(None)
+        with chunk_pool as chunk_executor:
+            for md_file in md_files:
+                try:
+                    success = convert_md_to_pdf_doc(
+                        md_file, 
+                        pdf_docs_dir, 
+                        scripts_dir, 
+                        verbose,
+                        cache,
+                        chunked=chunked,
+                        chunk_executor=chunk_executor,
+                        backend=backend,
+                        ast_cache=ast_cache
+                    )
+                    if success:
+                        success_count += 1
+                except Exception as e:
+                    print(f"Error converting {md_file.name}: {e}")
+    else:
+        # Up-to-date files are resolved here; only stale ones go to the pool
+        pending = []
+        for md_file in md_files:
+            fingerprint = None
+            if cache:
+                fingerprint = doc_fingerprint(cache, md_file, scripts_dir, chunked, backend)
+                if cache.is_fresh(pdf_docs_dir / f"{md_file.stem}.pdf", fingerprint):
+                    if verbose:
+                        print(f"⏭️  Up to date: {pdf_docs_dir / f'{md_file.stem}.pdf'}")
+                    success_count += 1
+                    continue
+            pending.append((md_file, fingerprint))
+        
+        if pending:
+            profiler = active()
+            if executor is None:
+                pool = doc_worker_pool(min(jobs, len(pending)), scripts_dir, [backend])
+            else:
+                pool = nullcontext(executor)
+            with pool as doc_executor:
+                results = doc_executor.map(
+                    _convert_in_worker,
+                    [md_file for md_file, _ in pending],
+                    [pdf_docs_dir] * len(pending),
+                    [scripts_dir] * len(pending),
+                    [verbose] * len(pending),
+                    [chunked] * len(pending),
+                    [backend] * len(pending),
+                    [ast_cache.cache_dir] * len(pending)
+                )
+                
+                for (md_file, fingerprint), (used_backend, error, spans) in zip(pending, results):
+                    if profiler:
+                        profiler.merge(spans)
+                    if error is not None:
+                        print(f"Error converting {md_file.name}: {error}")
+                    elif used_backend:
+                        success_count += 1
+                        # Fallback renders are not recorded (see convert_md_to_pdf_doc)
+                        if cache and used_backend == preferred:
+                            cache.record(pdf_docs_dir / f"{md_file.stem}.pdf", fingerprint)
+    
+    if cache:
+        cache.save()
+    
+    # Stored HTML nobody built from in a while
+    ast_cache.prune()
     
     print(f"\nConversion completed: {success_count}/{total_files} files successful")
     
@@ -326,6 +468,9 @@ Examples:
   %(prog)s themes/example
   %(prog)s themes/fine-tuning --verbose
   %(prog)s themes/my-theme -v
+  %(prog)s themes/example --with-program
+  %(prog)s themes/fine-tuning --jobs 8
+  %(prog)s themes/fine-tuning --chunked --jobs 4
         """
     )
     
@@ -340,24 +485,72 @@ Examples:
         help='Enable verbose output'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Regenerate every PDF, ignoring the build cache'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes rendering documents (0 = CPU count, default: 1)'
+    )
+    
+    parser.add_argument(
+        '--chunked',
+        action='store_true',
+        help='Render long documents in chunks split at top-level headings (bounded memory, needs pikepdf or pypdf)'
+    )
+    
+    parser.add_argument(
+        '--pdf-backend',
+        choices=backend_names(),
+        help='HTML -> PDF engine (default: DEFAULT_PDF_BACKEND of marp.config.sh, $PDF_BACKEND or auto, the first installed of weasyprint, wkhtmltopdf, pdfkit, xhtml2pdf)'
+    )
+    
+    parser.add_argument(
+        '--with-program',
+        action='store_true',
+        help='Also convert program.md to program.pdf in the same process (shared renderer)'
+    )
+    
+    add_profile_arguments(parser)
+    
     args = parser.parse_args()
     
-    try:
-        success = convert_all_md_files(
-            theme_path=args.theme_path,
-            verbose=args.verbose
-        )
-        
-        if success:
-            print("✅ All conversions completed successfully!")
-            sys.exit(0)
-        else:
-            print("❌ Some conversions failed!")
-            sys.exit(1)
+    with profile_session(args):
+        try:
+            success = True
             
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
+            if args.with_program:
+                success = convert_program_to_pdf(
+                    theme_path=args.theme_path,
+                    verbose=args.verbose,
+                    use_cache=not args.no_cache,
+                    backend=args.pdf_backend
+                )
+            
+            success = convert_all_md_files(
+                theme_path=args.theme_path,
+                verbose=args.verbose,
+                use_cache=not args.no_cache,
+                jobs=args.jobs,
+                chunked=args.chunked,
+                backend=args.pdf_backend
+            ) and success
+            
+            if success:
+                print("✅ All conversions completed successfully!")
+                sys.exit(0)
+            else:
+                print("❌ Some conversions failed!")
+                sys.exit(1)
+                
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
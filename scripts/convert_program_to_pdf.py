@@ -8,10 +8,15 @@ Supports theme-specific styling via program.css files
 import os
 import sys
 import argparse
-import markdown
 from pathlib import Path
 from datetime import datetime
 
+from build_cache import open_cache
+from markdown_converter import convert_markdown
+from pdf_backends import backend_names, preferred_backend, render_pdf, theme_backend
+from pdf_renderer import build_html_document
+from profiling import add_profile_arguments, file_scope, profile_session, span
+
 def find_program_css(theme_path):
     """Find program.css file in theme directory"""
     css_locations = [
@@ -274,8 +279,17 @@ a:hover {
 }
 """
 
-def convert_program_to_pdf(theme_path, output_path=None, verbose=False):
-    """Convert program.md to PDF using theme-specific styling"""
+def convert_program_to_pdf(theme_path, output_path=None, verbose=False, use_cache=True, renderer=None, backend=None):
+    """Convert program.md to PDF using theme-specific styling
+
+    The PDF is left untouched if program.md and program.css are unchanged
+    since the last build (unless use_cache is False); a PDF rendered by a
+    fallback backend is not recorded, so it is rendered again
+    The document is rendered by the PDF backend named by backend (see
+    pdf_backends.py; default: the theme's DEFAULT_PDF_BACKEND, else
+    $PDF_BACKEND or auto); WeasyPrint uses the shared PdfRenderer (the
+    process-wide one unless renderer is given)
+    """
     
     theme_path = Path(theme_path)
     program_md_path = theme_path / "program.md"
@@ -289,120 +303,65 @@ def convert_program_to_pdf(theme_path, output_path=None, verbose=False):
     else:
         output_path = Path(output_path)
     
+    # Find CSS (part of the inputs the cached PDF depends on)
+    program_css_path = find_program_css(theme_path)
+    
+    backend = theme_backend(theme_path, backend)
+    cache = open_cache(theme_path, use_cache)
+    fingerprint = None
+    if cache:
+        with span("cache", program_md_path):
+            fingerprint = cache.fingerprint(Path(__file__), program_md_path, program_css_path,
+                                            preferred_backend(backend))
+        if cache.is_fresh(output_path, fingerprint):
+            print(f"⏭️  Up to date: {output_path}")
+            return True
+    
     if verbose:
         print(f"Converting {program_md_path} to {output_path}")
     
     # Read markdown content
-    with open(program_md_path, 'r', encoding='utf-8') as f:
-        markdown_content = f.read()
+    with span("read", program_md_path):
+        with open(program_md_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
     
-    # Convert markdown to HTML
-    md = markdown.Markdown(extensions=[
-        'extra',           # Tables, footnotes, etc.
-        'codehilite',      # Syntax highlighting
-        'toc',             # Table of contents
-        'attr_list',       # Attribute lists
-        'def_list',        # Definition lists
-        'abbr',            # Abbreviations
-        'footnotes',       # Footnotes
-        'md_in_html'       # Markdown inside HTML
-    ])
-    
-    html_content = md.convert(markdown_content)
-    
-    # Find and load CSS
-    program_css_path = find_program_css(theme_path)
+    # Convert markdown to HTML (shared converter, reset between documents)
+    with span("markdown", program_md_path):
+        html_content = convert_markdown(markdown_content)
     
+    # Load CSS
     if program_css_path and verbose:
         print(f"Using CSS from: {program_css_path}")
     elif verbose:
         print("Using default CSS styling")
     
-    if program_css_path:
-        with open(program_css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-    else:
-        css_content = get_default_css()
+    with span("css", program_md_path):
+        if program_css_path:
+            with open(program_css_path, 'r', encoding='utf-8') as f:
+                css_content = f.read()
+        else:
+            css_content = get_default_css()
     
-    # Create complete HTML document
-    html_document = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Course Program</title>
-    <style>
-        {css_content}
-    </style>
-</head>
-<body>
-    {html_content}
-</body>
-</html>"""
+    # Create complete HTML document (the stylesheet is parsed once by the renderer)
+    html_document = build_html_document(html_content, "Course Program", "en")
     
-    # Convert HTML to PDF using weasyprint
+    # Convert HTML to PDF (through the selected backend, weasyprint by default)
     try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
+        with file_scope(program_md_path):
+            used_backend = render_pdf(html_document, output_path, css_content, backend=backend, renderer=renderer)
         
-        font_config = FontConfiguration()
-        
-        # Create HTML object
-        html_obj = HTML(string=html_document)
-        
-        # Generate PDF
-        html_obj.write_pdf(
-            str(output_path),
-            font_config=font_config,
-            optimize_images=True
-        )
+        if cache and used_backend == preferred_backend(backend):
+            cache.record(output_path, fingerprint)
+            cache.save()
         
         if verbose:
-            print(f"PDF generated successfully: {output_path}")
+            print(f"PDF generated successfully with {used_backend}: {output_path}")
         
         return True
         
-    except ImportError:
-        print("Error: weasyprint is not installed.")
-        print("Please install it with: pip install weasyprint")
-        print("Alternative: pip install pdfkit (requires wkhtmltopdf)")
-        return False
-        
     except Exception as e:
         print(f"Error generating PDF: {e}")
-        
-        # Fallback to pdfkit if weasyprint fails
-        try:
-            import pdfkit
-            
-            options = {
-                'page-size': 'A4',
-                'margin-top': '2.5cm',
-                'margin-right': '2.5cm',
-                'margin-bottom': '2.5cm',
-                'margin-left': '2.5cm',
-                'encoding': "UTF-8",
-                'no-outline': None,
-                'enable-local-file-access': None
-            }
-            
-            pdfkit.from_string(html_document, str(output_path), options=options)
-            
-            if verbose:
-                print(f"PDF generated successfully using pdfkit: {output_path}")
-            
-            return True
-            
-        except ImportError:
-            print("Error: Neither weasyprint nor pdfkit is available.")
-            print("Please install one of them:")
-            print("  pip install weasyprint")
-            print("  pip install pdfkit (requires wkhtmltopdf)")
-            return False
-            
-        except Exception as e2:
-            print(f"Error with pdfkit fallback: {e2}")
-            return False
+        return False
 
 def main():
     """Main function"""
@@ -414,17 +373,19 @@ Examples:
   %(prog)s themes/example
   %(prog)s themes/fine-tuning --output /tmp/program.pdf
   %(prog)s themes/my-theme --verbose
+  %(prog)s themes/example themes/fine-tuning
         """
     )
     
     parser.add_argument(
         'theme_path',
-        help='Path to theme directory containing program.md'
+        nargs='+',
+        help='Path to theme directory containing program.md (several themes share one renderer)'
     )
     
     parser.add_argument(
         '-o', '--output',
-        help='Output PDF path (default: theme_path/program.pdf)'
+        help='Output PDF path (default: theme_path/program.pdf, single theme only)'
     )
     
     parser.add_argument(
@@ -433,25 +394,48 @@ Examples:
         help='Enable verbose output'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Regenerate the PDF, ignoring the build cache'
+    )
+    
+    parser.add_argument(
+        '--pdf-backend',
+        choices=backend_names(),
+        help='HTML -> PDF engine (default: DEFAULT_PDF_BACKEND of marp.config.sh, $PDF_BACKEND or auto, the first installed of weasyprint, wkhtmltopdf, pdfkit, xhtml2pdf)'
+    )
+    
+    add_profile_arguments(parser)
+    
     args = parser.parse_args()
     
-    try:
-        success = convert_program_to_pdf(
-            theme_path=args.theme_path,
-            output_path=args.output,
-            verbose=args.verbose
-        )
-        
-        if success:
-            print("Conversion completed successfully!")
-            sys.exit(0)
-        else:
-            print("Conversion failed!")
-            sys.exit(1)
+    if args.output and len(args.theme_path) > 1:
+        parser.error("--output can only be used with a single theme")
+    
+    with profile_session(args):
+        try:
+            # All programs go through the same backend (fonts and CSS loaded once)
+            success = True
+            for theme_path in args.theme_path:
+                success = convert_program_to_pdf(
+                    theme_path=theme_path,
+                    output_path=args.output,
+                    verbose=args.verbose,
+                    use_cache=not args.no_cache,
+                    backend=args.pdf_backend
+                ) and success
             
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
+            if success:
+                print("Conversion completed successfully!")
+                sys.exit(0)
+            else:
+                print("Conversion failed!")
+                sys.exit(1)
+                
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
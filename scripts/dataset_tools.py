@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Tools for the chat-format fine-tuning datasets of a theme
+(themes/<theme>/data/*.jsonl, one {"messages": [{"role", "content"}...]}
+example per line):
+  validate   check the messages/role/content schema of every line
+  stats      tokens per example and length statistics
+  split      deterministic train/validation split by content hash
+  dedup      drop examples whose content was already seen
+Files are memory-mapped and read through a byte-offset index of their
+lines, so multi-GB datasets are never loaded into memory: only one line is
+parsed at a time and split/dedup copy the original bytes of each line
+Tokens are counted by a pluggable tokenizer (see token_counter): tiktoken
+when it is installed, otherwise an estimate from the text length
+"""
+
+import os
+import sys
+import json
+import mmap
+import hashlib
+import argparse
+import importlib
+import statistics
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ROLES = ("system", "user", "assistant", "tool", "function")
+AUTO_TOKENIZER = "auto"
+DEFAULT_ENCODING = "cl100k_base"
+# Estimate used without tiktoken
+CHARS_PER_TOKEN = 4
+# Tokens added by the chat format around each message and the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3
+# Longest example accepted for training (tokens, gpt-3.5-turbo context)
+MAX_EXAMPLE_TOKENS = 16385
+VALIDATION_RATIO = 0.1
+# Bytes of the content hash kept per example by dedup
+DIGEST_SIZE = 16
+
+class JsonlFile:
+    """A JSONL file memory-mapped with the byte offset of each line"""
+
+    def __init__(self, path, index: bool = True):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._data, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                self._data.madvise(mmap.MADV_SEQUENTIAL)
+        else:
+            self._data = b""
+        # Workers reading one shard (lines_in) skip the index
+        self.offsets = self._index() if index else None
+
+    def _index(self) -> array:
+        """Start offset of every line, plus the end of the file"""
+        offsets = array('Q')
+        data = self._data
+        start, end = 0, len(data)
+        while start < end:
+            offsets.append(start)
+            newline = data.find(b"\n", start)
+            if newline < 0:
+                break
+            start = newline + 1
+        offsets.append(end)
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def line(self, index: int) -> bytes:
+        """Bytes of a line (0-based) without its line ending"""
+        return self._data[self.offsets[index]:self.offsets[index + 1]].rstrip(b"\r\n")
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        """(line number, bytes) of every line"""
+        for index in range(len(self)):
+            yield index + 1, self.line(index)
+
+    def lines_in(self, start: int, end: int, first_number: int = 1) -> Iterator[Tuple[int, bytes]]:
+        """(line number, bytes) of the lines between two line-start offsets"""
+        data = self._data
+        number = first_number
+        while start < end:
+            newline = data.find(b"\n", start, end)
+            stop = end if newline < 0 else newline + 1
+            yield number, data[start:stop].rstrip(b"\r\n")
+            number += 1
+            start = stop
+
+    def shards(self, lines_per_shard: int) -> List[Tuple[int, int, int]]:
+        """(start offset, end offset, first line number) of consecutive runs of lines"""
+        return [(self.offsets[index], self.offsets[min(index + lines_per_shard, len(self))], index + 1)
+                for index in range(0, len(self), lines_per_shard)]
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> "JsonlFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def parse_line(raw: bytes) -> Tuple[Optional[dict], Optional[str]]:
+    """(example, None) or (None, error) for one line"""
+    if not raw.strip():
+        return None, "empty line"
+    try:
+        return json.loads(raw), None
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+
+def validate_example(example) -> List[str]:
+    """Schema errors of a parsed example (empty when it is valid)"""
+    if not isinstance(example, dict):
+        return ["not a JSON object"]
+    messages = example.get("messages")
+    if not isinstance(messages, list) or not messages:
+        return ['"messages" must be a non-empty list']
+
+    errors = []
+    for index, message in enumerate(messages):
+        where = f"messages[{index}]"
+        if not isinstance(message, dict):
+            errors.append(f"{where} is not an object")
+            continue
+        role = message.get("role")
+        if role not in ROLES:
+            errors.append(f"{where} has an unknown role {role!r}")
+        content = message.get("content")
+        if content is None and role == "assistant" and ("tool_calls" in message or "function_call" in message):
+            continue
+        if isinstance(content, list):
+            if not all(isinstance(part, dict) and "type" in part for part in content):
+                errors.append(f'{where} "content" parts must be objects with a "type"')
+        elif not isinstance(content, str):
+            errors.append(f'{where} "content" must be a string')
+        elif not content.strip():
+            errors.append(f'{where} has an empty "content"')
+
+    if not any(isinstance(message, dict) and message.get("role") == "assistant" for message in messages):
+        errors.append("no assistant message")
+    return errors
+
+def examples(dataset: JsonlFile) -> Iterator[Tuple[int, bytes, Optional[dict], List[str]]]:
+    """(line number, bytes, example, errors) of every line; example is None when it does not parse"""
+    for number, raw in dataset:
+        example, error = parse_line(raw)
+        yield number, raw, example, [error] if error else validate_example(example)
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def token_counter(tokenizer: str = AUTO_TOKENIZER, encoding_name: str = DEFAULT_ENCODING) -> Tuple[Callable[[str], int], str]:
+    """Token count function for text and a description of how it counts
+
+    tokenizer is one of:
+      auto             tiktoken when it is installed, else estimate
+      tiktoken         the tiktoken encoding encoding_name
+      estimate         CHARS_PER_TOKEN characters per token
+      <file>.json      a local Hugging Face tokenizer (pip install tokenizers)
+      module:function  a function of text returning a token count or the tokens
+    """
+    if tokenizer == AUTO_TOKENIZER:
+        try:
+            import tiktoken  # noqa: F401
+        except ImportError:
+            return estimate_tokens, f"estimate, {CHARS_PER_TOKEN} chars/token (pip install tiktoken)"
+        tokenizer = "tiktoken"
+
+    if tokenizer == "tiktoken":
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+        return (lambda text: len(encoding.encode(text, disallowed_special=()))), f"tiktoken {encoding_name}"
+    if tokenizer == "estimate":
+        return estimate_tokens, f"estimate, {CHARS_PER_TOKEN} chars/token"
+    if tokenizer.endswith(".json"):
+        from tokenizers import Tokenizer
+        local = Tokenizer.from_file(tokenizer)
+        return (lambda text: len(local.encode(text, add_special_tokens=False).ids)), tokenizer
+    if ":" in tokenizer:
+        module_name, function_name = tokenizer.split(":", 1)
+        function = getattr(importlib.import_module(module_name), function_name)
+
+        def count(text: str) -> int:
+            result = function(text)
+            return result if isinstance(result, int) else len(result)
+        return count, tokenizer
+    raise ValueError(f"Unknown tokenizer '{tokenizer}' (auto, tiktoken, estimate, <file>.json or module:function)")
+
+def message_text(message: dict) -> str:
+    """Text of a message's content (the text parts of multi-part content)"""
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+def role_tokens(example: dict, count: Callable[[str], int]) -> Dict[str, int]:
+    """Tokens of the messages of each role, chat format overhead included"""
+    tokens: Dict[str, int] = {}
+    for message in example["messages"]:
+        role = message.get("role", "")
+        message_tokens = TOKENS_PER_MESSAGE + count(role) + count(message_text(message))
+        if "name" in message:
+            message_tokens += TOKENS_PER_NAME + count(message["name"])
+        tokens[role] = tokens.get(role, 0) + message_tokens
+    return tokens
+
+def example_tokens(example: dict, count: Callable[[str], int]) -> int:
+    """Tokens of an example in the chat format, as counted for training"""
+    return TOKENS_PER_REPLY + sum(role_tokens(example, count).values())
+
+def content_digest(example: dict) -> bytes:
+    """Hash of an example's messages, independent of key order and JSON spacing"""
+    canonical = json.dumps(example["messages"], sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+def percentile(sorted_values, fraction: float) -> int:
+    """Nearest-rank percentile of sorted values"""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def validate_file(path, max_errors: int = 20) -> Tuple[int, int]:
+    """Print the schema errors of a file, returning (examples, invalid examples)"""
+    total = invalid = 0
+    with JsonlFile(path) as dataset:
+        for number, _, _, errors in examples(dataset):
+            total += 1
+            if errors:
+                invalid += 1
+                if invalid <= max_errors:
+                    print(f"  line {number}: {'; '.join(errors)}")
+    if invalid > max_errors:
+        print(f"  ... {invalid - max_errors} more invalid lines")
+    return total, invalid
+
+def file_stats(path, count: Callable[[str], int], max_tokens: int = MAX_EXAMPLE_TOKENS) -> dict:
+    """Token and message statistics of the valid examples of a file"""
+    tokens = array('L')
+    messages = 0
+    invalid = 0
+    with JsonlFile(path) as dataset:
+        for _, _, example, errors in examples(dataset):
+            if errors:
+                invalid += 1
+                continue
+            tokens.append(example_tokens(example, count))
+            messages += len(example["messages"])
+
+    stats = {"examples": len(tokens), "invalid": invalid, "tokens": sum(tokens)}
+    if tokens:
+        ordered = sorted(tokens)
+        stats.update({
+            "messages_mean": messages / len(tokens),
+            "min": ordered[0],
+            "mean": statistics.fmean(ordered),
+            "median": percentile(ordered, 0.5),
+            "p90": percentile(ordered, 0.9),
+            "p95": percentile(ordered, 0.95),
+            "max": ordered[-1],
+            "over_limit": sum(1 for value in ordered if value > max_tokens),
+        })
+    return stats
+
+def split_file(path, train_path, validation_path, ratio: float = VALIDATION_RATIO, seed: str = "") -> Tuple[int, int, int]:
+    """Copy each valid example to the train or validation file, returning (train, validation, skipped)
+
+    An example goes to validation when the hash of the seed and its
+    content falls below ratio: the split is the same on every run and
+    machine, does not depend on the line order, and duplicates always land
+    on the same side
+    """
+    threshold = int(ratio * 2 ** 64)
+    train = validation = skipped = 0
+    with JsonlFile(path) as dataset, open(train_path, 'wb') as train_file, \
+            open(validation_path, 'wb') as validation_file:
+        for _, raw, example, errors in examples(dataset):
+            if errors:
+                skipped += 1
+                continue
+            digest = hashlib.blake2b(seed.encode('utf-8') + content_digest(example), digest_size=8).digest()
+            if int.from_bytes(digest, 'big') < threshold:
+                validation_file.write(raw + b"\n")
+                validation += 1
+            else:
+                train_file.write(raw + b"\n")
+                train += 1
+    return train, validation, skipped
+
+def dedup_file(path, output_path, seen: set) -> Tuple[int, int]:
+    """Copy the examples whose content is not in seen, returning (kept, dropped)
+
+    Lines that are not valid examples are kept unchanged. The output is
+    written to a temporary file and renamed, so an interrupted run leaves
+    no truncated file behind
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+    kept = dropped = 0
+    try:
+        with JsonlFile(path) as dataset, open(tmp_path, 'wb') as output:
+            for _, raw, example, errors in examples(dataset):
+                if not errors:
+                    digest = content_digest(example)
+                    if digest in seen:
+                        dropped += 1
+                        continue
+                    seen.add(digest)
+                output.write(raw + b"\n")
+                kept += 1
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return kept, dropped
+
+def add_tokenizer_arguments(parser: argparse.ArgumentParser) -> None:
+    """--tokenizer and --encoding options (see token_counter)"""
+    parser.add_argument("--tokenizer", default=AUTO_TOKENIZER,
+                        help="auto, tiktoken, estimate, a tokenizer.json file or module:function (default: auto)")
+    parser.add_argument("--encoding", default=DEFAULT_ENCODING, help=f"tiktoken encoding (default: {DEFAULT_ENCODING})")
+
+def derived_path(path: Path, suffix: str) -> Path:
+    """data/name.jsonl -> data/name<suffix>.jsonl"""
+    return path.with_name(f"{path.stem}{suffix}{path.suffix}")
+
+def cmd_validate(args) -> int:
+    failed = False
+    for path in args.files:
+        print(f"🔍 {path}")
+        total, invalid = validate_file(path, args.max_errors)
+        if invalid:
+            print(f"❌ {invalid} of {total} lines invalid")
+            failed = True
+        else:
+            print(f"✅ {total} examples valid")
+    return 1 if failed else 0
+
+def cmd_stats(args) -> int:
+    try:
+        count, method = token_counter(args.tokenizer, args.encoding)
+    except (ImportError, AttributeError, ValueError) as e:
+        print(f"❌ Tokenizer '{args.tokenizer}': {e}")
+        return 1
+    print(f"🔢 Tokens: {method}")
+    for path in args.files:
+        stats = file_stats(path, count, args.max_tokens)
+        print(f"\n📊 {path}: {stats['examples']} examples, {stats['tokens']:,} tokens"
+              + (f", {stats['invalid']} invalid lines skipped" if stats['invalid'] else ""))
+        if not stats["examples"]:
+            continue
+        print(f"  messages/example  {stats['messages_mean']:.1f}")
+        print(f"  tokens/example    min {stats['min']:,}  mean {stats['mean']:,.0f}  median {stats['median']:,}  "
+              f"p90 {stats['p90']:,}  p95 {stats['p95']:,}  max {stats['max']:,}")
+        if stats["over_limit"]:
+            print(f"  ⚠️  {stats['over_limit']} examples over {args.max_tokens:,} tokens (truncated in training)")
+    return 0
+
+def cmd_split(args) -> int:
+    if not 0 < args.ratio < 1:
+        print("❌ --ratio must be between 0 and 1")
+        return 1
+    path = Path(args.file)
+    train_path = Path(args.train) if args.train else derived_path(path, "_train")
+    validation_path = Path(args.validation) if args.validation else derived_path(path, "_validation")
+    if path.resolve() in (train_path.resolve(), validation_path.resolve()):
+        print("❌ The split files must differ from the input file")
+        return 1
+    train, validation, skipped = split_file(path, train_path, validation_path, args.ratio, args.seed)
+    print(f"✂️  {train} train -> {train_path}")
+    print(f"✂️  {validation} validation -> {validation_path}")
+    if skipped:
+        print(f"⚠️  {skipped} invalid lines skipped (see: dataset_tools.py validate {path})")
+    return 0
+
+def cmd_dedup(args) -> int:
+    paths = [Path(name) for name in args.files]
+    inputs = [path.resolve() for path in paths]
+    if len(set(inputs)) < len(inputs):
+        print("❌ Each file can only be given once")
+        return 1
+    # An output overwriting an input (its own, or one not read yet) would lose examples
+    if any(derived_path(path, args.suffix) in inputs for path in inputs):
+        print("❌ The deduplicated files must differ from the input files (check --suffix)")
+        return 1
+    seen = set()
+    for path in paths:
+        output_path = derived_path(path, args.suffix)
+        kept, dropped = dedup_file(path, output_path, seen)
+        print(f"🧹 {path}: {kept} kept, {dropped} duplicates dropped -> {output_path}")
+    return 0
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Validate, measure, split and deduplicate chat-format JSONL datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser("validate", help="Check the messages/role/content schema of every line")
+    validate.add_argument("files", nargs="+", help="JSONL files")
+    validate.add_argument("--max-errors", type=int, default=20, help="Invalid lines printed per file (default: 20)")
+    validate.set_defaults(run=cmd_validate)
+
+    stats = commands.add_parser("stats", help="Tokens per example and length statistics")
+    stats.add_argument("files", nargs="+", help="JSONL files")
+    add_tokenizer_arguments(stats)
+    stats.add_argument("--max-tokens", type=int, default=MAX_EXAMPLE_TOKENS,
+                       help=f"Flag examples longer than this (default: {MAX_EXAMPLE_TOKENS})")
+    stats.set_defaults(run=cmd_stats)
+
+    split = commands.add_parser("split", help="Deterministic train/validation split by content hash")
+    split.add_argument("file", help="JSONL file")
+    split.add_argument("--ratio", type=float, default=VALIDATION_RATIO,
+                       help=f"Fraction of examples for validation (default: {VALIDATION_RATIO})")
+    split.add_argument("--seed", default="", help="Changes which examples are picked (default: none)")
+    split.add_argument("--train", help="Train output (default: <name>_train.jsonl)")
+    split.add_argument("--validation", help="Validation output (default: <name>_validation.jsonl)")
+    split.set_defaults(run=cmd_split)
+
+    dedup = commands.add_parser("dedup", help="Drop examples whose messages were already seen "
+                                              "(in an earlier line or an earlier file)")
+    dedup.add_argument("files", nargs="+", help="JSONL files, in priority order")
+    dedup.add_argument("--suffix", default="_dedup", help="Output name suffix (default: _dedup)")
+    dedup.set_defaults(run=cmd_dedup)
+
+    args = parser.parse_args()
+
+    try:
+        return args.run(args)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
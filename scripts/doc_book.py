@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Combined course book: program.md and every md_src document in one A4 PDF
+Chapters are the slide-break-stripped sources in book order: program.md
+first, then the files listed in presentation/md_src/book.txt (one name per
+line, # starts a comment) or, without that file, all md_src files by name
+By default the chapters are converted as one Markdown document and laid out
+in a single WeasyPrint pass: the toc extension collects the headings of all
+chapters for the table of contents and the page counters run through the
+whole book
+With per_chapter=True (very large courses) only one chapter is laid out at
+a time and the chapter PDFs are stitched together (see chunked_pdf.py); the
+table of contents gets its page numbers from the first layout pass
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import chunked_pdf
+import md_lines
+import slide_ast
+from build_cache import open_cache
+from convert_md_to_pdf_docs import find_docs_css, load_docs_css
+from image_assets import doc_images_base
+from markdown_converter import convert_markdown, get_markdown
+from pdf_renderer import PdfRenderer, build_html_document, get_renderer
+from profiling import add_profile_arguments, file_scope, profile_session, span
+from slide_ast import SlideAstCache, doc_markdown
+
+BOOK_ORDER_FILE = "book.txt"
+# Heading levels listed in the table of contents
+TOC_DEPTH = 2
+TOC_TITLE = "Índice"
+
+# Appended to the document CSS
+BOOK_CSS = """
+/* Combined course book */
+.book-chapter { break-before: page; }
+.book-toc { break-after: page; }
+.book-toc ul { list-style: none; margin: 0 0 0 14pt; padding: 0; }
+.book-toc > ul { margin-left: 0; }
+.book-toc li { margin-bottom: 4pt; text-align: left; }
+.book-toc a { color: inherit; text-decoration: none; }
+.book-toc a[href]::after { content: leader('.') target-counter(attr(href), page); }
+.book-toc a[data-page]::after { content: leader('.') attr(data-page); }
+"""
+
+CHAPTER_BREAK = '<div class="book-chapter"></div>'
+TOC_TEMPLATE = '<nav class="book-toc"><h1>{title}</h1>{entries}</nav>'
+
+def book_chapters(theme_path) -> List[Path]:
+    """Source files of the book in chapter order"""
+    theme_path = Path(theme_path)
+    md_src_dir = theme_path / "presentation" / "md_src"
+    order_file = md_src_dir / BOOK_ORDER_FILE
+
+    chapters = []
+    program_md = theme_path / "program.md"
+    if program_md.exists():
+        chapters.append(program_md)
+
+    if order_file.exists():
+        with open(order_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                name = line.split('#', 1)[0].strip()
+                if not name:
+                    continue
+                md_file = md_src_dir / name
+                if not md_file.exists():
+                    raise FileNotFoundError(f"{order_file.name} lists a missing file: {md_file}")
+                chapters.append(md_file)
+    elif md_src_dir.is_dir():
+        chapters.extend(sorted(md_src_dir.glob("*.md")))
+
+    return chapters
+
+def book_output_path(theme_path) -> Path:
+    theme_path = Path(theme_path)
+    return theme_path / "presentation" / "pdf_docs" / f"{theme_path.name}_book.pdf"
+
+def read_chapter(md_file) -> str:
+    """Source text of a chapter"""
+    with span("read", md_file):
+        with open(md_file, 'r', encoding='utf-8') as f:
+            return f.read()
+
+def chapter_markdown(md_file, ast_cache: SlideAstCache) -> str:
+    """A4 text of a chapter, from its parsed slides (see slide_ast.py)"""
+    content = read_chapter(md_file)
+    with span("slides", md_file):
+        return doc_markdown(ast_cache.parse(content))
+
+def toc_list(tokens: list, page_of: Optional[Callable[[str], Optional[int]]] = None) -> str:
+    """Table of contents entries (nested lists) from toc extension tokens
+
+    Entries link to their heading (page numbers by target-counter) unless
+    page_of gives the page number of a heading id
+    """
+    def entries(tokens: list) -> str:
+        items = []
+        for token in tokens:
+            if token['level'] > TOC_DEPTH:
+                continue
+            if page_of is None:
+                link = f'<a href="#{token["id"]}">{token["name"]}</a>'
+            else:
+                page = page_of(token['id'])
+                link = f'<a data-page="{page}">{token["name"]}</a>' if page else f'<a>{token["name"]}</a>'
+            children = entries(token['children'])
+            items.append(f"<li>{link}{children}</li>")
+        return f"<ul>{''.join(items)}</ul>" if items else ""
+
+    return entries(tokens)
+
+def render_book(chapters: List[Path], output_path, css_text: str, base_url: Optional[str],
+                title: str, renderer: PdfRenderer, ast_cache: SlideAstCache) -> None:
+    """Lay out the whole book in one pass"""
+    markdown_content = f"\n\n{CHAPTER_BREAK}\n\n".join(chapter_markdown(md_file, ast_cache)
+                                                      for md_file in chapters)
+    with span("markdown"):
+        body = convert_markdown(markdown_content)
+    body = TOC_TEMPLATE.format(title=TOC_TITLE, entries=toc_list(get_markdown().toc_tokens)) + body
+    renderer.write_pdf(build_html_document(body, title, "es"), output_path, css_text, base_url)
+
+def render_book_per_chapter(chapters: List[Path], output_path, css_text: str, base_url: Optional[str],
+                            title: str, renderer: PdfRenderer, ast_cache: SlideAstCache) -> None:
+    """Lay out one chapter at a time and stitch the chapter PDFs"""
+    documents = []
+    page_counts = []
+    chapter_tocs = []
+    for md_file in chapters:
+        with file_scope(md_file):
+            content = read_chapter(md_file)
+            with span("markdown", md_file):
+                body, toc_tokens = ast_cache.doc_html(content)
+            document = build_html_document(body, title, "es")
+            pages, anchors = chunked_pdf.layout_chunk(document, css_text, base_url, renderer)
+        chapter_tocs.append((toc_tokens, anchors, sum(page_counts)))
+        documents.append(document)
+        page_counts.append(pages)
+
+    # The pages of the table of contents shift every chapter; lay it out
+    # again until its own page count is stable
+    toc_pages = 1
+    for _ in range(3):
+        entries = []
+        for tokens, anchors, offset in chapter_tocs:
+            def page_of(anchor, anchors=anchors, offset=offset):
+                return toc_pages + offset + anchors[anchor] + 1 if anchor in anchors else None
+            entries.append(toc_list(tokens, page_of))
+        toc = TOC_TEMPLATE.format(title=TOC_TITLE, entries="".join(entries))
+        toc_document = build_html_document(toc, title, "es")
+        pages, _ = chunked_pdf.layout_chunk(toc_document, css_text, base_url, renderer)
+        if pages == toc_pages:
+            break
+        toc_pages = pages
+
+    chunked_pdf.write_chunks([toc_document] + documents, output_path, css_text, base_url,
+                             [toc_pages] + page_counts, renderer)
+
+def convert_book(theme_path, output_path=None, per_chapter=False, verbose=False, use_cache=True, renderer=None):
+    """Render the course book of a theme, returning True on success
+
+    The book is left untouched when its sources, their order and the
+    document CSS are unchanged since the last build
+    """
+    theme_path = Path(theme_path)
+    scripts_dir = Path(__file__).parent
+    output_path = Path(output_path) if output_path else book_output_path(theme_path)
+
+    chapters = book_chapters(theme_path)
+    if not chapters:
+        print(f"No program.md or md_src files found in {theme_path}")
+        return False
+
+    if per_chapter and not chunked_pdf.available():
+        print("Error: per-chapter rendering needs pikepdf or pypdf (pip install pikepdf)")
+        return False
+
+    images_base = doc_images_base(theme_path / "presentation")
+    order_file = theme_path / "presentation" / "md_src" / BOOK_ORDER_FILE
+
+    cache = open_cache(theme_path, use_cache)
+    fingerprint = None
+    if cache:
+        with span("cache"):
+            fingerprint = cache.fingerprint(
+                Path(__file__), Path(chunked_pdf.__file__), Path(md_lines.__file__), Path(slide_ast.__file__),
+                find_docs_css(scripts_dir),
+                order_file if order_file.exists() else None,
+                images_base / "images" if images_base else None,
+                per_chapter, *chapters
+            )
+        if cache.is_fresh(output_path, fingerprint):
+            print(f"⏭️  Up to date: {output_path}")
+            return True
+
+    if verbose:
+        print(f"Building course book from {len(chapters)} chapters:")
+        for md_file in chapters:
+            print(f"  - {md_file.name}")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    css_text = load_docs_css(scripts_dir) + BOOK_CSS
+    base_url = str(images_base) + "/" if images_base else None
+    render = render_book_per_chapter if per_chapter else render_book
+    ast_cache = SlideAstCache.for_presentation(theme_path / "presentation", cache is not None)
+
+    try:
+        render(chapters, output_path, css_text, base_url, theme_path.name, renderer or get_renderer(), ast_cache)
+    except ImportError:
+        print("Error: weasyprint is not installed.")
+        print("Please install it with: pip install weasyprint")
+        return False
+    except Exception as e:
+        print(f"Error generating course book: {e}")
+        return False
+
+    if cache:
+        cache.record(output_path, fingerprint)
+        cache.save()
+
+    print(f"📚 Course book generated: {output_path}")
+    return True
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Build one course book PDF from program.md and all md_src files")
+    parser.add_argument("theme_path", help="Path to theme directory")
+    parser.add_argument("-o", "--output", help="Output PDF (default: presentation/pdf_docs/<theme>_book.pdf)")
+    parser.add_argument("--per-chapter", action="store_true",
+                        help="Lay out one chapter at a time (bounded memory for very large courses, needs pikepdf or pypdf)")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate the book, ignoring the build cache")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    with profile_session(args):
+        try:
+            success = convert_book(args.theme_path, args.output, args.per_chapter, args.verbose, not args.no_cache)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            success = False
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
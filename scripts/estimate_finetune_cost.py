@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Estimate the training tokens and cost of a fine-tuning job
+Counts the tokens of chat-format JSONL datasets (see dataset_tools.py) in a
+pool of worker processes: each file is memory-mapped, indexed once and cut
+into shards of consecutive lines, and every worker counts its shards with
+its own tokenizer (--tokenizer, same choices as dataset_tools.py stats).
+Reports the tokens of each role, the longest examples, a histogram of the
+example lengths and the billed tokens (examples truncated at --max-tokens,
+times the epochs the fine-tuning API would pick for the dataset size)
+"""
+
+import os
+import sys
+import json
+import heapq
+import bisect
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from dataset_tools import (
+    MAX_EXAMPLE_TOKENS, TOKENS_PER_REPLY, JsonlFile, add_tokenizer_arguments, parse_line, role_tokens,
+    token_counter, validate_example,
+)
+
+# Epochs picked by the fine-tuning API when none are given
+DEFAULT_EPOCHS = 3
+MIN_TARGET_EXAMPLES = 100
+MAX_TARGET_EXAMPLES = 25000
+MIN_DEFAULT_EPOCHS = 1
+MAX_DEFAULT_EPOCHS = 25
+# USD per million training tokens (OpenAI price list, check before relying on it)
+TRAINING_PRICES = {
+    "gpt-4o-mini": 3.00,
+    "gpt-4o": 25.00,
+    "gpt-3.5-turbo": 8.00,
+}
+DEFAULT_MODEL = "gpt-4o-mini"
+# Upper edges of the length histogram bins (tokens); the last bin is open
+HISTOGRAM_EDGES = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+LONGEST_EXAMPLES = 5
+# Lines per shard: small enough to balance the workers, large enough to amortize the task overhead
+MIN_SHARD_LINES = 1000
+SHARDS_PER_JOB = 4
+
+_count: Optional[Callable[[str], int]] = None
+
+def _init_worker(tokenizer: str, encoding: str) -> None:
+    """Create this process's tokenizer once"""
+    global _count
+    _count = token_counter(tokenizer, encoding)[0]
+
+def histogram(lengths: array) -> List[int]:
+    """Number of lengths in each HISTOGRAM_EDGES bin (numpy when it is installed)"""
+    try:
+        import numpy
+    except ImportError:
+        counts = [0] * (len(HISTOGRAM_EDGES) + 1)
+        for length in lengths:
+            counts[bisect.bisect_left(HISTOGRAM_EDGES, length)] += 1
+        return counts
+    values = numpy.frombuffer(lengths, dtype=numpy.uint32) if len(lengths) else numpy.zeros(0, numpy.uint32)
+    bins = numpy.searchsorted(numpy.asarray(HISTOGRAM_EDGES), values, side='left')
+    return numpy.bincount(bins, minlength=len(HISTOGRAM_EDGES) + 1).tolist()
+
+def _count_shard(path: str, start: int, end: int, first_number: int, max_tokens: int, top: int) -> dict:
+    """Token totals of one shard of a dataset"""
+    lengths = array('I')
+    roles: Dict[str, int] = {}
+    longest = []
+    invalid = billed = 0
+    with JsonlFile(path, index=False) as dataset:
+        for number, raw in dataset.lines_in(start, end, first_number):
+            example, error = parse_line(raw)
+            if error or validate_example(example):
+                invalid += 1
+                continue
+            tokens = TOKENS_PER_REPLY
+            for role, role_total in role_tokens(example, _count).items():
+                roles[role] = roles.get(role, 0) + role_total
+                tokens += role_total
+            lengths.append(tokens)
+            billed += min(tokens, max_tokens)
+            entry = (tokens, path, number)
+            if len(longest) < top:
+                heapq.heappush(longest, entry)
+            elif entry > longest[0]:
+                heapq.heapreplace(longest, entry)
+
+    return {
+        "examples": len(lengths),
+        "invalid": invalid,
+        "tokens": sum(lengths),
+        "billed_tokens": billed,
+        "roles": roles,
+        "longest": longest,
+        "histogram": histogram(lengths),
+        "over_limit": sum(1 for length in lengths if length > max_tokens),
+    }
+
+def default_epochs(examples: int) -> int:
+    """Epochs the fine-tuning API picks for a dataset of this many examples"""
+    epochs = DEFAULT_EPOCHS
+    if examples * epochs < MIN_TARGET_EXAMPLES:
+        epochs = min(MAX_DEFAULT_EPOCHS, -(-MIN_TARGET_EXAMPLES // examples))
+    elif examples * epochs > MAX_TARGET_EXAMPLES:
+        epochs = max(MIN_DEFAULT_EPOCHS, MAX_TARGET_EXAMPLES // examples)
+    return epochs
+
+def estimate(files: List[str], tokenizer: str, encoding: str, jobs: int = 1, max_tokens: int = MAX_EXAMPLE_TOKENS,
+             top: int = LONGEST_EXAMPLES, epochs: Optional[int] = None, price: float = 0.0) -> dict:
+    """Count the tokens of the datasets and estimate the training cost"""
+    shards = []
+    lines = 0
+    for name in files:
+        with JsonlFile(name) as dataset:
+            lines += len(dataset)
+            lines_per_shard = max(MIN_SHARD_LINES, -(-len(dataset) // (jobs * SHARDS_PER_JOB)))
+            shards.extend((str(dataset.path),) + shard for shard in dataset.shards(lines_per_shard))
+
+    arguments = [list(values) for values in zip(*shards)] if shards else [[]] * 4
+    arguments += [[max_tokens] * len(shards), [top] * len(shards)]
+    if jobs > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(shards)), initializer=_init_worker,
+                                 initargs=(tokenizer, encoding)) as pool:
+            results = list(pool.map(_count_shard, *arguments))
+    else:
+        _init_worker(tokenizer, encoding)
+        results = list(map(_count_shard, *arguments))
+
+    totals = {"examples": 0, "invalid": 0, "tokens": 0, "billed_tokens": 0, "over_limit": 0}
+    roles: Dict[str, int] = {}
+    counts = [0] * (len(HISTOGRAM_EDGES) + 1)
+    for result in results:
+        for key in totals:
+            totals[key] += result[key]
+        for role, tokens in result["roles"].items():
+            roles[role] = roles.get(role, 0) + tokens
+        counts = [total + count for total, count in zip(counts, result["histogram"])]
+    longest = heapq.nlargest(top, (entry for result in results for entry in result["longest"]))
+
+    epochs = epochs or (default_epochs(totals["examples"]) if totals["examples"] else 0)
+    trained_tokens = totals["billed_tokens"] * epochs
+    return dict(totals, **{
+        "files": files,
+        "lines": lines,
+        "shards": len(shards),
+        "roles": roles,
+        "longest": [{"tokens": tokens, "file": path, "line": number} for tokens, path, number in longest],
+        "histogram": counts,
+        "histogram_edges": list(HISTOGRAM_EDGES),
+        "max_tokens": max_tokens,
+        "epochs": epochs,
+        "trained_tokens": trained_tokens,
+        "price_per_million": price,
+        "cost": trained_tokens * price / 1_000_000,
+    })
+
+def print_report(results: dict, method: str, model: str) -> None:
+    """Print the estimate"""
+    print(f"🔢 Tokens: {method}")
+    print(f"📊 {results['examples']:,} examples in {len(results['files'])} files ({results['shards']} shards), "
+          f"{results['tokens']:,} tokens"
+          + (f", {results['invalid']:,} invalid lines skipped" if results['invalid'] else ""))
+    if not results["examples"]:
+        return
+
+    print("\nTokens by role:")
+    for role, tokens in sorted(results["roles"].items(), key=lambda item: -item[1]):
+        print(f"  {role:<10} {tokens:>14,}  {tokens / results['tokens']:6.1%}")
+
+    print("\nExample length (tokens):")
+    widest = max(results["histogram"])
+    lower = 0
+    for upper, count in zip(results["histogram_edges"] + [None], results["histogram"]):
+        label = f"{lower:>6}-{upper:<6}" if upper else f"{lower:>6}+      "
+        bar = "█" * round(30 * count / widest) if widest else ""
+        print(f"  {label} {count:>10,}  {bar}")
+        lower = (upper or 0) + 1
+
+    print("\nLongest examples:")
+    for entry in results["longest"]:
+        print(f"  {entry['tokens']:>8,}  {entry['file']}:{entry['line']}")
+    if results["over_limit"]:
+        print(f"⚠️  {results['over_limit']:,} examples over {results['max_tokens']:,} tokens are truncated in training")
+
+    print(f"\n🏋️  {results['epochs']} epochs x {results['billed_tokens']:,} tokens = {results['trained_tokens']:,} trained tokens")
+    if results["price_per_million"]:
+        print(f"💰 Estimated cost: ${results['cost']:,.2f} "
+              f"({model}, ${results['price_per_million']:.2f} per 1M training tokens)")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Estimate the training tokens and cost of fine-tuning datasets")
+    parser.add_argument("files", nargs="+", help="Chat-format JSONL files (shards of one dataset)")
+    add_tokenizer_arguments(parser)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--epochs", type=int, help="Training epochs (default: as picked by the fine-tuning API)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, choices=sorted(TRAINING_PRICES),
+                        help=f"Price list entry (default: {DEFAULT_MODEL})")
+    parser.add_argument("--price", type=float, help="USD per 1M training tokens (overrides --model)")
+    parser.add_argument("--max-tokens", type=int, default=MAX_EXAMPLE_TOKENS,
+                        help=f"Examples are truncated at this length (default: {MAX_EXAMPLE_TOKENS})")
+    parser.add_argument("--top", type=int, default=LONGEST_EXAMPLES,
+                        help=f"Longest examples listed (default: {LONGEST_EXAMPLES})")
+    parser.add_argument("-o", "--output", help="Also write the results as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        method = token_counter(args.tokenizer, args.encoding)[1]
+    except (ImportError, AttributeError, ValueError) as e:
+        print(f"❌ Tokenizer '{args.tokenizer}': {e}")
+        return 1
+
+    price = args.price if args.price is not None else TRAINING_PRICES[args.model]
+    try:
+        results = estimate(args.files, args.tokenizer, args.encoding, max(1, args.jobs), args.max_tokens,
+                           args.top, args.epochs, price)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    print_report(results, method, args.model if args.price is None else "custom price")
+    return 0 if results["examples"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
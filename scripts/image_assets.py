@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Image asset pipeline for a theme
+Replaces the plain `cp -r img_src/* marp_slides/images/` step:
+  - each image in img_src is hashed and only new or changed files are processed
+  - resolution-capped, recompressed variants are built for the 16:9 slides
+    (marp_slides/images/) and for the A4 documents (presentation/.assets/a4/images/)
+  - variants are stored once under presentation/.assets/blobs/, named by the
+    source content hash, and hardlinked (or copied) into place
+Pillow is optional; without it images are linked unchanged
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from build_cache import hash_file
+
+ASSETS_DIRNAME = ".assets"
+MANIFEST_VERSION = 1
+
+# Largest pixel size kept per target: Marp renders 16:9 slides at 1280x720
+# (1.5x for sharp output), A4 text width at ~150 dpi
+PROFILES = {
+    "slides": (1920, 1080),
+    "a4": (1240, 1754),
+}
+
+# Formats Pillow resizes and recompresses; anything else is linked unchanged
+RECOMPRESS_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+SAVE_OPTIONS = {
+    "PNG": {"optimize": True},
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "WEBP": {"quality": 85, "method": 6},
+}
+
+def assets_dir(presentation_dir) -> Path:
+    """Directory holding the content-addressed blobs and per-target trees"""
+    return Path(presentation_dir) / ASSETS_DIRNAME
+
+def doc_images_base(presentation_dir) -> Optional[Path]:
+    """Base URL for A4 documents, so `images/...` resolves to the A4 variants"""
+    base = assets_dir(presentation_dir) / "a4"
+    return base if (base / "images").is_dir() else None
+
+def link_or_copy(source: Path, dest: Path, hardlink: bool = True) -> None:
+    """Place source at dest, as a hardlink when possible"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    if hardlink:
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copy2(source, tmp)
+    else:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, dest)
+
+def build_variant(source: Path, dest: Path, max_size: Tuple[int, int]) -> bool:
+    """Write a downscaled, recompressed copy of source to dest
+
+    Returns False (dest not written) when Pillow is missing, the format is
+    not handled or the result would not be smaller than the original
+    """
+    image_format = RECOMPRESS_FORMATS.get(source.suffix.lower())
+    if not image_format:
+        return False
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+
+    with Image.open(source) as image:
+        if getattr(image, "is_animated", False):
+            return False
+        image.load()
+        resized = image.width > max_size[0] or image.height > max_size[1]
+        if resized:
+            image.thumbnail(max_size, Image.LANCZOS)
+
+        # An alpha channel that is fully opaque only adds weight
+        if image.mode == "RGBA" and image.getextrema()[3][0] == 255:
+            image = image.convert("RGB")
+        if image_format == "JPEG" and image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".tmp")
+        image.save(tmp, format=image_format, **SAVE_OPTIONS[image_format])
+
+    if not resized and tmp.stat().st_size >= source.stat().st_size:
+        tmp.unlink()
+        return False
+
+    os.replace(tmp, dest)
+    return True
+
+class ImageAssets:
+    """Synchronizes a theme's img_src into the slide and document image trees"""
+
+    def __init__(self, presentation_dir, hardlink: bool = True, variants: bool = True, verbose: bool = False):
+        self.presentation_dir = Path(presentation_dir)
+        self.img_src = self.presentation_dir / "img_src"
+        self.assets = assets_dir(self.presentation_dir)
+        self.blobs = self.assets / "blobs"
+        self.manifest_file = self.assets / "manifest.json"
+        self.targets = {
+            "slides": self.presentation_dir / "marp_slides" / "images",
+            "a4": self.assets / "a4" / "images",
+        }
+        self.hardlink = hardlink
+        self.variants = variants
+        self.verbose = verbose
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("sources", {})
+
+    def _save_manifest(self, sources: Dict[str, dict]) -> None:
+        self.assets.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_file.with_name(self.manifest_file.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "sources": sources}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_file)
+
+    def _blob(self, source: Path, digest: str, profile: str) -> str:
+        """Build (once) the blob of a source for a profile, returning its file name"""
+        max_size = PROFILES[profile]
+        mode = f"{profile}-{max_size[0]}x{max_size[1]}" if self.variants else "original"
+        key = hashlib.sha256(f"{digest}\0{mode}".encode('utf-8')).hexdigest()
+        name = key + source.suffix.lower()
+        blob = self.blobs / name
+
+        if not blob.exists():
+            if not (self.variants and build_variant(source, blob, max_size)):
+                # Keep the original bytes (no Pillow, unknown format or no gain);
+                # copied, so editing img_src in place never alters a blob
+                link_or_copy(source, blob, hardlink=False)
+        return name
+
+    def sync(self) -> Dict[str, int]:
+        """Bring every target tree in line with img_src, returning counters"""
+        stats = {"updated": 0, "unchanged": 0, "removed": 0, "source_bytes": 0, "slides_bytes": 0, "a4_bytes": 0}
+        if not self.img_src.is_dir():
+            return stats
+
+        previous = self._load_manifest()
+        sources: Dict[str, dict] = {}
+
+        for source in sorted(p for p in self.img_src.rglob("*") if p.is_file()):
+            rel = source.relative_to(self.img_src).as_posix()
+            stat = source.stat()
+            entry = previous.get(rel)
+
+            if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                digest = entry["sha256"]
+            else:
+                digest = hash_file(source)
+
+            new_entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+            changed = False
+            for profile, target_dir in self.targets.items():
+                name = self._blob(source, digest, profile)
+                new_entry[profile] = name
+                dest = target_dir / rel
+                blob = self.blobs / name
+                if not (entry and entry.get(profile) == name and dest.exists()
+                        and dest.stat().st_size == blob.stat().st_size):
+                    link_or_copy(blob, dest, self.hardlink)
+                    changed = True
+                stats[f"{profile}_bytes"] += blob.stat().st_size
+
+            stats["source_bytes"] += stat.st_size
+            sources[rel] = new_entry
+            if changed:
+                stats["updated"] += 1
+                if self.verbose:
+                    print(f"  ✓ {rel}")
+            else:
+                stats["unchanged"] += 1
+
+        # Remove images deleted from img_src (only files this pipeline placed)
+        for rel in previous.keys() - sources.keys():
+            for target_dir in self.targets.values():
+                stale = target_dir / rel
+                if stale.exists():
+                    stale.unlink()
+            stats["removed"] += 1
+
+        # Drop blobs no source refers to anymore
+        referenced = {entry[profile] for entry in sources.values() for profile in self.targets}
+        if self.blobs.exists():
+            for blob in self.blobs.iterdir():
+                if blob.name not in referenced:
+                    blob.unlink()
+
+        self._save_manifest(sources)
+        return stats
+
+def sync_theme_images(theme_dir, hardlink: bool = True, variants: bool = True, verbose: bool = False) -> Dict[str, int]:
+    """Sync a theme's img_src into marp_slides/images and the A4 asset tree"""
+    return ImageAssets(Path(theme_dir) / "presentation", hardlink, variants, verbose).sync()
+
+def format_size(size: int) -> str:
+    """Human-readable byte count"""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Sync and optimize theme images for slides and A4 documents")
+    parser.add_argument("theme_path", help="Path to theme directory")
+    parser.add_argument("--copy", action="store_true", help="Copy files instead of hardlinking them")
+    parser.add_argument("--no-variants", action="store_true", help="Use the original images (no resizing/recompression)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+
+    args = parser.parse_args()
+
+    theme_path = Path(args.theme_path)
+    if not (theme_path / "presentation" / "img_src").is_dir():
+        print("❌ No image directory")
+        return 1
+
+    stats = sync_theme_images(theme_path, not args.copy, not args.no_variants, args.verbose)
+    print(f"✅ Images synced: {stats['updated']} updated, {stats['unchanged']} unchanged, {stats['removed']} removed")
+    print(f"   {format_size(stats['source_bytes'])} source -> {format_size(stats['slides_bytes'])} slides, "
+          f"{format_size(stats['a4_bytes'])} A4")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Shared Markdown -> HTML converter for the program and docs PDF scripts
+Builds the configured markdown.Markdown instance once (per thread) and
+resets it between documents instead of re-instantiating every extension
+Pygments lexers and formatters used by codehilite are memoized by language
+"""
+
+import threading
+from typing import Dict, Tuple
+
+MARKDOWN_EXTENSIONS = [
+    'extra',           # Tables, footnotes, etc.
+    'codehilite',      # Syntax highlighting
+    'toc',             # Table of contents
+    'attr_list',       # Attribute lists
+    'def_list',        # Definition lists
+    'abbr',            # Abbreviations
+    'footnotes',       # Footnotes
+    'md_in_html'       # Markdown inside HTML
+]
+
+_local = threading.local()
+_pygments_lock = threading.Lock()
+_pygments_cached = False
+
+def _options_key(options: dict) -> Tuple:
+    """Hashable key for a Pygments options dict (values may be lists)"""
+    return tuple(sorted((name, repr(value)) for name, value in options.items()))
+
+def _memoize_factory(factory):
+    """Wrap a Pygments get_*_by_name factory so each (name, options) is built once"""
+    instances: Dict[Tuple, object] = {}
+
+    def cached(_alias, **options):
+        key = (_alias, _options_key(options))
+        instance = instances.get(key)
+        if instance is None:
+            instance = instances[key] = factory(_alias, **options)
+        return instance
+
+    return cached
+
+def _install_pygments_cache() -> None:
+    """Make codehilite look lexers and formatters up through memoized factories"""
+    global _pygments_cached
+    with _pygments_lock:
+        if _pygments_cached:
+            return
+        _pygments_cached = True
+
+        from markdown.extensions import codehilite
+
+        # Pygments is optional for codehilite (no highlighting without it)
+        if not getattr(codehilite, 'pygments', False):
+            return
+
+        codehilite.get_lexer_by_name = _memoize_factory(codehilite.get_lexer_by_name)
+        codehilite.get_formatter_by_name = _memoize_factory(codehilite.get_formatter_by_name)
+
+def get_markdown():
+    """Return this thread's configured markdown.Markdown instance, building it once"""
+    md = getattr(_local, 'md', None)
+    if md is None:
+        import markdown
+
+        _install_pygments_cache()
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        _local.md = md
+    return md
+
+def convert_markdown(text: str) -> str:
+    """Convert Markdown text to HTML with the shared converter
+
+    The converter is reset first so footnotes, abbreviations and TOC state
+    never leak between documents; after the call, get_markdown().toc and
+    toc_tokens describe this document
+    """
+    md = get_markdown()
+    md.reset()
+    return md.convert(text)
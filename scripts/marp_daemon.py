@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Persistent Marp render daemon
+Keeps one Marp CLI server (Node + headless Chromium) warm for a marp_slides
+directory and accepts render requests for individual decks over a local
+Unix socket, so repeated and watch-triggered renders skip process startup
+
+Protocol: one JSON object per line in each direction
+  -> {"command": "render", "deck": "intro.md", "output": "/abs/intro.pdf", "format": "pdf"}
+  <- {"ok": true, "output": "/abs/intro.pdf", "bytes": 12345}
+  <- {"ok": false, "error": "..."}
+  -> {"command": "ping"}      <- {"ok": true, "marp_dir": "..."}
+  -> {"command": "shutdown"}  <- {"ok": true}
+Any server speaking this protocol (e.g. a stub in tests) can stand in for it
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import subprocess
+import socketserver
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_SOCKET_NAME = ".marp-daemon.sock"
+
+# Seconds to wait for the Marp server to accept connections
+STARTUP_TIMEOUT = 60
+# Seconds allowed for a single deck render
+RENDER_TIMEOUT = 300
+
+def default_socket_path(project_dir) -> Path:
+    """Socket used for a project when none is given explicitly"""
+    return Path(project_dir) / DEFAULT_SOCKET_NAME
+
+def _free_port() -> int:
+    """Ask the OS for an unused local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serve JSON-line requests from one client connection"""
+
+    def handle(self):
+        for raw_line in self.rfile:
+            if not raw_line.strip():
+                continue
+            try:
+                request = json.loads(raw_line)
+                response = self.server.dispatch(request)
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+class MarpDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server fronting a long-lived `marp --server` process"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, marp_dir, css_file=None, verbose=False):
+        self.socket_path = Path(socket_path)
+        self.marp_dir = Path(marp_dir).resolve()
+        self.css_file = css_file
+        self.verbose = verbose
+        self.port = _free_port()
+        self.marp_process = None
+
+        # A stale socket file from a crashed daemon blocks bind()
+        if self.socket_path.exists():
+            if request_ping(self.socket_path):
+                raise RuntimeError(f"A Marp daemon is already running on {self.socket_path}")
+            self.socket_path.unlink()
+
+        super().__init__(str(self.socket_path), _RequestHandler)
+
+    def start_marp(self) -> None:
+        """Launch `marp --server` and wait until it accepts connections"""
+        cmd = ["marp", "--server", str(self.marp_dir), "--allow-local-files"]
+        if self.css_file:
+            cmd.extend(["--theme", str(self.css_file)])
+
+        env = dict(os.environ, PORT=str(self.port))
+        self.marp_process = subprocess.Popen(
+            cmd, env=env,
+            stdout=None if self.verbose else subprocess.DEVNULL,
+            stderr=None if self.verbose else subprocess.DEVNULL
+        )
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.marp_process.poll() is not None:
+                raise RuntimeError(f"Marp server exited with code {self.marp_process.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+
+        raise RuntimeError(f"Marp server did not start within {STARTUP_TIMEOUT}s")
+
+    def dispatch(self, request: dict) -> dict:
+        """Handle one decoded request"""
+        command = request.get("command", "render")
+
+        if command == "ping":
+            return {"ok": True, "marp_dir": str(self.marp_dir)}
+
+        if command == "shutdown":
+            # shutdown() blocks until serve_forever returns, so call it elsewhere
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+
+        if command == "render":
+            return self.render(request["deck"], request["output"], request.get("format", "pdf"))
+
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def render(self, deck: str, output: str, fmt: str = "pdf") -> dict:
+        """Fetch a rendered deck from the warm Marp server and write it to output"""
+        deck_path = Path(deck)
+        if not deck_path.is_absolute():
+            deck_path = self.marp_dir / deck_path
+
+        try:
+            relative = deck_path.resolve().relative_to(self.marp_dir)
+        except ValueError:
+            return {"ok": False, "error": f"{deck} is outside {self.marp_dir}"}
+
+        # The server answers with HTML unless a conversion is requested
+        query = "" if fmt == "html" else f"?{fmt}"
+        url = f"http://127.0.0.1:{self.port}/{urllib.parse.quote(relative.as_posix())}{query}"
+        try:
+            with urllib.request.urlopen(url, timeout=RENDER_TIMEOUT) as response:
+                data = response.read()
+        except urllib.error.HTTPError as e:
+            return {"ok": False, "error": f"Marp server returned {e.code}: {e.read().decode('utf-8', 'replace')}"}
+        except OSError as e:
+            return {"ok": False, "error": f"Marp server unreachable: {e}"}
+
+        # Write atomically so readers never see a half-written file
+        output_path = Path(output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_name(output_path.name + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, output_path)
+
+        if self.verbose:
+            print(f"✓ Rendered {relative} -> {output_path}")
+
+        return {"ok": True, "output": str(output_path), "bytes": len(data)}
+
+    def server_close(self):
+        super().server_close()
+        if self.marp_process and self.marp_process.poll() is None:
+            self.marp_process.terminate()
+            try:
+                self.marp_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.marp_process.kill()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+def serve(socket_path, marp_dir, css_file=None, verbose=False) -> None:
+    """Run the daemon in the foreground until shutdown or Ctrl+C"""
+    daemon = MarpDaemon(socket_path, marp_dir, css_file, verbose)
+    try:
+        print(f"🚀 Starting Marp server for {daemon.marp_dir}...")
+        daemon.start_marp()
+        print(f"👂 Marp daemon listening on {daemon.socket_path}")
+        print("   Press Ctrl+C to exit")
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        print("👋 Marp daemon stopped")
+
+def _send(socket_path, request: dict, timeout: float) -> dict:
+    """Send one request to a daemon and return its decoded response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path))
+        client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("Marp daemon closed the connection")
+    return json.loads(line)
+
+def request_ping(socket_path, timeout: float = 2) -> bool:
+    """True if a daemon answers on socket_path"""
+    try:
+        return bool(_send(socket_path, {"command": "ping"}, timeout).get("ok"))
+    except (OSError, ValueError):
+        return False
+
+def request_render(socket_path, deck, output, fmt: str = "pdf",
+                   timeout: float = RENDER_TIMEOUT) -> Optional[str]:
+    """Render a deck through a running daemon, returning an error message on failure"""
+    try:
+        response = _send(socket_path, {
+            "command": "render", "deck": str(deck), "output": str(output), "format": fmt
+        }, timeout)
+    except (OSError, ValueError) as e:
+        return f"Marp daemon request failed: {e}"
+
+    if response.get("ok"):
+        return None
+    return response.get("error", "unknown daemon error")
+
+def request_shutdown(socket_path) -> bool:
+    """Ask a running daemon to stop"""
+    try:
+        return bool(_send(socket_path, {"command": "shutdown"}, 5).get("ok"))
+    except (OSError, ValueError):
+        return False
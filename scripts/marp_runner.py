@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Concurrent Marp CLI execution on asyncio
+Each deck is rendered by `marp` started with create_subprocess_exec from an
+argument vector (no /bin/sh in between, paths with spaces are safe). A
+semaphore bounds the number of Marp processes (each one runs Node and a
+headless Chromium), every render can have a timeout after which the whole
+process group is killed, and Marp's stderr can be streamed line by line,
+prefixed with the output file name
+Used for the per-deck renders of convert_marp_to_pdf.py (all formats);
+the command line exports a directory without the build cache
+"""
+
+import os
+import sys
+import signal
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from profiling import add_profile_arguments, profile_session, span
+
+# Marp output flag and file extension per format
+MARP_FORMATS = {
+    "pdf": ("--pdf", ".pdf"),
+    "html": ("--html", ".html"),
+    "pptx": ("--pptx", ".pptx"),
+}
+
+def marp_command(marp_file, output_file, fmt: str = "pdf", css_file: Optional[Path] = None) -> List[str]:
+    """Argument vector rendering one deck to one format"""
+    argv = ["marp", str(marp_file), MARP_FORMATS[fmt][0], "--output", str(output_file), "--allow-local-files"]
+    if css_file:
+        argv.extend(["--theme", str(css_file)])
+    return argv
+
+def _kill(process) -> None:
+    """Kill Marp together with the Chromium it started"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        process.kill()
+
+async def run_marp(argv: Sequence[str], label: str = "", timeout: Optional[float] = None,
+                   stream: bool = False) -> Optional[str]:
+    """Run one Marp command, returning an error message on failure
+
+    With stream=True every stderr line is printed as it arrives
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+    except OSError as e:
+        return f"Could not start {argv[0]}: {e}"
+
+    lines: List[str] = []
+
+    async def read_stderr():
+        async for raw in process.stderr:
+            line = raw.decode('utf-8', errors='replace').rstrip()
+            lines.append(line)
+            if stream and line:
+                print(f"   [{label}] {line}")
+
+    try:
+        await asyncio.wait_for(asyncio.gather(read_stderr(), process.wait()), timeout)
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        return f"Timed out after {timeout:g}s"
+
+    if process.returncode != 0:
+        return "\n".join(lines) or f"marp exited with status {process.returncode}"
+    return None
+
+async def _run_all(jobs: List[Tuple[Path, Path, str]], css_file: Optional[Path],
+                   concurrency: int, timeout: Optional[float], stream: bool) -> List[Optional[str]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(marp_file: Path, output_file: Path, fmt: str) -> Optional[str]:
+        async with semaphore:
+            with span("subprocess", marp_file):
+                return await run_marp(marp_command(marp_file, output_file, fmt, css_file),
+                                      output_file.name, timeout, stream)
+
+    return await asyncio.gather(*(render(*job) for job in jobs))
+
+def render_marp_jobs(jobs: List[Tuple[Path, Path, str]], css_file: Optional[Path] = None,
+                     concurrency: int = None, timeout: Optional[float] = None,
+                     stream: bool = False) -> Dict[Path, Optional[str]]:
+    """Render (deck, output file, format) jobs concurrently, returning an error message (or None) per output file"""
+    if not jobs:
+        return {}
+    concurrency = max(1, min(concurrency or os.cpu_count() or 1, len(jobs)))
+    results = asyncio.run(_run_all(jobs, css_file, concurrency, timeout, stream))
+    return dict(zip([output_file for _, output_file, _ in jobs], results))
+
+def render_marp_files(jobs: List[Tuple[Path, Path]], fmt: str = "pdf", css_file: Optional[Path] = None,
+                      concurrency: int = None, timeout: Optional[float] = None,
+                      stream: bool = False) -> Dict[Path, Optional[str]]:
+    """Render (deck, output file) pairs to one format, returning an error message (or None) per deck"""
+    results = render_marp_jobs([(marp_file, output_file, fmt) for marp_file, output_file in jobs],
+                               css_file, concurrency, timeout, stream)
+    return {marp_file: results[output_file] for marp_file, output_file in jobs}
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Export Marp decks to PDF, HTML or PPTX concurrently")
+    parser.add_argument("-f", "--format", choices=sorted(MARP_FORMATS), default="html", help="Output format (default: html)")
+    parser.add_argument("-i", "--input", default="presentation/marp_slides", help="Directory with Marp files (default: presentation/marp_slides)")
+    parser.add_argument("-o", "--output", help="Output directory (default: presentation/<format>_slides)")
+    parser.add_argument("-t", "--theme", help="CSS theme to use (.css file in script directory)")
+    parser.add_argument("--project-dir", help="Project directory (default: script parent directory)")
+    parser.add_argument("-j", "--jobs", type=int, help="Number of Marp processes run at once (default: CPU count)")
+    parser.add_argument("--timeout", type=float, help="Seconds after which a deck render is killed")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Stream Marp's output for every deck")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    # Imported here: convert_marp_to_pdf imports this module
+    from convert_marp_to_pdf import resolve_marp_theme
+
+    project_dir = Path(args.project_dir) if args.project_dir else Path(__file__).parent.parent
+    input_path = project_dir / args.input
+    output_path = project_dir / (args.output or f"presentation/{args.format}_slides")
+
+    marp_files = sorted(f for f in input_path.glob("*.md") if f.name != "program.md")
+    if not marp_files:
+        print(f"❌ No Marp files found in {input_path}")
+        return 1
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    css_file = resolve_marp_theme(args.theme, str(project_dir))
+    extension = MARP_FORMATS[args.format][1]
+
+    with profile_session(args):
+        outcomes = render_marp_files(
+            [(f, output_path / f"{f.stem}{extension}") for f in marp_files],
+            args.format, css_file, args.jobs, args.timeout, args.verbose
+        )
+
+    failed = 0
+    for marp_file, error in outcomes.items():
+        if error is None:
+            print(f"✓ {args.format.upper()} generated: {marp_file.name} -> {marp_file.stem}{extension}")
+        else:
+            failed += 1
+            print(f"✗ Error exporting {marp_file.name}: {error}")
+
+    print(f"\n{'🎉' if not failed else '❌'} {len(marp_files) - failed}/{len(marp_files)} decks exported to {output_path}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -331,12 +331,15 @@ cmd_convert_program() {
     fi
 }
 
-# Function to convert to HTML
-cmd_convert_html() {
+# Export Marp files to HTML or PPTX (concurrent and incremental, see convert_marp_to_pdf.py)
+run_export() {
+    local format="$1"
+    shift
     local input_dir="$DEFAULT_INPUT_DIR"
     local output_dir="$DEFAULT_OUTPUT_DIR"
     local theme="$DEFAULT_THEME"
     local project_dir=""
+    local extra_args=()
     
     # Process arguments
     while [[ $# -gt 0 ]]; do
@@ -357,6 +360,10 @@ cmd_convert_html() {
                 project_dir="$2"
                 shift 2
                 ;;
+            -j|--jobs|--timeout)
+                extra_args+=("$1" "$2")
+                shift 2
+                ;;
             *)
                 shift
                 ;;
@@ -368,72 +375,32 @@ cmd_convert_html() {
         project_dir="$(dirname "$SCRIPT_DIR")"
     fi
     
-    # Create output directory
-    mkdir -p "$project_dir/$output_dir"
-    
-    # Convert files
-    for file in "$project_dir/$input_dir"/*.md; do
-        if [ -f "$file" ]; then
-            local basename=$(basename "$file" .md)
-            local output_file="$project_dir/$output_dir/$basename.html"
-            
-            local cmd="marp $file --html --output $output_file"
-            if [ -n "$theme" ]; then
-                local css_file="$SCRIPT_DIR/$theme.css"
-                if [ -f "$css_file" ]; then
-                    cmd="$cmd --theme $css_file"
-                fi
-            fi
-            
-            run_command "$cmd"
-        fi
-    done
+    local cmd=(python3 "$SCRIPT_DIR/convert_marp_to_pdf.py" "$input_dir" --project-dir "$project_dir"
+               --formats "$format" "--$format-output" "$output_dir" "${extra_args[@]}")
+    if [ -n "$theme" ]; then
+        cmd+=(-t "$theme")
+    fi
+    if [ "$VERBOSE" = true ]; then
+        cmd+=(-v)
+        echo "🔧 Executing: ${cmd[*]}"
+    fi
+    
+    if [ "$DRY_RUN" = true ]; then
+        echo "🔍 [DRY RUN] ${cmd[*]}"
+        return 0
+    fi
+    
+    "${cmd[@]}"
+}
+
+# Function to convert to HTML
+cmd_convert_html() {
+    run_export html "$@"
 }
 
 # Function to convert to PowerPoint
 cmd_convert_pptx() {
-    local input_dir="$DEFAULT_INPUT_DIR"
-    local output_dir="$DEFAULT_OUTPUT_DIR"
-    local project_dir=""
-    
-    # Process arguments
-    while [[ $# -gt 0 ]]; do
-        case $1 in
-            -i|--input)
-                input_dir="$2"
-                shift 2
-                ;;
-            -o|--output)
-                output_dir="$2"
-                shift 2
-                ;;
-            -p|--project-dir)
-                project_dir="$2"
-                shift 2
-                ;;
-            *)
-                shift
-                ;;
-        esac
-    done
-    
-    # Resolve project directory
-    if [ -z "$project_dir" ]; then
-        project_dir="$(dirname "$SCRIPT_DIR")"
-    fi
-    
-    # Create output directory
-    mkdir -p "$project_dir/$output_dir"
-    
-    # Convert files
-    for file in "$project_dir/$input_dir"/*.md; do
-        if [ -f "$file" ]; then
-            local basename=$(basename "$file" .md)
-            local output_file="$project_dir/$output_dir/$basename.pptx"
-            
-            run_command "marp $file --pptx --output $output_file"
-        fi
-    done
+    run_export pptx "$@"
 }
 
 # Function for watch mode
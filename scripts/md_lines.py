@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Line classifier shared by the Markdown converters
+One precompiled regex finds the structural lines of a source in a single
+scan: ATX headings, dash lines (---- slide breaks and other --- rules),
+code fences and the --- delimiters of a leading front matter. Every other
+line is text and is never looked at from Python, so multi-MB sources cost
+about as much as their structural lines
+LineClassifier tracks the open code fence and front matter: headings and
+breaks inside fenced code are code. A source can be classified whole
+(markers(text)) or block by block, with the classifier carried over
+"""
+
+import re
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Tuple
+
+HEADING = "heading"
+SLIDE_BREAK = "slide_break"
+RULE = "rule"
+FENCE = "fence"
+CODE = "code"
+FRONT_MATTER = "front_matter"
+
+SLIDE_BREAK_DASHES = 4
+
+_LINE_PATTERN = (
+    r'(?P<line>'
+    r'(?P<fence>[ \t]*(?:`{3,}|~{3,}))(?P<info>[^\n]*)'
+    r'|(?P<heading> {0,3}#{1,6})(?:[ \t\r][^\n]*)?'
+    r'|[ \t]*(?P<dashes>-{3,})[ \t\r]*'
+    r')$'
+)
+# A structural line at the start of a text
+LINE_RE = re.compile(r'^' + _LINE_PATTERN, re.M)
+# The structural lines after the first: the leading newline lets the regex
+# engine jump from line start to line start instead of trying every
+# position, and the lookahead drops most text lines on their first character
+NEXT_LINE_RE = re.compile(r'\n(?=[ \t]*[-#`~])' + _LINE_PATTERN, re.M)
+# A leading front matter: YAML-like key: lines (with indented, list item or
+# comment continuation lines) closed by --- before any blank line. Anything
+# else after a --- first line is Markdown and the --- is a rule
+FRONT_MATTER_RE = re.compile(
+    r'---[ \t\r]*\n'
+    r'(?:[ \t]*[A-Za-z_][\w.-]*[ \t]*:(?:[ \t][^\n]*)?\n'
+    r'(?:(?:[ \t]+|- |#)[^\n]*\S[^\n]*\n)*)+'
+    r'---[ \t\r]*$', re.M
+)
+
+class LineClassifier:
+    """Classifies the structural lines of one source in order"""
+
+    def __init__(self, front_matter: bool = True):
+        self.fence: Optional[Tuple[str, int]] = None  # character and length of the open code fence
+        self.front_matter = False
+        # Whether a --- first line opens a front matter
+        self.allow_front_matter = front_matter
+        self.at_start = True
+
+    def classify(self, match: re.Match, first: bool = False) -> Tuple[str, int]:
+        """(kind, heading level) of a line matched by LINE_RE or NEXT_LINE_RE"""
+        line, fence, info, heading, dashes = match.groups()
+        if self.front_matter:
+            if line.rstrip() == '---':
+                self.front_matter = False
+                return FRONT_MATTER, 0
+            return CODE, 0
+
+        if self.fence:
+            if fence and not info.strip():
+                fence = fence.lstrip(' \t')
+                if fence[0] == self.fence[0] and len(fence) >= self.fence[1]:
+                    self.fence = None
+                    return FENCE, 0
+            return CODE, 0
+
+        if heading:
+            return HEADING, len(heading.lstrip(' '))
+        if fence:
+            fence = fence.lstrip(' \t')
+            self.fence = (fence[0], len(fence))
+            return FENCE, 0
+        if first and self.allow_front_matter and line.rstrip() == '---':
+            self.front_matter = True
+            return FRONT_MATTER, 0
+        return (SLIDE_BREAK if len(dashes) == SLIDE_BREAK_DASHES else RULE), 0
+
+def has_front_matter(text: str) -> bool:
+    """Whether a text starts with a front matter (see FRONT_MATTER_RE)"""
+    return FRONT_MATTER_RE.match(text) is not None
+
+def markers(text: str, front_matter: bool = True,
+            classifier: Optional[LineClassifier] = None) -> Iterator[Tuple[int, int, str, int]]:
+    """(start, end, kind, heading level) of the headings, breaks, rules, fences and front matter delimiters of a text
+
+    end excludes the newline; lines inside code fences and front matter
+    are skipped. A --- first line opens a front matter only when a YAML-like
+    block closed by --- follows (see FRONT_MATTER_RE). With classifier, text continues the source classified by
+    earlier calls (each block ending at a line end)
+    """
+    if classifier is None:
+        classifier = LineClassifier(front_matter and has_front_matter(text))
+    at_start = classifier.at_start
+    if text:
+        classifier.at_start = False
+
+    head = LINE_RE.match(text)
+    for match in chain([head] if head else [], NEXT_LINE_RE.finditer(text)):
+        kind, level = classifier.classify(match, at_start and match is head)
+        if kind != CODE:
+            yield match.start('line'), match.end(), kind, level
+
+def remove_lines(text: str, kinds: Tuple[str, ...]) -> str:
+    """Text without the structural lines of the given kinds (and their newlines)
+
+    Removing FRONT_MATTER removes the whole front matter
+    """
+    def spans() -> Iterator[Tuple[int, int]]:
+        opened = None
+        for start, end, kind, _ in markers(text, FRONT_MATTER in kinds):
+            if kind == FRONT_MATTER:
+                if opened is None:
+                    opened = start
+                    continue
+                start, opened = opened, None
+            elif kind not in kinds:
+                continue
+            yield start, end
+
+    return remove_spans(text, spans())
+
+def remove_spans(text: str, spans: Iterable[Tuple[int, int]]) -> str:
+    """Text without the given (start, end) line spans and their newlines, in order"""
+    pieces = []
+    position = 0
+    for start, end in spans:
+        pieces.append(text[position:start])
+        position = end + 1
+    if not pieces:
+        return text
+    pieces.append(text[position:])
+    result = ''.join(pieces)
+    # Like dropping lines from text.split('\n'): a removed last line takes the newline before it
+    if position > len(text) and result.endswith('\n'):
+        result = result[:-1]
+    return result
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+HTML -> PDF backends shared by the program, docs and benchmark scripts
+Every backend renders a complete HTML document plus the document CSS to a
+PDF file (or to bytes when no output path is given). Backends are looked up
+by name in a registry and created once per process:
+  weasyprint    the shared PdfRenderer (parsed stylesheets, font cache)
+  wkhtmltopdf   one long-running wkhtmltopdf (--read-args-from-stdin)
+                rendering one document per input line
+  pdfkit        pdfkit, one wkhtmltopdf process per document
+  xhtml2pdf     pure Python (ReportLab), simpler CSS support
+The backend is chosen with --pdf-backend, the PDF_BACKEND environment
+variable or DEFAULT_PDF_BACKEND in marp.config.sh; "auto" tries the
+installed backends in AUTO_ORDER and falls back to the next one when a
+document fails
+"""
+
+import os
+import re
+import atexit
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Type
+
+from pdf_renderer import STYLE_TEMPLATE, get_renderer
+from profiling import span
+from theme_config import load_theme_config
+
+AUTO = "auto"
+AUTO_ORDER = ("weasyprint", "wkhtmltopdf", "pdfkit", "xhtml2pdf")
+BACKEND_ENV = "PDF_BACKEND"
+
+# Page setup of the backends that do not read @page rules
+WKHTMLTOPDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '2.5cm',
+    'margin-right': '2.5cm',
+    'margin-bottom': '2.5cm',
+    'margin-left': '2.5cm',
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'enable-local-file-access': None,
+    'footer-center': "Página [page] de [topage]",
+    'footer-font-size': '7',
+}
+# Seconds the persistent wkhtmltopdf may spend on one document
+WKHTMLTOPDF_TIMEOUT = 300
+# wkhtmltopdf reports the end of each conversion on stderr
+WKHTMLTOPDF_END_RE = re.compile(r'^(Done|Failed|Exit with code)')
+
+class PdfBackendError(Exception):
+    """No backend could render a document"""
+
+def inline_document(html_document: str, css_text: Optional[str] = None, base_url: Optional[str] = None) -> str:
+    """Add the stylesheet and the base URL to the <head> of an HTML document"""
+    head = ""
+    if base_url:
+        head += f'\n    <base href="{Path(base_url).absolute().as_uri()}/">'
+    if css_text:
+        head += STYLE_TEMPLATE.format(css=css_text)
+    return html_document.replace("</head>", head + "\n</head>", 1) if head else html_document
+
+class PdfBackend:
+    """Renders complete HTML documents to PDF"""
+
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backend's library or program is installed"""
+        raise NotImplementedError
+
+    def warm(self, css_text: Optional[str] = None) -> None:
+        """Prepare for the first document (imports, parsed stylesheet, started process)"""
+
+    def render(self, html_document: str, css_text: Optional[str] = None, output_path=None,
+               base_url: Optional[str] = None) -> Optional[bytes]:
+        """Render to output_path, or return the PDF bytes when it is None"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release processes or other resources held between documents"""
+
+class WeasyPrintBackend(PdfBackend):
+    name = "weasyprint"
+
+    def __init__(self, renderer=None):
+        self.renderer = renderer or get_renderer()
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import weasyprint  # noqa: F401
+        except (ImportError, OSError):
+            return False
+        return True
+
+    def warm(self, css_text=None):
+        self.renderer.warm(css_text)
+
+    def render(self, html_document, css_text=None, output_path=None, base_url=None):
+        if output_path is not None:
+            self.renderer.write_pdf(html_document, output_path, css_text, base_url)
+            return None
+        document = self.renderer.render(html_document, css_text, base_url)
+        with span("write"):
+            return document.write_pdf(optimize_images=True)
+
+class WkhtmltopdfBackend(PdfBackend):
+    """wkhtmltopdf kept running between documents
+
+    The options are given once when the process starts; each document is one
+    "input output" line on its stdin, and its end is read from stderr. The
+    process is restarted after a failure or a timeout
+    """
+
+    name = "wkhtmltopdf"
+
+    def __init__(self):
+        self._process: Optional[subprocess.Popen] = None
+        self._tmpdir: Optional[str] = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls) -> bool:
+        return shutil.which("wkhtmltopdf") is not None
+
+    @staticmethod
+    def _command() -> List[str]:
+        argv = ["wkhtmltopdf"]
+        for option, value in WKHTMLTOPDF_OPTIONS.items():
+            argv.append(f"--{option}")
+            if value is not None:
+                argv.append(value)
+        argv.append("--read-args-from-stdin")
+        return argv
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self.close()
+            self._tmpdir = tempfile.mkdtemp(prefix="wkhtmltopdf-")
+            self._process = subprocess.Popen(
+                self._command(), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace', bufsize=1
+            )
+        return self._process
+
+    def warm(self, css_text=None):
+        with self._lock:
+            self._start()
+
+    def _wait_for_end(self, process: subprocess.Popen) -> List[str]:
+        """stderr lines of the current document, up to its end marker (or the end of the process)"""
+        lines: List[str] = []
+        done = threading.Event()
+
+        def read():
+            # Text mode splits the \r-separated progress updates into lines too
+            for line in process.stderr:
+                if line.strip():
+                    lines.append(line.strip())
+                    if WKHTMLTOPDF_END_RE.match(lines[-1]):
+                        break
+            done.set()
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        if not done.wait(WKHTMLTOPDF_TIMEOUT):
+            process.kill()
+            raise PdfBackendError(f"wkhtmltopdf timed out after {WKHTMLTOPDF_TIMEOUT}s")
+        return lines
+
+    def render(self, html_document, css_text=None, output_path=None, base_url=None):
+        with self._lock:
+            process = self._start()
+            self._count += 1
+            # Our own file names: no spaces or quotes on the argument line
+            html_file = Path(self._tmpdir) / f"document-{self._count}.html"
+            pdf_file = Path(self._tmpdir) / f"document-{self._count}.pdf"
+            html_file.write_text(inline_document(html_document, css_text, base_url), encoding='utf-8')
+            try:
+                with span("layout"):
+                    try:
+                        process.stdin.write(f"{html_file} {pdf_file}\n")
+                        process.stdin.flush()
+                    except OSError as e:
+                        raise PdfBackendError(f"wkhtmltopdf exited: {e}")
+                    lines = self._wait_for_end(process)
+                # Failed resources (e.g. a missing image) are reported but still give a PDF
+                if not pdf_file.exists() or not pdf_file.stat().st_size:
+                    if not lines or not WKHTMLTOPDF_END_RE.match(lines[-1]):
+                        self.close()
+                    raise PdfBackendError(lines[-1] if lines else "wkhtmltopdf exited without output")
+                if output_path is None:
+                    return pdf_file.read_bytes()
+                shutil.move(str(pdf_file), str(output_path))
+                return None
+            finally:
+                html_file.unlink(missing_ok=True)
+                pdf_file.unlink(missing_ok=True)
+
+    def close(self):
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+class PdfkitBackend(PdfBackend):
+    name = "pdfkit"
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import pdfkit  # noqa: F401
+        except ImportError:
+            return False
+        return WkhtmltopdfBackend.available()
+
+    def render(self, html_document, css_text=None, output_path=None, base_url=None):
+        import pdfkit
+
+        target = str(output_path) if output_path is not None else False
+        with span("layout"):
+            result = pdfkit.from_string(inline_document(html_document, css_text, base_url), target,
+                                        options=WKHTMLTOPDF_OPTIONS)
+        return result if output_path is None else None
+
+class Xhtml2pdfBackend(PdfBackend):
+    name = "xhtml2pdf"
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import xhtml2pdf  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def render(self, html_document, css_text=None, output_path=None, base_url=None):
+        import io
+        from xhtml2pdf import pisa
+
+        output = io.BytesIO()
+        with span("layout"):
+            result = pisa.CreatePDF(inline_document(html_document, css_text), dest=output,
+                                    path=str(Path(base_url).absolute()) + os.sep if base_url else None,
+                                    encoding='utf-8')
+        if result.err:
+            raise PdfBackendError(f"xhtml2pdf reported {result.err} error(s)")
+        if output_path is None:
+            return output.getvalue()
+        Path(output_path).write_bytes(output.getvalue())
+        return None
+
+BACKENDS: Dict[str, Type[PdfBackend]] = {}
+
+def register_backend(backend: Type[PdfBackend]) -> Type[PdfBackend]:
+    """Make a backend class selectable by its name"""
+    BACKENDS[backend.name] = backend
+    return backend
+
+for _backend in (WeasyPrintBackend, WkhtmltopdfBackend, PdfkitBackend, Xhtml2pdfBackend):
+    register_backend(_backend)
+
+_instances: Dict[str, PdfBackend] = {}
+_instances_lock = threading.Lock()
+
+def get_backend(name: str) -> PdfBackend:
+    """Return this process's instance of a backend, creating it on first use"""
+    with _instances_lock:
+        backend = _instances.get(name)
+        if backend is None:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown PDF backend '{name}' (choose from: {', '.join(backend_names())})")
+            backend = _instances[name] = BACKENDS[name]()
+        return backend
+
+@atexit.register
+def close_backends() -> None:
+    """Stop the processes kept by backends"""
+    with _instances_lock:
+        for backend in _instances.values():
+            backend.close()
+
+def backend_names() -> List[str]:
+    """Names accepted by --pdf-backend"""
+    return [AUTO] + list(BACKENDS)
+
+def requested_backend(name: Optional[str] = None) -> str:
+    """The --pdf-backend value in effect (None: $PDF_BACKEND, else auto)"""
+    return name or os.environ.get(BACKEND_ENV) or AUTO
+
+def theme_backend(theme_dir, name: Optional[str] = None) -> Optional[str]:
+    """The --pdf-backend value for a theme: name, else DEFAULT_PDF_BACKEND of its marp.config.sh
+
+    None leaves the choice to $PDF_BACKEND (else auto), like requested_backend
+    """
+    return name or load_theme_config(theme_dir).get("DEFAULT_PDF_BACKEND") or None
+
+def backend_chain(name: Optional[str] = None) -> List[str]:
+    """Installed backends tried in order for a --pdf-backend value"""
+    name = requested_backend(name)
+    if name == AUTO:
+        order = [backend for backend in AUTO_ORDER if backend in BACKENDS]
+        order += [backend for backend in BACKENDS if backend not in order]
+        return [backend for backend in order if BACKENDS[backend].available()]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{name}' (choose from: {', '.join(backend_names())})")
+    return [name]
+
+def preferred_backend(name: Optional[str] = None) -> str:
+    """The backend a --pdf-backend value renders with when nothing fails (part of the build cache keys)"""
+    return next(iter(backend_chain(name)), requested_backend(name))
+
+def render_pdf(html_document: str, output_path, css_text: Optional[str] = None, base_url: Optional[str] = None,
+               backend: Optional[str] = None, renderer=None) -> str:
+    """Render a document with the first backend of the chain that succeeds, returning its name
+
+    renderer replaces the process-wide PdfRenderer of the weasyprint backend
+    """
+    chain = backend_chain(backend)
+    if not chain:
+        raise PdfBackendError("No PDF backend is installed: pip install weasyprint "
+                              "(or pdfkit/xhtml2pdf, or install wkhtmltopdf)")
+
+    errors = []
+    for name in chain:
+        if not BACKENDS[name].available():
+            errors.append(f"{name} is not installed")
+            continue
+        engine = WeasyPrintBackend(renderer) if name == WeasyPrintBackend.name and renderer else get_backend(name)
+        try:
+            engine.render(html_document, css_text, output_path, base_url)
+            return name
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    raise PdfBackendError("; ".join(errors))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Image XObject deduplication for generated PDFs
+Chromium (Marp) can embed the same background or logo bitmap once per page,
+and decks spliced from cached slides always do. This stage finds image
+streams with identical data and parameters, points every reference (page,
+form, pattern and soft-mask) at one shared XObject and rewrites the file;
+the duplicates are dropped because they are no longer referenced
+
+Requires pikepdf
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from image_assets import format_size
+
+# Keys that do not affect how an image is drawn (or are rewritten on save)
+IGNORED_IMAGE_KEYS = {"/Length"}
+
+def pikepdf_available() -> bool:
+    try:
+        import pikepdf  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class _ImageKeys:
+    """Content keys of image XObjects; equal keys draw identical images"""
+
+    def __init__(self):
+        self._memo: Dict[Tuple[int, int], str] = {}
+
+    def key(self, obj) -> str:
+        """Canonical digest of a PDF object, following indirect references"""
+        import pikepdf
+
+        # Scalars come back as plain Python values
+        objgen = obj.objgen if getattr(obj, "is_indirect", False) else None
+        if objgen and objgen in self._memo:
+            return self._memo[objgen]
+
+        if isinstance(obj, pikepdf.Stream):
+            digest = hashlib.sha256(b"stream")
+            digest.update(bytes(obj.read_raw_bytes()))
+            digest.update(self._dict_key(obj).encode('ascii'))
+            result = digest.hexdigest()
+        elif isinstance(obj, pikepdf.Dictionary):
+            result = hashlib.sha256(b"dict" + self._dict_key(obj).encode('ascii')).hexdigest()
+        elif isinstance(obj, pikepdf.Array):
+            digest = hashlib.sha256(b"array")
+            for item in obj:
+                digest.update(self.key(item).encode('ascii'))
+            result = digest.hexdigest()
+        else:
+            result = hashlib.sha256(b"value" + repr(obj).encode('utf-8')).hexdigest()
+
+        if objgen:
+            self._memo[objgen] = result
+        return result
+
+    def _dict_key(self, obj) -> str:
+        digest = hashlib.sha256()
+        for name in sorted(obj.keys()):
+            if name in IGNORED_IMAGE_KEYS:
+                continue
+            digest.update(name.encode('utf-8'))
+            digest.update(self.key(obj[name]).encode('ascii'))
+        return digest.hexdigest()
+
+def _is_image(obj) -> bool:
+    import pikepdf
+    return isinstance(obj, pikepdf.Stream) and obj.get("/Subtype") == pikepdf.Name.Image
+
+def dedup_pdf_images(pdf_file, output_file=None) -> Dict[str, int]:
+    """Merge identical image XObjects of a PDF in place (or into output_file)
+
+    Returns the number of images, merged duplicates and the file size before
+    and after; the file is left untouched when there is nothing to merge
+    """
+    import pikepdf
+
+    pdf_file = Path(pdf_file)
+    output_file = Path(output_file) if output_file else pdf_file
+    stats = {"images": 0, "merged": 0, "bytes_before": pdf_file.stat().st_size}
+    stats["bytes_after"] = stats["bytes_before"]
+
+    with pikepdf.open(pdf_file) as pdf:
+        keys = _ImageKeys()
+        canonical: Dict[str, object] = {}
+        replacement: Dict[Tuple[int, int], object] = {}
+
+        for obj in pdf.objects:
+            if not _is_image(obj):
+                continue
+            stats["images"] += 1
+            key = keys.key(obj)
+            if key in canonical:
+                replacement[obj.objgen] = canonical[key]
+            else:
+                canonical[key] = obj
+
+        if not replacement:
+            return stats
+
+        def redirect(container, name) -> None:
+            target = container.get(name)
+            if getattr(target, "is_indirect", False) and target.objgen in replacement:
+                container[name] = replacement[target.objgen]
+
+        # Resources live on pages, the page tree, forms, patterns and Type 3 fonts;
+        # soft masks of merged images point at images that may be merged too
+        for obj in list(pdf.objects):
+            if not isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)):
+                continue
+            resources = obj.get("/Resources")
+            if isinstance(resources, pikepdf.Dictionary):
+                xobjects = resources.get("/XObject")
+                if isinstance(xobjects, pikepdf.Dictionary):
+                    for name in list(xobjects.keys()):
+                        redirect(xobjects, name)
+            if _is_image(obj):
+                redirect(obj, "/SMask")
+                redirect(obj, "/Mask")
+
+        stats["merged"] = len(replacement)
+        tmp_file = output_file.with_name(output_file.name + ".tmp")
+        pdf.save(tmp_file, compress_streams=True)
+
+    os.replace(tmp_file, output_file)
+    stats["bytes_after"] = output_file.stat().st_size
+    return stats
+
+def dedup_pdf_files(pdf_files: List[Path], verbose: bool = True) -> Optional[Dict[str, int]]:
+    """Deduplicate several PDFs, printing one line per file and returning totals
+
+    Returns None (after a warning) when pikepdf is not installed
+    """
+    if not pikepdf_available():
+        print("⚠️  Image deduplication needs pikepdf: pip install pikepdf")
+        return None
+
+    totals = {"files": 0, "merged": 0, "bytes_before": 0, "bytes_after": 0}
+    for pdf_file in pdf_files:
+        try:
+            stats = dedup_pdf_images(pdf_file)
+        except Exception as e:
+            print(f"✗ Error deduplicating images in {Path(pdf_file).name}: {e}")
+            continue
+
+        totals["files"] += 1
+        totals["merged"] += stats["merged"]
+        totals["bytes_before"] += stats["bytes_before"]
+        totals["bytes_after"] += stats["bytes_after"]
+        if verbose and stats["merged"]:
+            saved = stats["bytes_before"] - stats["bytes_after"]
+            print(f"🗜️  {Path(pdf_file).name}: merged {stats['merged']} of {stats['images']} images, "
+                  f"saved {format_size(saved)}")
+    return totals
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Merge identical images of PDF files into shared XObjects")
+    parser.add_argument("pdf_files", nargs="+", help="PDF files to rewrite in place")
+
+    args = parser.parse_args()
+
+    totals = dedup_pdf_files([Path(p) for p in args.pdf_files])
+    if totals is None:
+        return 1
+
+    saved = totals["bytes_before"] - totals["bytes_after"]
+    print(f"\n✅ {totals['files']} PDFs processed, {totals['merged']} duplicate images merged, "
+          f"{format_size(saved)} saved ({format_size(totals['bytes_before'])} -> {format_size(totals['bytes_after'])})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
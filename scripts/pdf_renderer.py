@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Long-lived WeasyPrint renderer shared by program and docs PDF generation
+Imports weasyprint once, keeps a single FontConfiguration (font cache) and
+parses each stylesheet once into a reusable CSS object (the most recently
+used ones are kept)
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from profiling import span
+
+# Parsed stylesheets kept per renderer: the document CSS of each theme plus the
+# per-document page-total variants of chunked documents (see chunked_pdf.py)
+MAX_STYLESHEETS = 8
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="{lang}">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>{style}
+</head>
+<body>
+    {body}
+</body>
+</html>"""
+
+STYLE_TEMPLATE = """
+    <style>
+        {css}
+    </style>"""
+
+def build_html_document(body: str, title: str, lang: str = "en", css_text: Optional[str] = None) -> str:
+    """Wrap converted Markdown in a complete HTML document
+
+    css_text is inlined in a <style> element; leave it out when the
+    stylesheet is passed to the renderer as a parsed CSS object
+    """
+    style = STYLE_TEMPLATE.format(css=css_text) if css_text else ""
+    return HTML_TEMPLATE.format(lang=lang, title=title, style=style, body=body)
+
+class PdfRenderer:
+    """WeasyPrint renderer reused for every document of a process"""
+
+    def __init__(self):
+        self._html_class = None
+        self._css_class = None
+        self._font_config = None
+        self._stylesheets: Dict[str, object] = {}
+        # WeasyPrint objects are not thread-safe
+        self._lock = threading.RLock()
+
+    def _load(self) -> None:
+        """Import weasyprint and create the shared font configuration (raises ImportError)"""
+        if self._html_class is not None:
+            return
+
+        from weasyprint import HTML, CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self._font_config = FontConfiguration()
+        self._html_class = HTML
+        self._css_class = CSS
+
+    def stylesheet(self, css_text: str):
+        """Return the parsed CSS object for a stylesheet, parsing it once while it stays in use"""
+        with self._lock:
+            self._load()
+            css = self._stylesheets.pop(css_text, None)
+            if css is None:
+                with span("css"):
+                    css = self._css_class(string=css_text, font_config=self._font_config)
+                if len(self._stylesheets) >= MAX_STYLESHEETS:
+                    del self._stylesheets[next(iter(self._stylesheets))]
+            # Most recently used last
+            self._stylesheets[css_text] = css
+            return css
+
+    def warm(self, css_text: Optional[str] = None) -> None:
+        """Import weasyprint and parse a stylesheet ahead of the first document"""
+        if css_text:
+            self.stylesheet(css_text)
+        else:
+            with self._lock:
+                self._load()
+
+    def render(self, html_document: str, css_text: Optional[str] = None, base_url: Optional[str] = None,
+               extra_css: Optional[str] = None):
+        """Lay out an HTML document, returning the WeasyPrint Document (pages, anchors)
+
+        extra_css is a small per-document stylesheet applied after css_text;
+        unlike css_text it is parsed on every call and not kept
+        """
+        with self._lock:
+            self._load()
+            stylesheets = [self.stylesheet(css_text)] if css_text else []
+            if extra_css:
+                stylesheets.append(self._css_class(string=extra_css, font_config=self._font_config))
+            with span("layout"):
+                html_obj = self._html_class(string=html_document, base_url=base_url)
+                return html_obj.render(font_config=self._font_config, stylesheets=stylesheets,
+                                       optimize_images=True)
+
+    def write_pdf(self, html_document: str, output_path, css_text: Optional[str] = None,
+                  base_url: Optional[str] = None, extra_css: Optional[str] = None) -> None:
+        """Render an HTML document to a PDF file with an optional shared stylesheet"""
+        with self._lock:
+            # Same as HTML.write_pdf, split so layout and PDF writing are timed apart
+            document = self.render(html_document, css_text, base_url, extra_css)
+            with span("write"):
+                document.write_pdf(str(Path(output_path)), optimize_images=True)
+
+_renderer: Optional[PdfRenderer] = None
+_renderer_lock = threading.Lock()
+
+def get_renderer() -> PdfRenderer:
+    """Return the process-wide renderer, creating it on first use"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer()
+        return _renderer
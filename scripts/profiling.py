@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing shared by the conversion scripts
+Code wraps its stages in span("markdown", file) blocks; while profiling is
+off a span is a no-op. With --profile the scripts print a per-file,
+per-stage table at exit; --profile-trace writes a Chrome trace
+(chrome://tracing, Perfetto) and --profile-cprofile a cProfile dump
+Spans recorded in worker processes are sent back and merged by the parent
+
+Stages: read, slides, markdown, css, layout, write, subprocess, cache
+"""
+
+import os
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Column order of the report (other stages are appended alphabetically)
+STAGE_ORDER = ["read", "slides", "markdown", "css", "layout", "write", "subprocess", "cache"]
+
+# (stage, file, wall-clock start, duration, pid, thread id)
+SpanRecord = Tuple[str, str, float, float, int, int]
+
+_NO_SPAN = nullcontext()
+
+class Profiler:
+    """Collects timed spans from every thread of a process"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[SpanRecord] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, stage: str, file=None):
+        """Time the enclosed block as one stage of a file"""
+        if file is None:
+            file = getattr(self._local, "file", "")
+        start_wall = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            record = (stage, Path(file).name if file else "", start_wall, duration,
+                      os.getpid(), threading.get_ident())
+            with self._lock:
+                self.spans.append(record)
+
+    @contextmanager
+    def file_scope(self, file):
+        """Attribute spans without an explicit file (e.g. in the renderer) to file"""
+        previous = getattr(self._local, "file", "")
+        self._local.file = file
+        try:
+            yield
+        finally:
+            self._local.file = previous
+
+    def drain(self) -> List[SpanRecord]:
+        """Return and forget the recorded spans (used by worker processes)"""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    def merge(self, spans: List[SpanRecord]) -> None:
+        """Add spans recorded by another process"""
+        with self._lock:
+            self.spans.extend(tuple(span) for span in spans)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Seconds per file and stage"""
+        table: Dict[str, Dict[str, float]] = {}
+        for stage, file, _, duration, _, _ in self.spans:
+            row = table.setdefault(file or "(shared)", {})
+            row[stage] = row.get(stage, 0.0) + duration
+        return table
+
+    def report(self) -> str:
+        """Per-file, per-stage table of seconds spent"""
+        table = self.totals()
+        if not table:
+            return "⏱️  Profile: no spans recorded"
+
+        present = {stage for row in table.values() for stage in row}
+        stages = [s for s in STAGE_ORDER if s in present] + sorted(present - set(STAGE_ORDER))
+        width = max(len("file"), *(len(file) for file in table))
+
+        lines = [f"⏱️  Profile (seconds; worker processes and threads are summed)"]
+        lines.append(f"{'file':<{width}}" + "".join(f"{s:>11}" for s in stages) + f"{'total':>11}")
+
+        column_totals = {stage: 0.0 for stage in stages}
+        for file in sorted(table):
+            row = table[file]
+            for stage, seconds in row.items():
+                column_totals[stage] += seconds
+            cells = "".join(f"{row[s]:>11.3f}" if s in row else f"{'-':>11}" for s in stages)
+            lines.append(f"{file:<{width}}{cells}{sum(row.values()):>11.3f}")
+
+        cells = "".join(f"{column_totals[s]:>11.3f}" for s in stages)
+        lines.append(f"{'TOTAL':<{width}}{cells}{sum(column_totals.values()):>11.3f}")
+        lines.append(f"Wall time: {time.perf_counter() - self.started:.3f}s")
+        return "\n".join(lines)
+
+    def write_trace(self, path) -> None:
+        """Write the spans as a Chrome trace (Trace Event Format, complete events)"""
+        events = [
+            {
+                "name": stage, "cat": "build", "ph": "X",
+                "ts": start * 1e6, "dur": duration * 1e6,
+                "pid": pid, "tid": tid, "args": {"file": file},
+            }
+            for stage, file, start, duration, pid, tid in self.spans
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+_active: Optional[Profiler] = None
+
+def enable() -> Profiler:
+    """Start recording spans in this process"""
+    global _active
+    if _active is None:
+        _active = Profiler()
+    return _active
+
+def active() -> Optional[Profiler]:
+    """The recording profiler, or None when profiling is off"""
+    return _active
+
+def span(stage: str, file=None):
+    """Context manager timing a stage (no-op unless profiling is enabled)"""
+    if _active is None:
+        return _NO_SPAN
+    return _active.span(stage, file)
+
+def file_scope(file):
+    """Context manager naming the file nested spans belong to"""
+    if _active is None:
+        return _NO_SPAN
+    return _active.file_scope(file)
+
+def add_profile_arguments(parser) -> None:
+    """Add --profile, --profile-trace and --profile-cprofile to a script's parser"""
+    parser.add_argument("--profile", action="store_true", help="Print time spent per file and stage")
+    parser.add_argument("--profile-trace", metavar="PATH", help="Also write a Chrome trace (implies --profile)")
+    parser.add_argument("--profile-cprofile", metavar="PATH", help="Also write a cProfile dump (implies --profile)")
+
+@contextmanager
+def profile_session(args):
+    """Enable profiling for a script run according to its parsed arguments"""
+    if not (args.profile or args.profile_trace or args.profile_cprofile):
+        yield None
+        return
+
+    profiler = enable()
+    python_profiler = cProfile.Profile() if args.profile_cprofile else None
+    if python_profiler:
+        python_profiler.enable()
+
+    try:
+        yield profiler
+    finally:
+        if python_profiler:
+            python_profiler.disable()
+            python_profiler.dump_stats(args.profile_cprofile)
+
+        print()
+        print(profiler.report())
+        if args.profile_trace:
+            profiler.write_trace(args.profile_trace)
+            print(f"📈 Chrome trace written to {args.profile_trace}")
+        if args.profile_cprofile:
+            print(f"📈 cProfile stats written to {args.profile_cprofile}")
@@ -10,6 +10,12 @@ PROJECT_DIR=""
 INPUT_DIR="presentation/marp_slides"
 OUTPUT_DIR="presentation/pdf_slides"
 THEME=""
+JOBS=""
+BATCH=false
+SLIDE_CACHE=false
+DEDUP_IMAGES=false
+TIMEOUT=""
+FORMATS=""
 VERBOSE=false
 
 # Help function
@@ -21,6 +27,12 @@ show_help() {
     echo "  -i, --input DIR          Directory with Marp files (default: presentation/marp_slides)"
     echo "  -o, --output DIR         Output directory for PDFs (default: presentation/pdf_slides)"
     echo "  -t, --theme THEME        CSS theme to use (.css file in scripts/)"
+    echo "  -j, --jobs N             Decks rendered in parallel (default: CPU count)"
+    echo "  --batch                  Render all decks with a single Marp process"
+    echo "  --slide-cache            Render only changed slides (needs pikepdf or pypdf)"
+    echo "  --dedup-images           Merge identical images in the PDFs (needs pikepdf)"
+    echo "  --timeout SECONDS        Kill a deck render that takes longer"
+    echo "  --formats LIST           Formats to export in the same run: pdf,html,pptx (default: pdf)"
     echo "  -v, --verbose            Verbose mode"
     echo "  -h, --help               Show this help"
     echo ""
@@ -50,6 +62,30 @@ while [[ $# -gt 0 ]]; do
             THEME="$2"
             shift 2
             ;;
+        -j|--jobs)
+            JOBS="$2"
+            shift 2
+            ;;
+        --batch)
+            BATCH=true
+            shift
+            ;;
+        --slide-cache)
+            SLIDE_CACHE=true
+            shift
+            ;;
+        --dedup-images)
+            DEDUP_IMAGES=true
+            shift
+            ;;
+        --timeout)
+            TIMEOUT="$2"
+            shift 2
+            ;;
+        --formats)
+            FORMATS="$2"
+            shift 2
+            ;;
         -v|--verbose)
             VERBOSE=true
             shift
@@ -144,6 +180,34 @@ if [ -n "$THEME" ]; then
     CMD="$CMD -t '$THEME'"
 fi
 
+if [ -n "$JOBS" ]; then
+    CMD="$CMD -j '$JOBS'"
+fi
+
+if [ "$BATCH" = true ]; then
+    CMD="$CMD --batch"
+fi
+
+if [ "$SLIDE_CACHE" = true ]; then
+    CMD="$CMD --slide-cache"
+fi
+
+if [ "$DEDUP_IMAGES" = true ]; then
+    CMD="$CMD --dedup-images"
+fi
+
+if [ -n "$FORMATS" ]; then
+    CMD="$CMD --formats '$FORMATS'"
+fi
+
+if [ -n "$TIMEOUT" ]; then
+    CMD="$CMD --timeout '$TIMEOUT'"
+fi
+
+if [ "$VERBOSE" = true ]; then
+    CMD="$CMD -v"
+fi
+
 # Execute command
 echo "🔄 Executing: $CMD"
 eval $CMD
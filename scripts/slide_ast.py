@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Slide-level intermediate representation of the md_src sources
+A source is parsed (one md_lines scan) into its slides: the span of each
+slide in the text, its blocks (headings, fenced code, rules, the front
+matter and the text between them), its headings and the local assets it
+references. doc_markdown emits the A4 document text from it (breaks, rules
+and front matter dropped) for the documents and the course book
+The Marp files are not built from it: convert_md_to_marp.py streams each
+source through the same classifier block by block, and python-markdown
+plays no part there, so a stored parse would only add work
+SlideAstCache keeps the parsed sources of a process in memory and the HTML
+body of their A4 documents in presentation/.slide-ast/, keyed by content
+hash, so python-markdown only runs again when the source or the converter
+changes (the docs stage, its worker processes, the book and watch mode
+share the entries)
+"""
+
+import os
+import json
+import time
+import bisect
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import markdown_converter
+import md_lines
+from build_cache import hash_file
+from md_lines import CODE, FENCE, FRONT_MATTER, HEADING, RULE, SLIDE_BREAK, markers, remove_spans
+from slide_cache import ASSET_RE
+
+SLIDE_AST_DIRNAME = ".slide-ast"
+# Entries not used for this many days are pruned
+PRUNE_AFTER_DAYS = 30
+# Parsed sources kept in memory per cache (a watch session parses every edit)
+MEMO_SOURCES = 64
+
+# Block kind of the text between structural lines
+TEXT = "text"
+
+Block = Tuple[str, int, int, int]  # kind, start, end, heading level
+
+class Slide:
+    """One slide of a source: its span, blocks, headings and referenced assets"""
+
+    def __init__(self, start: int, end: int, blocks: List[Block], headings: List[Tuple[int, str]],
+                 assets: List[str]):
+        self.start = start
+        self.end = end
+        self.blocks = blocks
+        self.headings = headings
+        self.assets = assets
+
+class SourceAst:
+    """The slides of one source text"""
+
+    def __init__(self, text: str, slides: List[Slide], key: Optional[str] = None):
+        self.text = text
+        self.slides = slides
+        self.key = key or source_key(text)
+
+_parser_context: Optional[str] = None
+
+def parser_context() -> str:
+    """Hash of what the parse of a source depends on besides its text (md_lines.py and this file)"""
+    global _parser_context
+    if _parser_context is None:
+        _parser_context = hashlib.sha256(
+            f"{hash_file(md_lines.__file__)}\0{hash_file(__file__)}".encode('ascii')
+        ).hexdigest()[:16]
+    return _parser_context
+
+def source_key(text: str) -> str:
+    """Content hash a parsed source is stored under (changes with the parser code)"""
+    return hashlib.sha256(f"{parser_context()}\0{text}".encode('utf-8')).hexdigest()
+
+def _slide(text: str, start: int, end: int, blocks: List[Block]) -> Slide:
+    headings = [(level, text[block_start:block_end].strip())
+                for kind, block_start, block_end, level in blocks if kind == HEADING]
+    return Slide(start, end, blocks, headings, [])
+
+def _add_assets(text: str, slides: List[Slide]) -> None:
+    """Give every slide the local files it references, from one scan of the text"""
+    starts = [slide.start for slide in slides]
+    code = [(start, end) for slide in slides for kind, start, end, _ in slide.blocks if kind == CODE]
+    code_starts = [start for start, _ in code]
+    assets: Dict[int, set] = {}
+
+    for match in ASSET_RE.finditer(text):
+        ref, position = match.group(1), match.start()
+        if "://" in ref or ref.startswith(("data:", "#")):
+            continue
+        # Code samples are not assets
+        index = bisect.bisect_right(code_starts, position) - 1
+        if index >= 0 and position < code[index][1]:
+            continue
+        assets.setdefault(bisect.bisect_right(starts, position) - 1, set()).add(ref)
+
+    for index, refs in assets.items():
+        slides[index].assets = sorted(refs)
+
+def parse_source(text: str) -> SourceAst:
+    """Split a source into slides at its ---- breaks, in one scan of its structural lines"""
+    slides = []
+    blocks: List[Block] = []
+    slide_start = position = 0
+    opened = None  # start of the open code fence or front matter
+
+    def text_block(upto: int) -> None:
+        if upto > position:
+            blocks.append((TEXT, position, upto, 0))
+
+    # Fence and front matter delimiters alternate: nothing inside them is reported
+    for start, end, kind, level in markers(text):
+        if kind in (FENCE, FRONT_MATTER):
+            if opened is None:
+                text_block(start)
+                opened = start
+                continue
+            blocks.append((CODE if kind == FENCE else FRONT_MATTER, opened, end, 0))
+            opened = None
+        elif kind == SLIDE_BREAK:
+            text_block(start)
+            slides.append(_slide(text, slide_start, start, blocks))
+            blocks = []
+            slide_start = end
+        else:
+            text_block(start)
+            blocks.append((kind, start, end, level))
+        position = end
+
+    # An unclosed fence runs to the end of the source
+    if opened is not None:
+        blocks.append((CODE, opened, len(text), 0))
+        position = len(text)
+    text_block(len(text))
+    slides.append(_slide(text, slide_start, len(text), blocks))
+    _add_assets(text, slides)
+    return SourceAst(text, slides)
+
+def doc_markdown(ast: SourceAst) -> str:
+    """A4 document text of a source: slide breaks, other dash rules and the front matter removed"""
+    def spans() -> Iterator[Tuple[int, int]]:
+        for index, slide in enumerate(ast.slides):
+            for kind, start, end, _ in slide.blocks:
+                if kind in (RULE, FRONT_MATTER):
+                    yield start, end
+            if index + 1 < len(ast.slides):
+                yield slide.end, ast.slides[index + 1].start
+
+    return remove_spans(ast.text, spans())
+
+_html_context: Optional[str] = None
+
+def html_context() -> str:
+    """Hash of what the HTML of a document depends on besides its text (converter and markdown version)"""
+    global _html_context
+    if _html_context is None:
+        import markdown
+
+        _html_context = hashlib.sha256(
+            f"{hash_file(markdown_converter.__file__)}\0{markdown.__version__}".encode('ascii')
+        ).hexdigest()[:16]
+    return _html_context
+
+class SlideAstCache:
+    """Parsed sources (in memory) and their A4 HTML (stored), by content hash
+
+    Without a cache directory documents are converted every time
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._parsed: Dict[str, SourceAst] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_presentation(cls, presentation_dir, enabled: bool = True) -> "SlideAstCache":
+        """Cache kept in a presentation directory (none when disabled)"""
+        return cls(Path(presentation_dir) / SLIDE_AST_DIRNAME if enabled else None)
+
+    def _entry(self, key: str, suffix: str) -> Optional[Path]:
+        return self.cache_dir / f"{key}{suffix}" if self.cache_dir else None
+
+    def _read(self, entry: Optional[Path]):
+        """Stored JSON of an entry (marked as recently used), or None"""
+        if entry is None or not entry.exists():
+            return None
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(entry)
+        return data
+
+    def _write(self, entry: Optional[Path], data) -> None:
+        """Store an entry atomically (other processes may be writing the same one)"""
+        if entry is None:
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = entry.with_name(f"{entry.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, entry)
+
+    def parse(self, text: str) -> SourceAst:
+        """The parsed slides of a source text, parsed at most once per content and process"""
+        key = source_key(text)
+        with self._lock:
+            ast = self._parsed.get(key)
+        if ast is not None:
+            return ast
+
+        ast = parse_source(text)
+        with self._lock:
+            self._parsed[key] = ast
+            if len(self._parsed) > MEMO_SOURCES:
+                del self._parsed[next(iter(self._parsed))]
+        return ast
+
+    def doc_html(self, text: str) -> Tuple[str, list]:
+        """HTML body and toc extension tokens of the A4 document of a source text
+
+        The source is only parsed when its HTML is not stored yet
+        """
+        entry = self._entry(f"{source_key(text)}-{html_context()}", ".html.json")
+        data = self._read(entry)
+        if data is not None and "html" in data and "toc_tokens" in data:
+            return data["html"], data["toc_tokens"]
+
+        html = markdown_converter.convert_markdown(doc_markdown(self.parse(text)))
+        toc_tokens = markdown_converter.get_markdown().toc_tokens
+        self._write(entry, {"html": html, "toc_tokens": toc_tokens})
+        return html, toc_tokens
+
+    def prune(self, max_age_days: int = PRUNE_AFTER_DAYS) -> int:
+        """Delete entries unused for max_age_days, returning how many were removed"""
+        if not self.cache_dir or not self.cache_dir.exists():
+            return 0
+
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for entry in self.cache_dir.glob("*.json"):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    entry.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Per-slide render cache for Marp decks
+Splits a generated Marp file (front matter, breaks and injected elements
+already applied) into standalone single-slide decks, keys each one by its
+content plus the theme CSS and the local images it references, and keeps
+the rendered one-page PDFs in presentation/.slide-cache/
+A deck PDF is assembled by concatenating cached pages, so only changed
+slides go through Chromium
+
+Page concatenation needs pikepdf (or pypdf); without either the cache is
+unavailable and decks are rendered whole
+"""
+
+import os
+import re
+import time
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from build_cache import hash_file
+from md_lines import CODE, FENCE, LINE_RE, LineClassifier
+
+SLIDE_CACHE_DIRNAME = ".slide-cache"
+# Bump when the way standalone slides are built changes
+SLIDE_CACHE_VERSION = 1
+# Cached pages not used for this many days are pruned
+PRUNE_AFTER_DAYS = 30
+
+# Thematic breaks split slides ("---" right under text is a setext heading)
+SLIDE_BREAK_RE = re.compile(r'^ {0,3}([-*_])( *\1){2,} *$')
+COMMENT_RE = re.compile(r'<!--(.*?)-->', re.DOTALL)
+DIRECTIVE_RE = re.compile(r'^\s*(_?)([A-Za-z]+)\s*:\s*(.*?)\s*$')
+GLOBAL_STYLE_RE = re.compile(r'<style(?![^>]*\bscoped\b)[^>]*>.*?</style>', re.DOTALL)
+ASSET_RE = re.compile(r'''(?:\]\(|url\(\s*['"]?|src\s*=\s*['"])([^)'"\s]+)''')
+
+# Marp local directives carry over to the following slides
+LOCAL_DIRECTIVES = {
+    "paginate", "header", "footer", "class", "color", "backgroundColor",
+    "backgroundImage", "backgroundPosition", "backgroundRepeat", "backgroundSize",
+}
+# Marp global directives apply to the whole deck wherever they appear
+GLOBAL_DIRECTIVES = {
+    "marp", "theme", "style", "headingDivider", "size", "math", "lang",
+    "title", "author", "description", "keywords", "url", "image",
+}
+# Directives that make a slide depend on its position or change how the deck is split
+POSITIONAL_DIRECTIVES = {"paginate", "headingDivider"}
+
+def split_front_matter(text: str) -> Tuple[str, str]:
+    """Split a Marp file into its YAML front matter (with delimiters) and body"""
+    if not text.startswith("---\n"):
+        return "", text
+    end = text.find("\n---\n", 3)
+    if end == -1:
+        return "", text
+    return text[:end + 5], text[end + 5:]
+
+def _code_lines(lines: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """Yield each line with whether it is code (a fence or inside fenced code)
+
+    Fences open and close like in the converters (md_lines.LineClassifier):
+    a fence only closes at a fence of the same character, at least as long
+    """
+    classifier = LineClassifier(front_matter=False)
+    for line in lines:
+        match = LINE_RE.match(line)
+        if match:
+            kind, _ = classifier.classify(match)
+            yield line, kind in (FENCE, CODE)
+        else:
+            yield line, classifier.fence is not None
+
+def split_slides(body: str) -> List[str]:
+    """Split a deck body at slide breaks, ignoring breaks inside code fences"""
+    slides = []
+    current: List[str] = []
+    previous_blank = True
+
+    for line, code in _code_lines(body.split("\n")):
+        if not code and SLIDE_BREAK_RE.match(line) and (previous_blank or line.lstrip()[0] != "-"):
+            slides.append("\n".join(current))
+            current = []
+            previous_blank = True
+            continue
+        current.append(line)
+        previous_blank = not line.strip()
+
+    slides.append("\n".join(current))
+    return slides
+
+def _without_fences(text: str) -> str:
+    """Drop fenced code blocks so comments inside them are not read as directives"""
+    return "\n".join(line for line, code in _code_lines(text.split("\n")) if not code)
+
+def standalone_slides(text: str) -> Optional[List[str]]:
+    """Turn a Marp deck into one standalone single-slide deck per slide
+
+    Each standalone deck repeats the front matter, every global <style> and
+    global directive comment, and the local directives inherited from the
+    previous slides, so it renders exactly like the page of the full deck
+    Returns None when a slide cannot be rendered independently (pagination,
+    headingDivider, or a comment mixing global and local directives)
+    """
+    front_matter, body = split_front_matter(text)
+    for line in front_matter.split("\n"):
+        match = DIRECTIVE_RE.match(line)
+        if match and match.group(2) in POSITIONAL_DIRECTIVES:
+            return None
+
+    slides = split_slides(body)
+    global_parts: List[str] = []
+    local_comments: List[List[Tuple[str, str]]] = []
+
+    for slide in slides:
+        scanned = _without_fences(slide)
+        global_parts.extend(GLOBAL_STYLE_RE.findall(scanned))
+
+        directives = []
+        for comment in COMMENT_RE.findall(scanned):
+            parsed = [DIRECTIVE_RE.match(line) for line in comment.strip().split("\n")]
+            if not parsed or not all(parsed):
+                continue  # a regular comment (speaker notes)
+
+            keys = {m.group(2) for m in parsed}
+            if keys & POSITIONAL_DIRECTIVES:
+                return None
+            if keys <= GLOBAL_DIRECTIVES:
+                global_parts.append(f"<!--{comment}-->")
+                continue
+            if not keys <= LOCAL_DIRECTIVES:
+                if keys & (LOCAL_DIRECTIVES | GLOBAL_DIRECTIVES):
+                    return None
+                continue  # not directives (e.g. "Note: ..." speaker notes)
+            directives.extend((m.group(2), m.group(3)) for m in parsed if not m.group(1))
+        local_comments.append(directives)
+
+    prefix = "\n".join(global_parts)
+    decks = []
+    inherited: Dict[str, str] = {}
+
+    for slide, directives in zip(slides, local_comments):
+        carried = "".join(f"<!-- {key}: {value} -->\n" for key, value in inherited.items())
+        parts = [front_matter.rstrip("\n"), prefix, carried + slide.strip("\n")]
+        decks.append("\n\n".join(part for part in parts if part) + "\n")
+        inherited.update(directives)
+
+    return decks
+
+def _pdf_library():
+    """Return the available PDF library module name ('pikepdf', 'pypdf') or None"""
+    for name in ("pikepdf", "pypdf"):
+        try:
+            __import__(name)
+            return name
+        except ImportError:
+            continue
+    return None
+
+def count_pages(pdf_file) -> int:
+    """Number of pages of a PDF file"""
+    if _pdf_library() == "pikepdf":
+        import pikepdf
+        with pikepdf.open(pdf_file) as pdf:
+            return len(pdf.pages)
+
+    from pypdf import PdfReader
+    return len(PdfReader(str(pdf_file)).pages)
+
+def concatenate_pdfs(page_files: List[Path], output_file) -> None:
+    """Write the pages of page_files, in order, to output_file (atomically)"""
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+
+    if _pdf_library() == "pikepdf":
+        import pikepdf
+        sources = []
+        try:
+            combined = pikepdf.Pdf.new()
+            for page_file in page_files:
+                source = pikepdf.open(page_file)
+                sources.append(source)
+                combined.pages.extend(source.pages)
+            combined.save(tmp_file)
+        finally:
+            for source in sources:
+                source.close()
+    else:
+        from pypdf import PdfWriter
+        writer = PdfWriter()
+        for page_file in page_files:
+            writer.append(str(page_file))
+        with open(tmp_file, 'wb') as f:
+            writer.write(f)
+
+    os.replace(tmp_file, output_file)
+
+class SlideCache:
+    """Content-addressed store of rendered single-slide PDFs"""
+
+    def __init__(self, cache_dir, marp_dir, css_file: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir)
+        self.marp_dir = Path(marp_dir)
+        self._file_hashes: Dict[Path, str] = {}
+        self._context = self._hash_text(
+            f"v{SLIDE_CACHE_VERSION}\0{self._hash_asset(Path(css_file)) if css_file else 'no-css'}"
+        )
+
+    @classmethod
+    def for_slides_dir(cls, marp_dir, css_file: Optional[Path] = None) -> "SlideCache":
+        """Slide cache kept next to a marp_slides directory"""
+        marp_dir = Path(marp_dir)
+        return cls(marp_dir.parent / SLIDE_CACHE_DIRNAME, marp_dir, css_file)
+
+    @staticmethod
+    def available() -> bool:
+        """True if a PDF library for splicing pages is installed"""
+        return _pdf_library() is not None
+
+    @staticmethod
+    def _hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _hash_asset(self, path: Path) -> str:
+        """Content hash of a referenced file, memoized per run"""
+        if path not in self._file_hashes:
+            self._file_hashes[path] = hash_file(path) if path.is_file() else "missing"
+        return self._file_hashes[path]
+
+    def slide_key(self, slide_deck: str) -> str:
+        """Key of a standalone slide: its text, the theme CSS and referenced local files"""
+        digest = hashlib.sha256()
+        digest.update(self._context.encode('ascii'))
+        digest.update(slide_deck.encode('utf-8'))
+
+        for ref in sorted(set(ASSET_RE.findall(slide_deck))):
+            if "://" in ref or ref.startswith(("data:", "#")):
+                continue
+            digest.update(b"\0" + ref.encode('utf-8') + b"\0")
+            digest.update(self._hash_asset((self.marp_dir / ref).resolve()).encode('ascii'))
+
+        return digest.hexdigest()
+
+    def page_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def has(self, key: str) -> bool:
+        return self.page_path(key).exists()
+
+    def store(self, key: str, rendered_pdf: Path) -> bool:
+        """Move a freshly rendered slide into the cache if it is a single page"""
+        if count_pages(rendered_pdf) != 1:
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        os.replace(rendered_pdf, self.page_path(key))
+        return True
+
+    def assemble(self, keys: List[str], output_file) -> None:
+        """Build a deck PDF from cached pages, marking them as recently used"""
+        pages = [self.page_path(key) for key in keys]
+        concatenate_pdfs(pages, output_file)
+        for page in set(pages):
+            os.utime(page)
+
+    def prune(self, max_age_days: int = PRUNE_AFTER_DAYS) -> int:
+        """Delete cached pages unused for max_age_days, returning how many were removed"""
+        if not self.cache_dir.exists():
+            return 0
+
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for page in self.cache_dir.glob("*.pdf"):
+            if page.stat().st_mtime < cutoff:
+                page.unlink()
+                removed += 1
+        return removed
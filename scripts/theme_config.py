@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Theme defaults from marp.config.sh
+Reads the DEFAULT_* assignments of a theme's marp.config.sh without running
+the shell script, so the Python entry points (build.py, the docs and program
+converters, the watcher) apply the same defaults as marp_tools.sh
+"""
+
+import re
+from pathlib import Path
+from typing import Dict
+
+CONFIG_FILENAME = "marp.config.sh"
+
+CONFIG_LINE_RE = re.compile(r'^\s*(DEFAULT_[A-Z_]+)=(["\']?)(.*)\2\s*$')
+
+def load_theme_config(theme_dir) -> Dict[str, str]:
+    """Read the DEFAULT_* assignments of a theme's marp.config.sh (no shell expansion)"""
+    config_file = Path(theme_dir) / CONFIG_FILENAME
+    config = {}
+    if not config_file.exists():
+        return config
+    with open(config_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = CONFIG_LINE_RE.match(line)
+            if match:
+                config[match.group(1)] = match.group(3)
+    return config
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Incremental, dependency-aware watch mode for a theme
+Polls the theme sources and rebuilds only the outputs affected by a change:
+  md_src/X.md           -> marp_slides/X.md -> pdf_slides/X.pdf, pdf_docs/X.pdf
+  marp_slides/X.md      -> pdf_slides/X.pdf (manual adjustments)
+  program.md/program.css -> program.pdf
+  presentation/style.css -> every slide PDF
+  a4-docs-theme.css     -> every doc PDF
+  img_src/*             -> slide and A4 image variants -> every slide and doc PDF
+Changes are debounced and rebuilt through the existing conversion functions
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from build_cache import open_cache
+from convert_md_to_marp import build_marp_header, build_slide_elements, marp_fingerprint, write_marp_file
+from convert_marp_to_pdf import deck_fingerprint, render_marp_deck, resolve_marp_theme
+from convert_md_to_pdf_docs import convert_md_to_pdf_doc
+from convert_program_to_pdf import convert_program_to_pdf, find_program_css
+from image_assets import sync_theme_images
+from pdf_backends import theme_backend
+from slide_ast import SlideAstCache
+from marp_daemon import default_socket_path, request_ping, request_render
+
+# Target kinds, in the order they are rebuilt
+IMAGES = "images"
+MARP = "marp"
+SLIDES = "slides"
+DOC = "doc"
+PROGRAM = "program"
+TARGET_ORDER = [IMAGES, MARP, SLIDES, DOC, PROGRAM]
+
+Target = Tuple[str, str]
+
+def snapshot(paths: List[Path]) -> Dict[Path, Tuple[int, int]]:
+    """Map every file below the given files/directories to (mtime_ns, size)"""
+    state = {}
+    for path in paths:
+        if path.is_dir():
+            files = [p for p in path.rglob("*") if p.is_file()]
+        elif path.is_file():
+            files = [path]
+        else:
+            files = []
+        for file in files:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            state[file] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+def changed_files(before: Dict[Path, Tuple[int, int]], after: Dict[Path, Tuple[int, int]]) -> Set[Path]:
+    """Files added, removed or modified between two snapshots"""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+class ThemeBuildGraph:
+    """Dependency graph between a theme's sources and its generated outputs"""
+
+    def __init__(self, theme_dir, scripts_dir=None, theme: Optional[str] = None):
+        self.theme_dir = Path(theme_dir)
+        self.scripts_dir = Path(scripts_dir) if scripts_dir else Path(__file__).parent
+        # scripts/<theme>.css replaces style.css for the decks (see resolve_marp_theme)
+        self.theme_css = self.scripts_dir / f"{theme}.css" if theme else None
+        self.presentation = self.theme_dir / "presentation"
+        self.md_src = self.presentation / "md_src"
+        self.marp_slides = self.presentation / "marp_slides"
+        self.img_src = self.presentation / "img_src"
+        self.style_css = self.presentation / "style.css"
+        self.program_md = self.theme_dir / "program.md"
+
+    def watched_paths(self) -> List[Path]:
+        """Sources to poll (program.css is looked up like convert_program_to_pdf does)"""
+        paths = [self.md_src, self.img_src, self.style_css, self.program_md,
+                 self.scripts_dir / "a4-docs-theme.css"]
+        if self.theme_css:
+            paths.append(self.theme_css)
+        paths.extend(p for p in self.marp_slides.glob("*.md") if p.name != "program.md")
+        program_css = find_program_css(self.theme_dir)
+        if program_css:
+            paths.append(program_css)
+        return paths
+
+    def deck_names(self) -> Set[str]:
+        """Stems of every deck (md_src sources and hand-made marp files)"""
+        names = {p.stem for p in self.md_src.glob("*.md")}
+        names.update(p.stem for p in self.marp_slides.glob("*.md") if p.name != "program.md")
+        return names
+
+    def doc_names(self) -> Set[str]:
+        return {p.stem for p in self.md_src.glob("*.md")}
+
+    def dirty_targets(self, changed: Set[Path]) -> Set[Target]:
+        """Every output that depends (directly or transitively) on a changed file"""
+        dirty: Set[Target] = set()
+        program_css = find_program_css(self.theme_dir)
+        docs_css = self.scripts_dir / "a4-docs-theme.css"
+
+        for path in changed:
+            if path.parent == self.md_src and path.suffix == ".md":
+                dirty.update({(MARP, path.stem), (SLIDES, path.stem), (DOC, path.stem)})
+            elif path.parent == self.marp_slides and path.suffix == ".md":
+                dirty.add((SLIDES, path.stem))
+            elif path == self.program_md or (program_css and path == program_css):
+                dirty.add((PROGRAM, ""))
+            elif path in (self.style_css, self.theme_css):
+                dirty.update((SLIDES, name) for name in self.deck_names())
+            elif path == docs_css:
+                dirty.update((DOC, name) for name in self.doc_names())
+            elif self.img_src in path.parents:
+                dirty.add((IMAGES, ""))
+                dirty.update((SLIDES, name) for name in self.deck_names())
+                dirty.update((DOC, name) for name in self.doc_names())
+
+        return dirty
+
+class ThemeWatcher:
+    """Poll a theme and rebuild dirty outputs through the conversion functions"""
+
+    def __init__(self, graph: ThemeBuildGraph, marp_options: dict, interval: float = 0.5,
+                 debounce: float = 0.3, socket_path: Optional[Path] = None, verbose: bool = False):
+        self.graph = graph
+        self.marp_options = marp_options
+        self.interval = interval
+        self.debounce = debounce
+        self.socket_path = socket_path
+        self.verbose = verbose
+        self.cache = open_cache(graph.theme_dir)
+        self.ast_cache = SlideAstCache.for_presentation(graph.presentation, self.cache is not None)
+
+    def sync_images(self) -> None:
+        """Sync img_src into the slide and A4 image trees (only changed files)"""
+        stats = sync_theme_images(self.graph.theme_dir, verbose=self.verbose)
+        print(f"✓ Images synced: {stats['updated']} updated, {stats['removed']} removed")
+
+    def build_marp(self, name: str) -> None:
+        """Regenerate marp_slides/<name>.md from md_src/<name>.md"""
+        source = self.graph.md_src / f"{name}.md"
+        if not source.exists():
+            print(f"⚠️  {source.name} was removed, keeping existing outputs")
+            return
+
+        opts = self.marp_options
+        self.graph.marp_slides.mkdir(parents=True, exist_ok=True)
+        marp_slides_dir = str(self.graph.marp_slides)
+        header = build_marp_header(opts.get("theme"), opts.get("logo_left"), opts.get("logo_right"),
+                                   opts.get("background"), opts.get("header_text"), opts.get("footer_text"),
+                                   marp_slides_dir)
+        elements = build_slide_elements(opts.get("header_text"), opts.get("footer_text"),
+                                        opts.get("logo_left"), opts.get("logo_right"))
+
+        marp_file = self.graph.marp_slides / source.name
+        write_marp_file(source, marp_file, header, elements)
+
+        if self.cache:
+            header_options = (opts.get("theme"), opts.get("logo_left"), opts.get("logo_right"),
+                              opts.get("background"), opts.get("header_text"), opts.get("footer_text"),
+                              marp_slides_dir)
+            self.cache.record(marp_file, marp_fingerprint(self.cache, source, header_options))
+        print(f"✓ Converted: {source.name} -> {marp_file.name}")
+
+    def build_slides(self, name: str, css_file: Optional[Path]) -> None:
+        """Render marp_slides/<name>.md to pdf_slides/<name>.pdf"""
+        marp_file = self.graph.marp_slides / f"{name}.md"
+        if not marp_file.exists():
+            return
+
+        pdf_dir = self.graph.presentation / "pdf_slides"
+        pdf_dir.mkdir(parents=True, exist_ok=True)
+        pdf_file = pdf_dir / f"{name}.pdf"
+
+        if self.socket_path and request_ping(self.socket_path):
+            error = request_render(self.socket_path, marp_file.resolve(), pdf_file.resolve())
+            if error is not None:
+                print(f"⚠️  Marp daemon could not render {marp_file.name} ({error.strip()}), starting Marp for it")
+                error = render_marp_deck(marp_file, pdf_file, css_file)
+        else:
+            error = render_marp_deck(marp_file, pdf_file, css_file)
+
+        if error is None:
+            if self.cache:
+                self.cache.record(pdf_file, deck_fingerprint(self.cache, marp_file, css_file))
+            print(f"✓ PDF generated: {marp_file.name} -> {pdf_file.name}")
+        else:
+            print(f"✗ Error generating PDF for {marp_file.name}: {error}")
+
+    def build_doc(self, name: str) -> None:
+        """Render md_src/<name>.md to pdf_docs/<name>.pdf"""
+        source = self.graph.md_src / f"{name}.md"
+        if not source.exists():
+            return
+        if convert_md_to_pdf_doc(source, self.graph.presentation / "pdf_docs", self.graph.scripts_dir,
+                                 self.verbose, self.cache, backend=theme_backend(self.graph.theme_dir),
+                                 ast_cache=self.ast_cache):
+            print(f"✓ Document generated: {name}.pdf")
+
+    def build_program(self) -> None:
+        """Render program.md to program.pdf"""
+        if not self.graph.program_md.exists():
+            return
+        if convert_program_to_pdf(self.graph.theme_dir, verbose=self.verbose, use_cache=self.cache is not None):
+            print("✓ Program generated: program.pdf")
+
+    def rebuild(self, targets: Set[Target]) -> None:
+        """Rebuild dirty targets in dependency order"""
+        css_file = None
+        if any(kind == SLIDES for kind, _ in targets):
+            css_file = resolve_marp_theme(self.marp_options.get("theme"), str(self.graph.theme_dir))
+
+        for kind in TARGET_ORDER:
+            for _, name in sorted(t for t in targets if t[0] == kind):
+                try:
+                    if kind == IMAGES:
+                        self.sync_images()
+                    elif kind == MARP:
+                        self.build_marp(name)
+                    elif kind == SLIDES:
+                        self.build_slides(name, css_file)
+                    elif kind == DOC:
+                        self.build_doc(name)
+                    elif kind == PROGRAM:
+                        self.build_program()
+                except Exception as e:
+                    print(f"✗ Error rebuilding {kind} {name}: {e}")
+
+        if self.cache:
+            self.cache.save()
+
+    def run(self) -> None:
+        """Poll forever, rebuilding after each debounced batch of changes"""
+        state = snapshot(self.graph.watched_paths())
+        print(f"👀 Watching {self.graph.theme_dir} (Ctrl+C to exit)")
+
+        while True:
+            time.sleep(self.interval)
+            current = snapshot(self.graph.watched_paths())
+            changed = changed_files(state, current)
+            if not changed:
+                continue
+
+            # Debounce: wait until editors stop writing before rebuilding
+            while True:
+                time.sleep(self.debounce)
+                latest = snapshot(self.graph.watched_paths())
+                more = changed_files(current, latest)
+                if not more:
+                    break
+                changed |= more
+                current = latest
+
+            targets = self.graph.dirty_targets(changed)
+            if targets:
+                names = ", ".join(sorted(p.name for p in changed))
+                print(f"\n🔄 Changed: {names} -> rebuilding {len(targets)} output(s)")
+                self.rebuild(targets)
+
+            # Outputs we just wrote (marp_slides) must not trigger another rebuild
+            state = snapshot(self.graph.watched_paths())
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Watch a theme and rebuild only the affected outputs")
+    parser.add_argument("theme_path", help="Path to theme directory")
+    parser.add_argument("-t", "--theme", help="CSS theme to use")
+    parser.add_argument("--logo-left", help="Path to left logo (upper-left)")
+    parser.add_argument("--logo-right", help="Path to right logo (upper-right)")
+    parser.add_argument("--background", help="Path to background image")
+    parser.add_argument("--header", help="Header text (appears at the top)")
+    parser.add_argument("--footer", help="Footer text (appears at the bottom)")
+    parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds (default: 0.5)")
+    parser.add_argument("--debounce", type=float, default=0.3, help="Quiet time before rebuilding in seconds (default: 0.3)")
+    parser.add_argument("--use-daemon", action="store_true", help="Render slides through a running Marp daemon when available")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+
+    args = parser.parse_args()
+
+    theme_path = Path(args.theme_path)
+    if not (theme_path / "presentation").is_dir():
+        print(f"Error: {theme_path} has no presentation/ directory")
+        return 1
+
+    marp_options = {
+        "theme": args.theme,
+        "logo_left": args.logo_left,
+        "logo_right": args.logo_right,
+        "background": args.background,
+        "header_text": args.header,
+        "footer_text": args.footer,
+    }
+
+    watcher = ThemeWatcher(
+        ThemeBuildGraph(theme_path, theme=args.theme),
+        marp_options,
+        interval=args.interval,
+        debounce=args.debounce,
+        socket_path=default_socket_path(theme_path) if args.use_daemon else None,
+        verbose=args.verbose
+    )
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\n👋 Watch mode stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
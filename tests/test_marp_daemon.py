@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+End-to-end tests of the Marp render daemon (scripts/marp_daemon.py)
+A stub HTTP server stands in for `marp --server`, so the socket protocol,
+request_ping/request_render and the per-deck fallback of
+convert_marp_to_pdf.py run without Node or Chromium
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from benchmark_build import STUB_PDF, install_stub_marp  # noqa: E402
+from convert_marp_to_pdf import export_marp_decks  # noqa: E402
+from marp_daemon import MarpDaemon, request_ping, request_render, request_shutdown  # noqa: E402
+
+class StubMarpHandler(BaseHTTPRequestHandler):
+    """Answers like `marp --server`: the deck as HTML, or converted with ?pdf"""
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        deck = self.server.marp_dir / urllib.parse.unquote(url.path.lstrip("/"))
+        if not deck.is_file():
+            self.send_error(404, f"{deck.name} not found")
+            return
+        if url.query == "pdf":
+            body = STUB_PDF + b"%" + deck.read_bytes()
+        else:
+            body = b"<html>" + deck.read_bytes() + b"</html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubMarpServer(ThreadingHTTPServer):
+    """Stub `marp --server` for one directory on a local port"""
+
+    daemon_threads = True
+
+    def __init__(self, port, marp_dir):
+        self.marp_dir = Path(marp_dir)
+        super().__init__(("127.0.0.1", port), StubMarpHandler)
+
+def start_daemon(socket_path, marp_dir):
+    """A MarpDaemon fronting a stub server, served from background threads"""
+    daemon = MarpDaemon(socket_path, marp_dir)
+    stub = StubMarpServer(daemon.port, daemon.marp_dir)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    return daemon, stub
+
+class MarpDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="marp-daemon-"))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.marp_dir = self.tmp / "marp_slides"
+        self.marp_dir.mkdir()
+        (self.marp_dir / "intro.md").write_text("---\nmarp: true\n---\n\n# Intro\n", encoding="utf-8")
+        self.socket_path = self.tmp / "daemon.sock"
+        self.daemon, self.stub = start_daemon(self.socket_path, self.marp_dir)
+        self.addCleanup(self.stop)
+
+    def stop(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.stub.shutdown()
+        self.stub.server_close()
+
+    def test_ping(self):
+        self.assertTrue(request_ping(self.socket_path))
+        self.assertFalse(request_ping(self.tmp / "missing.sock"))
+
+    def test_render_pdf(self):
+        output = self.tmp / "out" / "intro.pdf"
+        self.assertIsNone(request_render(self.socket_path, self.marp_dir / "intro.md", output))
+        self.assertTrue(output.read_bytes().startswith(STUB_PDF))
+        self.assertFalse(output.with_name("intro.pdf.tmp").exists())
+
+    def test_render_html_by_relative_name(self):
+        output = self.tmp / "intro.html"
+        self.assertIsNone(request_render(self.socket_path, "intro.md", output, fmt="html"))
+        self.assertTrue(output.read_bytes().startswith(b"<html>"))
+
+    def test_render_errors(self):
+        output = self.tmp / "missing.pdf"
+        self.assertIn("404", request_render(self.socket_path, self.marp_dir / "missing.md", output))
+        other = self.tmp / "other.md"
+        other.write_text("# Other\n", encoding="utf-8")
+        self.assertIn("outside", request_render(self.socket_path, other, output))
+        self.assertFalse(output.exists())
+
+    def test_shutdown(self):
+        self.assertTrue(request_shutdown(self.socket_path))
+        self.daemon.server_close()
+        self.assertFalse(request_ping(self.socket_path))
+
+    def test_falls_back_per_deck(self):
+        # A daemon serving another directory cannot render these decks
+        other_dir = self.tmp / "other_slides"
+        other_dir.mkdir()
+        (other_dir / "local.md").write_text("---\nmarp: true\n---\n\n# Local\n", encoding="utf-8")
+
+        path = os.environ.get("PATH", "")
+        self.addCleanup(os.environ.__setitem__, "PATH", path)
+        install_stub_marp(self.tmp / "bin", 0.0)
+
+        pdf_dir = self.tmp / "pdf"
+        export_marp_decks(str(other_dir), {"pdf": str(pdf_dir)}, socket_path=str(self.socket_path))
+        self.assertTrue((pdf_dir / "local.pdf").read_bytes().startswith(b"%PDF"))
+
+if __name__ == "__main__":
+    unittest.main()
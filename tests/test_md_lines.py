@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests of the shared line classifier (scripts/md_lines.py): front matter
+detection and the lines removed from the A4 documents
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from md_lines import FRONT_MATTER, RULE, SLIDE_BREAK, markers, remove_lines  # noqa: E402
+
+DOC_KINDS = (SLIDE_BREAK, RULE, FRONT_MATTER)
+
+def kinds(text):
+    return [kind for _, _, kind, _ in markers(text)]
+
+class FrontMatterTest(unittest.TestCase):
+
+    def test_yaml_block_is_front_matter(self):
+        text = "---\nmarp: true\ntheme: example\n---\n\n# Intro\n"
+        self.assertEqual(kinds(text), [FRONT_MATTER, FRONT_MATTER, "heading"])
+        self.assertEqual(remove_lines(text, DOC_KINDS), "\n# Intro\n")
+
+    def test_yaml_continuation_lines(self):
+        text = "---\ntitle: Course\ntags:\n  - intro\n- basics\n# comment\n---\n# Intro\n"
+        self.assertEqual(remove_lines(text, DOC_KINDS), "# Intro\n")
+
+    def test_leading_rule_keeps_content(self):
+        text = "---\n\n# Intro\n\ntext\n\n---\n\n# Next\n"
+        self.assertEqual(kinds(text), [RULE, "heading", RULE, "heading"])
+        self.assertEqual(remove_lines(text, DOC_KINDS), "\n# Intro\n\ntext\n\n\n# Next\n")
+
+    def test_blank_line_ends_front_matter(self):
+        text = "---\nmarp: true\n\n---\n# Intro\n"
+        self.assertEqual(remove_lines(text, DOC_KINDS), "marp: true\n\n# Intro\n")
+
+    def test_disabled(self):
+        text = "---\nmarp: true\n---\n"
+        self.assertEqual([kind for _, _, kind, _ in markers(text, front_matter=False)], [RULE, RULE])
+
+if __name__ == "__main__":
+    unittest.main()
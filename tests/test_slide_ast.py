@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests of the slide-level IR (scripts/slide_ast.py) and of the streamed Marp
+transform next to it: the A4 text and its stored HTML, and the Marp text
+of the same sources
+"""
+
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from convert_md_to_marp import process_slide_breaks, transform_slide_blocks, write_marp_file  # noqa: E402
+import slide_ast  # noqa: E402
+from slide_ast import SlideAstCache, doc_markdown  # noqa: E402
+
+LEADING_RULE = "---\n\n# Intro\n\nWelcome text\n\n----\n\nMore intro\n\n---\n\n# Part 2\n\nBody\n"
+FRONT_MATTER = "---\nmarp: true\n# note\n---\n\n# Intro\n\n----\n\nMore intro\n"
+
+class SlideAstTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="slide-ast-"))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.cache = SlideAstCache(self.tmp / ".slide-ast")
+
+    def test_leading_rule(self):
+        self.assertEqual(process_slide_breaks(LEADING_RULE),
+                         "---\n\n# Intro\n\nWelcome text\n\n---\n\n# Intro\n\n\nMore intro\n\n---\n\n# Part 2\n\nBody\n")
+        self.assertEqual(doc_markdown(self.cache.parse(LEADING_RULE)),
+                         "\n# Intro\n\nWelcome text\n\n\nMore intro\n\n\n# Part 2\n\nBody\n")
+
+    def test_front_matter_lines_are_slides_in_marp(self):
+        # Marp does not detect front matter: "# note" is a heading there
+        self.assertEqual(process_slide_breaks(FRONT_MATTER),
+                         "---\nmarp: true\n# note\n---\n\n# Intro\n\n---\n\n# Intro\n\n\nMore intro\n")
+        self.assertEqual(doc_markdown(self.cache.parse(FRONT_MATTER)), "\n# Intro\n\n\nMore intro\n")
+
+    def test_streamed_blocks(self):
+        # A fence opened in one block is still open in the next
+        blocks = ["# A\n```\n", "----\n```\n----\n"]
+        self.assertEqual(''.join(transform_slide_blocks(blocks)), process_slide_breaks(''.join(blocks)))
+        source = self.tmp / "deck.md"
+        source.write_text(FRONT_MATTER, encoding="utf-8")
+        marp_file = self.tmp / "deck.marp.md"
+        write_marp_file(source, marp_file, "")
+        self.assertEqual(marp_file.read_text(encoding="utf-8"), process_slide_breaks(FRONT_MATTER))
+
+    def test_stored_html(self):
+        html, toc_tokens = self.cache.doc_html(LEADING_RULE)
+        self.assertIn("<h1", html)
+        self.assertEqual([token["name"] for token in toc_tokens], ["Intro", "Part 2"])
+        fresh = SlideAstCache(self.tmp / ".slide-ast")
+        self.assertEqual(fresh.doc_html(LEADING_RULE), (html, toc_tokens))
+        self.assertFalse(fresh._parsed)
+
+    def test_parser_change_invalidates_stored_html(self):
+        html, _ = self.cache.doc_html(LEADING_RULE)
+        context = slide_ast.parser_context()
+        self.addCleanup(setattr, slide_ast, "_parser_context", context)
+        # As if md_lines.py or slide_ast.py had been edited
+        slide_ast._parser_context = "edited"
+        fresh = SlideAstCache(self.tmp / ".slide-ast")
+        self.assertEqual(fresh.doc_html(LEADING_RULE)[0], html)
+        self.assertTrue(fresh._parsed)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests of the standalone slides of the per-slide render cache
+(scripts/slide_cache.py): slide breaks and directives inside fenced code
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from slide_cache import split_slides, standalone_slides  # noqa: E402
+
+FRONT_MATTER = "---\nmarp: true\n---\n\n"
+
+class FencedCodeTest(unittest.TestCase):
+
+    def test_backticks_inside_tilde_fence(self):
+        body = "# Fences\n\n~~~markdown\n```\n\n---\n\n```\n<!-- class: lead -->\n~~~\n\nAfter\n"
+        self.assertEqual(split_slides(body), [body])
+        decks = standalone_slides(FRONT_MATTER + body)
+        self.assertEqual(len(decks), 1)
+        self.assertIn("<!-- class: lead -->", decks[0])
+
+    def test_tildes_inside_backtick_fence(self):
+        body = "# One\n\n```\n~~~\n```\n\n---\n\n# Two\n\n---\n\n# Three\n"
+        self.assertEqual([slide.strip() for slide in split_slides(body)],
+                         ["# One\n\n```\n~~~\n```", "# Two", "# Three"])
+
+    def test_longer_fence_needs_longer_close(self):
+        body = "````\n```\n\n---\n\n```\n````\n\n---\n\n# Next\n"
+        self.assertEqual(len(split_slides(body)), 2)
+
+    def test_directive_after_fence_is_inherited(self):
+        body = "~~~\n```\n~~~\n<!-- class: lead -->\n\n---\n\n# Two\n"
+        decks = standalone_slides(FRONT_MATTER + body)
+        self.assertEqual(len(decks), 2)
+        self.assertTrue(decks[1].split("\n\n")[1].startswith("<!-- class: lead -->"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,6 +20,9 @@ DEFAULT_BACKGROUND="presentation/img_src/background.png"
 DEFAULT_HEADER_TEXT="Mi Empresa - Curso de Capacitación"
 DEFAULT_FOOTER_TEXT="Confidencial - Todos los derechos reservados"
 
+# Motor HTML -> PDF de documentos y programa (auto, weasyprint, wkhtmltopdf, pdfkit, xhtml2pdf)
+# DEFAULT_PDF_BACKEND="auto"
+
 # Opciones de Marp
 MARP_OPTIONS="--pdf --allow-local-files"
 MARP_HTML_OPTIONS="--html --allow-local-files"